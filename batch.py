@@ -0,0 +1,219 @@
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+from search import SearchEngine
+import argparse
+import chess
+import chess.pgn
+import json
+import multiprocessing
+import os
+import sys
+import time
+
+# Streaming batch analysis: positions are read lazily from EPD/FEN/PGN files,
+# analysed by a pool of long-lived engine processes and written as JSONL.
+# Only `window` positions are ever in flight, so memory stays constant.
+
+# Per-process engine, created once by the pool initializer
+_worker_engine = None
+_worker_limits = None
+
+def read_positions(path):
+    """
+    Yields (position_id, fen) from one file. EPD (.epd), PGN (.pgn, every
+    mainline position) or one FEN per line (anything else).
+    """
+    extension = os.path.splitext(path)[1].lower()
+    if extension == ".pgn":
+        with open(path, encoding="utf-8", errors="replace") as f:
+            game_number = 0
+            while True:
+                game = chess.pgn.read_game(f)
+                if game is None:
+                    break
+                game_number += 1
+                board = game.board()
+                yield f"{path}:{game_number}:0", board.fen()
+                for ply, move in enumerate(game.mainline_moves(), start=1):
+                    board.push(move)
+                    yield f"{path}:{game_number}:{ply}", board.fen()
+    else:
+        with open(path, encoding="utf-8") as f:
+            for line_number, line in enumerate(f, start=1):
+                line = line.strip()
+                if not line or line.startswith("#"):
+                    continue
+                if extension == ".epd":
+                    board, operations = chess.Board.from_epd(line)
+                    yield str(operations.get("id", f"{path}:{line_number}")), board.fen()
+                else:
+                    yield f"{path}:{line_number}", line
+
+def enumerate_positions(paths):
+    index = 0
+    for path in paths:
+        for position_id, fen in read_positions(path):
+            yield index, position_id, fen
+            index += 1
+
+def _init_worker(depth, hash_mb, time_limit, node_limit, cache_path=None, cache_min_depth=4):
+    global _worker_engine, _worker_limits
+    analysis_cache = None
+    if cache_path:
+        # Every worker maps the same file, results are shared as they are written
+        from cache import AnalysisCache
+        analysis_cache = AnalysisCache(cache_path, min_depth=cache_min_depth)
+    _worker_engine = SearchEngine(depth, hash_mb=hash_mb, verbose=False, analysis_cache=analysis_cache)
+    _worker_limits = (time_limit, node_limit)
+
+def _analyse(index, position_id, fen):
+    engine = _worker_engine
+    time_limit, node_limit = _worker_limits
+    start = time.perf_counter()
+    try:
+        board = chess.Board(fen)
+        best_move, nodes = engine.get_best_move(board, time_limit=time_limit, node_limit=node_limit)
+    except ValueError as e:
+        return {'index': index, 'id': position_id, 'fen': fen, 'error': str(e)}
+    return {
+        'index': index,
+        'id': position_id,
+        'fen': fen,
+        'bestmove': best_move.uci() if best_move else None,
+        'score': engine.best_score, # White's perspective, centipawns
+        'depth': engine.completed_depth,
+        'nodes': nodes,
+        'time': round(time.perf_counter() - start, 4)
+    }
+
+class Checkpoint:
+    """
+    Progress of one output file: every index below `next_index` is written,
+    `done` holds the (few) written indices above it, and `offset` is the
+    output size that matches this state.
+    """
+    def __init__(self, path):
+        self.path = path
+        self.next_index = 0
+        self.done = set()
+        self.offset = 0
+
+    def load(self):
+        if self.path and os.path.exists(self.path):
+            with open(self.path) as f:
+                data = json.load(f)
+            self.next_index = data['next_index']
+            self.done = set(data['done'])
+            self.offset = data['offset']
+
+    def is_done(self, index):
+        return index < self.next_index or index in self.done
+
+    def mark(self, index):
+        self.done.add(index)
+        while self.next_index in self.done:
+            self.done.remove(self.next_index)
+            self.next_index += 1
+
+    def save(self, offset):
+        if not self.path:
+            return
+        self.offset = offset
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump({'next_index': self.next_index, 'done': sorted(self.done), 'offset': offset}, f)
+        os.replace(tmp_path, self.path)
+
+def run_batch(paths, output_path, depth=4, workers=None, hash_mb=16, time_limit=None, node_limit=None,
+              ordered=True, window=None, checkpoint_path=None, checkpoint_every=100, resume=False,
+              cache_path=None, cache_min_depth=4):
+    workers = workers or os.cpu_count() or 1
+    window = window or workers * 4
+
+    checkpoint = Checkpoint(checkpoint_path)
+    if resume:
+        checkpoint.load()
+    mode = "r+b" if resume and os.path.exists(output_path) else "wb"
+    output = open(output_path, mode)
+    # Drop results written after the last checkpoint, they will be recomputed
+    output.truncate(checkpoint.offset if resume else 0)
+    output.seek(0, os.SEEK_END)
+
+    written = 0
+    # Ordered output: submitted indices in input order, and finished results waiting for their turn
+    submitted = deque()
+    reorder = {}
+
+    def write(result):
+        nonlocal written
+        output.write((json.dumps(result) + "\n").encode())
+        checkpoint.mark(result['index'])
+        written += 1
+        if written % checkpoint_every == 0:
+            output.flush()
+            checkpoint.save(output.tell())
+
+    def collect(futures):
+        for future in futures:
+            result = future.result()
+            if not ordered:
+                write(result)
+                continue
+            reorder[result['index']] = result
+            while submitted and submitted[0] in reorder:
+                write(reorder.pop(submitted.popleft()))
+
+    context = multiprocessing.get_context("spawn")
+    start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=workers, mp_context=context, initializer=_init_worker,
+                             initargs=(depth, hash_mb, time_limit, node_limit, cache_path, cache_min_depth)) as pool:
+        pending = set()
+        for index, position_id, fen in enumerate_positions(paths):
+            if checkpoint.is_done(index):
+                continue
+            # Results held back for ordering count against the window too
+            while len(pending) + len(reorder) >= window:
+                finished, pending = wait(pending, return_when=FIRST_COMPLETED)
+                collect(sorted(finished, key=lambda f: f.result()['index']))
+            pending.add(pool.submit(_analyse, index, position_id, fen))
+            if ordered:
+                submitted.append(index)
+        if pending:
+            finished, _ = wait(pending)
+            collect(sorted(finished, key=lambda f: f.result()['index']))
+
+    output.flush()
+    checkpoint.save(output.tell())
+    output.close()
+    duration = time.perf_counter() - start
+    print(f"Analysed {written} positions in {duration:.1f}s", file=sys.stderr)
+    return written
+
+def main():
+    parser = argparse.ArgumentParser(description="Analyse EPD/FEN/PGN files and write results as JSON lines")
+    parser.add_argument("inputs", nargs="+", help=".epd, .pgn or one-FEN-per-line files")
+    parser.add_argument("-o", "--output", required=True, help="JSONL output file")
+    parser.add_argument("--depth", type=int, default=4)
+    parser.add_argument("--time", type=float, default=None, help="Seconds per position")
+    parser.add_argument("--nodes", type=int, default=None, help="Node limit per position")
+    parser.add_argument("--workers", type=int, default=None, help="Engine processes (default: CPU count)")
+    parser.add_argument("--hash", type=int, default=16, help="Transposition table size per worker in MB")
+    parser.add_argument("--window", type=int, default=None, help="Positions in flight (default: 4 per worker)")
+    parser.add_argument("--unordered", action="store_true", help="Write results in completion order")
+    parser.add_argument("--checkpoint", default=None, help="Checkpoint file (default: OUTPUT.checkpoint)")
+    parser.add_argument("--checkpoint-every", type=int, default=100)
+    parser.add_argument("--resume", action="store_true", help="Continue from the checkpoint")
+    parser.add_argument("--analysis-cache", default=None, help="Persistent analysis cache file, shared by all workers and runs")
+    parser.add_argument("--cache-min-depth", type=int, default=4, help="Only cache results of at least this depth")
+    args = parser.parse_args()
+
+    run_batch(
+        args.inputs, args.output, depth=args.depth, workers=args.workers, hash_mb=args.hash,
+        time_limit=args.time, node_limit=args.nodes, ordered=not args.unordered, window=args.window,
+        checkpoint_path=args.checkpoint or args.output + ".checkpoint",
+        checkpoint_every=args.checkpoint_every, resume=args.resume,
+        cache_path=args.analysis_cache, cache_min_depth=args.cache_min_depth
+    )
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,199 @@
+from search import SearchEngine, SEARCH_MODES
+from evaluation import evaluate_board, evaluate_many
+import zobrist
+import argparse
+import chess
+import json
+import random
+import sys
+import time
+
+# Reproducible search benchmark. The total node count is a signature of the
+# search behaviour: it only changes when move ordering, pruning or evaluation
+# change. NPS tracks raw speed. Bump BENCH_VERSION whenever the positions,
+# the default depth or the default seed change.
+
+BENCH_VERSION = 1
+BENCH_DEPTH = 4
+BENCH_HASH_MB = 16
+
+BENCH_POSITIONS = [
+    chess.STARTING_FEN,
+    "r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R w KQkq - 0 1",
+    "8/2p5/3p4/KP5r/1R3p1k/8/4P1P1/8 w - - 0 1",
+    "r3k2r/Pppp1ppp/1b3nbN/nP6/BBP1P3/q4N2/Pp1P2PP/R2Q1RK1 w kq - 0 1",
+    "rnbq1k1r/pp1Pbppp/2p5/8/2B5/8/PPP1NnPP/RNBQK2R w KQ - 1 8",
+    "r4rk1/1pp1qppp/p1np1n2/2b1p1B1/2B1P1b1/P1NP1N2/1PP1QPPP/R4RK1 w - - 0 10",
+    "r1bqkb1r/pppp1ppp/2n2n2/4p3/2B1P3/5N2/PPPP1PPP/RNBQK2R w KQkq - 4 4",
+    "rnbqkb1r/pp1p1ppp/4pn2/2p5/2PP4/2N5/PP2PPPP/R1BQKBNR w KQkq - 0 4",
+    "r2q1rk1/pp2bppp/2n1pn2/3p4/3P4/2NBPN2/PP3PPP/R2Q1RK1 w - - 0 10",
+    "2r3k1/pp3ppp/4p3/3pP3/3P4/P4N2/1P3PPP/2R3K1 w - - 0 25",
+    "8/8/4k3/3p4/3P4/4K3/8/8 w - - 0 50",
+    "6k1/5ppp/8/8/8/8/5PPP/3R2K1 w - - 0 40",
+]
+
+def run_bench(depth=BENCH_DEPTH, hash_mb=BENCH_HASH_MB, seed=zobrist.ZOBRIST_SEED, positions=None, engine_options=None, out=sys.stdout):
+    """
+    Searches every position to a fixed depth with a fresh engine (empty
+    transposition table) and returns a JSON-serialisable report.
+    """
+    zobrist.seed_zobrist(seed)
+    positions = positions or BENCH_POSITIONS
+    results = []
+    total_nodes = 0
+    total_time = 0.0
+
+    for i, fen in enumerate(positions, start=1):
+        engine = SearchEngine(depth, hash_mb=hash_mb, verbose=False, **(engine_options or {}))
+        board = chess.Board(fen)
+        start = time.perf_counter()
+        best_move, nodes = engine.get_best_move(board)
+        duration = time.perf_counter() - start
+        engine.close()
+
+        total_nodes += nodes
+        total_time += duration
+        results.append({
+            'fen': fen,
+            'bestmove': best_move.uci() if best_move else None,
+            'score': engine.best_score,
+            'nodes': nodes,
+            'qnodes': engine.telemetry.qnodes,
+            'ebf': engine.telemetry.iterations[-1]['ebf'] if engine.telemetry.iterations else None,
+            'time': round(duration, 4),
+            'nps': int(nodes / duration) if duration > 0 else 0,
+            'first_move_cutoff_rate': round(engine.orderer.first_move_cutoff_rate(), 4)
+        })
+        if out:
+            print(f"Position {i}/{len(positions)}: {results[-1]['bestmove']} nodes {nodes} time {duration:.3f}s nps {results[-1]['nps']} fmc {results[-1]['first_move_cutoff_rate']:.1%}", file=out)
+
+    return {
+        'version': BENCH_VERSION,
+        'search_mode': (engine_options or {}).get('search_mode', 'minimax'),
+        'depth': depth,
+        'hash_mb': hash_mb,
+        'seed': seed,
+        'positions': results,
+        'total_nodes': total_nodes,
+        'total_time': round(total_time, 4),
+        'nps': int(total_nodes / total_time) if total_time > 0 else 0
+    }
+
+def random_positions(count, seed=0):
+    """
+    `count` positions from seeded random playouts of the bench positions,
+    game ends included.
+    """
+    rng = random.Random(seed)
+    positions = []
+    while len(positions) < count:
+        board = chess.Board(rng.choice(BENCH_POSITIONS))
+        for _ in range(rng.randint(1, 200)):
+            moves = list(board.legal_moves)
+            if not moves or len(positions) >= count:
+                break
+            board.push(rng.choice(moves))
+            positions.append(board.copy(stack=False))
+    return positions
+
+def run_eval_bench(count, seed=0, out=sys.stdout):
+    """
+    Throughput of evaluate_many against a loop over evaluate_board on the
+    same positions. Raises AssertionError if any score differs.
+    """
+    boards = random_positions(count, seed)
+
+    start = time.perf_counter()
+    expected = [evaluate_board(board) for board in boards]
+    scalar_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    scores = evaluate_many(boards)
+    batch_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    evaluate_many(boards, terminal=False)
+    material_time = time.perf_counter() - start
+
+    mismatches = sum(1 for a, b in zip(expected, scores) if a != b)
+    assert mismatches == 0, f"evaluate_many differs from evaluate_board on {mismatches} positions"
+    report = {
+        'positions': count,
+        'seed': seed,
+        'scalar_pps': int(count / scalar_time) if scalar_time > 0 else 0,
+        'batch_pps': int(count / batch_time) if batch_time > 0 else 0,
+        'batch_material_pps': int(count / material_time) if material_time > 0 else 0
+    }
+    if out:
+        print(f"evaluate_board loop           : {report['scalar_pps']} positions/s", file=out)
+        print(f"evaluate_many                 : {report['batch_pps']} positions/s ({scalar_time / batch_time:.2f}x)", file=out)
+        print(f"evaluate_many(terminal=False) : {report['batch_material_pps']} positions/s ({scalar_time / material_time:.2f}x)", file=out)
+    return report
+
+def compare(report, baseline, out=sys.stdout):
+    """
+    Prints the differences to a previous report. Returns True if the search
+    behaved identically (same node counts and best moves).
+    """
+    if (baseline['version'], baseline['depth'], baseline['seed']) != (report['version'], report['depth'], report['seed']):
+        print("Baseline was run with a different bench version, depth or seed", file=out)
+        return False
+
+    identical = True
+    for i, (old, new) in enumerate(zip(baseline['positions'], report['positions']), start=1):
+        if old['nodes'] != new['nodes'] or old['bestmove'] != new['bestmove']:
+            identical = False
+            print(f"Position {i}: nodes {old['nodes']} -> {new['nodes']}, bestmove {old['bestmove']} -> {new['bestmove']}", file=out)
+
+    speedup = report['nps'] / baseline['nps'] if baseline['nps'] else 0
+    time_speedup = baseline['total_time'] / report['total_time'] if report['total_time'] else 0
+    print(f"Search mode: {baseline.get('search_mode', 'minimax')} -> {report['search_mode']}", file=out)
+    print(f"Nodes: {baseline['total_nodes']} -> {report['total_nodes']} ({'identical' if identical else 'CHANGED'})", file=out)
+    print(f"NPS: {baseline['nps']} -> {report['nps']} ({speedup:.2f}x)", file=out)
+    print(f"Time to depth {report['depth']}: {baseline['total_time']:.3f}s -> {report['total_time']:.3f}s ({time_speedup:.2f}x)", file=out)
+    return identical
+
+def main():
+    parser = argparse.ArgumentParser(description="Fixed-depth search benchmark")
+    parser.add_argument("--depth", type=int, default=BENCH_DEPTH)
+    parser.add_argument("--hash", type=int, default=BENCH_HASH_MB, help="Transposition table size in MB")
+    parser.add_argument("--seed", type=int, default=zobrist.ZOBRIST_SEED, help="Zobrist seed")
+    parser.add_argument("--json", default=None, help="Write the report to this file ('-' for stdout)")
+    parser.add_argument("--compare", default=None, help="Baseline report to compare against")
+    parser.add_argument("--search-mode", choices=SEARCH_MODES, default="minimax")
+    parser.add_argument("--strict-terminal", action="store_true", help="Detect game ends with board.is_game_over() at every node")
+    parser.add_argument("--eval", type=int, default=None, metavar="N", help="Benchmark batched evaluation on N random positions instead")
+    args = parser.parse_args()
+
+    if args.eval:
+        report = run_eval_bench(args.eval, args.seed, out=sys.stderr)
+        if args.json == "-":
+            print(json.dumps(report, indent=2))
+        elif args.json:
+            with open(args.json, "w") as f:
+                json.dump(report, f, indent=2)
+        return
+
+    engine_options = {'search_mode': args.search_mode}
+    if args.strict_terminal:
+        engine_options['strict_terminal'] = True
+    report = run_bench(args.depth, args.hash, args.seed, engine_options=engine_options, out=sys.stderr)
+    print("===========================", file=sys.stderr)
+    print(f"Total time (s) : {report['total_time']:.3f}", file=sys.stderr)
+    print(f"Nodes searched : {report['total_nodes']}", file=sys.stderr)
+    print(f"Nodes/second   : {report['nps']}", file=sys.stderr)
+
+    if args.json == "-":
+        print(json.dumps(report, indent=2))
+    elif args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        if not compare(report, baseline, out=sys.stderr):
+            sys.exit(1)
+
+if __name__ == "__main__":
+    main()
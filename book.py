@@ -0,0 +1,139 @@
+from collections import defaultdict
+import argparse
+import chess
+import chess.pgn
+import chess.polyglot
+import random
+import struct
+import sys
+
+# Polyglot opening books. Lookups go through chess.polyglot's memory-mapped
+# reader, which binary-searches the sorted 16-byte entries in place, so a
+# book of any size costs no memory beyond the pages actually touched.
+
+BOOK_MODES = ("weighted", "best")
+# key (64 bits), move (16), weight (16), learn (32), big-endian
+ENTRY_FORMAT = ">QHHI"
+MAX_WEIGHT = 0xFFFF
+
+class OpeningBook:
+    """
+    Read-only Polyglot book. `mode` is "weighted" (random, proportional to
+    the entry weights) or "best" (always the highest weight).
+    """
+    def __init__(self, path, mode="weighted", min_weight=1, seed=None):
+        if mode not in BOOK_MODES:
+            raise ValueError(f"Unknown book mode: {mode}")
+        self.path = path
+        self.mode = mode
+        self.min_weight = min_weight
+        self.random = random.Random(seed)
+        self.reader = chess.polyglot.open_reader(path)
+
+    def __len__(self):
+        return len(self.reader)
+
+    def probe(self, board):
+        """
+        Returns a book move for `board`, or None when out of book.
+        """
+        entries = list(self.reader.find_all(board, minimum_weight=self.min_weight))
+        if not entries:
+            return None
+        if self.mode == "best":
+            return max(entries, key=lambda entry: entry.weight).move
+
+        choice = self.random.randrange(sum(entry.weight for entry in entries))
+        for entry in entries:
+            choice -= entry.weight
+            if choice < 0:
+                return entry.move
+        return entries[-1].move
+
+    def close(self):
+        self.reader.close()
+
+def encode_move(board, move):
+    """
+    Polyglot move encoding: to | from << 6 | promotion << 12, with castling
+    written as the king capturing its own rook.
+    """
+    to_square = move.to_square
+    if board.is_castling(move):
+        rank_base = move.from_square & ~7
+        to_square = rank_base + 7 if to_square > move.from_square else rank_base
+    promotion = move.promotion - 1 if move.promotion else 0
+    return to_square | (move.from_square << 6) | (promotion << 12)
+
+def build_book(pgn_paths, output_path, max_ply=20, min_games=1, out=sys.stdout):
+    """
+    Writes a Polyglot book with the moves played in the first `max_ply`
+    plies of every game. Weights follow the usual convention: 2 per game
+    won by the side playing the move, 1 per draw, 0 per loss. Returns the
+    number of entries written.
+    """
+    # key -> raw move -> [weight, games]
+    positions = defaultdict(lambda: defaultdict(lambda: [0, 0]))
+    games = 0
+    for path in pgn_paths:
+        with open(path, encoding="utf-8", errors="replace") as f:
+            while True:
+                game = chess.pgn.read_game(f)
+                if game is None:
+                    break
+                games += 1
+                result = game.headers.get("Result", "*")
+                board = game.board()
+                for ply, move in enumerate(game.mainline_moves()):
+                    if ply >= max_ply:
+                        break
+                    stats = positions[chess.polyglot.zobrist_hash(board)][encode_move(board, move)]
+                    if result == "1/2-1/2":
+                        stats[0] += 1
+                    elif result == ("1-0" if board.turn == chess.WHITE else "0-1"):
+                        stats[0] += 2
+                    stats[1] += 1
+                    board.push(move)
+
+    entries = []
+    for key, moves in positions.items():
+        scale = max(1, max(weight for weight, _ in moves.values()) / MAX_WEIGHT)
+        for raw_move, (weight, count) in moves.items():
+            weight = int(weight / scale)
+            if count >= min_games and weight > 0:
+                entries.append((key, raw_move, weight))
+
+    # Sorted by key for the binary search, best move first within a position
+    entries.sort(key=lambda entry: (entry[0], -entry[2]))
+    with open(output_path, "wb") as f:
+        for key, raw_move, weight in entries:
+            f.write(struct.pack(ENTRY_FORMAT, key, raw_move, weight, 0))
+
+    print(f"Wrote {len(entries)} entries for {len(positions)} positions from {games} games to {output_path}", file=out)
+    return len(entries)
+
+def main():
+    parser = argparse.ArgumentParser(description="Build or query a Polyglot opening book")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    build = subparsers.add_parser("build", help="Build a book from PGN files")
+    build.add_argument("pgns", nargs="+")
+    build.add_argument("-o", "--output", required=True, help="Polyglot .bin file to write")
+    build.add_argument("--max-ply", type=int, default=20, help="Only use the first plies of every game")
+    build.add_argument("--min-games", type=int, default=1, help="Drop moves played in fewer games")
+
+    probe = subparsers.add_parser("probe", help="List the book moves of a position")
+    probe.add_argument("book")
+    probe.add_argument("--fen", default=chess.STARTING_FEN)
+
+    args = parser.parse_args()
+    if args.command == "build":
+        build_book(args.pgns, args.output, args.max_ply, args.min_games)
+    else:
+        board = chess.Board(args.fen)
+        with chess.polyglot.open_reader(args.book) as reader:
+            for entry in reader.find_all(board):
+                print(f"{board.san(entry.move)} {entry.weight}")
+
+if __name__ == "__main__":
+    main()
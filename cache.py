@@ -0,0 +1,196 @@
+from transposition import TranspositionTable, table_bytes, decode_move
+import zobrist
+import argparse
+import mmap
+import os
+import struct
+import time
+
+# Persistent analysis cache: search results (depth, score, bound, best move)
+# in a memory-mapped file, keyed by the seeded Zobrist key, so a new engine
+# process starts with what earlier searches found. The file holds a header
+# and a TranspositionTable, with the same lockless layout as the shared
+# table of a parallel search: each entry stores key ^ data next to data, so
+# any number of processes can map the file, and a torn write just fails
+# verification. Only results of depth >= min_depth are kept. The search
+# probes the file on a transposition table miss at such depths.
+
+MAGIC = b"CHSCACHE"
+VERSION = 1
+# magic, version, size in MB, Zobrist seed; padded to keep the table 8-byte aligned
+HEADER = struct.Struct("<8sIIQ")
+HEADER_BYTES = 64
+
+DEFAULT_SIZE_MB = 64
+DEFAULT_MIN_DEPTH = 4
+# When recorded results are written into the file: after every search,
+# after every completed iteration, or only on close
+WRITE_POLICIES = ("search", "iteration", "close")
+MAX_PENDING = 100_000 # Recorded results held before an early write-back
+SYNC_INTERVAL = 30.0 # Seconds between flushes of the mapping to disk
+
+def create_cache_file(path, size_mb):
+    """
+    Creates an empty cache file. Built under a temporary name and linked into
+    place, so a concurrent reader never sees a file without its header.
+    """
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(HEADER.pack(MAGIC, VERSION, size_mb, zobrist.ZOBRIST_SEED).ljust(HEADER_BYTES, b"\0"))
+        # Sparse: pages are only allocated once written
+        f.truncate(HEADER_BYTES + table_bytes(size_mb))
+    try:
+        os.link(tmp_path, path)
+    except FileExistsError:
+        # Someone else created it first, use theirs
+        pass
+    finally:
+        os.remove(tmp_path)
+
+class AnalysisCache:
+    """
+    Memory-mapped search results shared across processes and restarts.
+    Nothing is opened until the first probe or write, so creating one costs
+    nothing at startup. `size_mb` only applies when the file is created.
+    A read-only cache never records anything.
+    """
+    def __init__(self, path, size_mb=DEFAULT_SIZE_MB, min_depth=DEFAULT_MIN_DEPTH, write_policy="search", readonly=False):
+        if write_policy not in WRITE_POLICIES:
+            raise ValueError(f"Unknown write policy {write_policy!r}")
+        self.path = path
+        self.size_mb = size_mb
+        self.min_depth = min_depth
+        self.write_policy = write_policy
+        self.readonly = readonly
+        self.table = None
+        self.file = None
+        self.mapping = None
+        self.view = None
+        # key -> (depth, score, flag, move_code) waiting for write_back
+        self.pending = {}
+        self.hits = 0
+        self.written = 0
+        self.last_sync = time.perf_counter()
+
+    def open(self):
+        if self.table is not None:
+            return
+        if not os.path.exists(self.path):
+            if self.readonly:
+                raise FileNotFoundError(self.path)
+            create_cache_file(self.path, self.size_mb)
+
+        self.file = open(self.path, "rb" if self.readonly else "r+b")
+        magic, version, size_mb, seed = HEADER.unpack(self.file.read(HEADER.size))
+        if magic != MAGIC or version != VERSION:
+            self.file.close()
+            raise ValueError(f"{self.path} is not an analysis cache (version {VERSION})")
+        if seed != zobrist.ZOBRIST_SEED:
+            self.file.close()
+            raise ValueError(f"{self.path} was built with Zobrist seed {seed}, not {zobrist.ZOBRIST_SEED}")
+        self.size_mb = size_mb
+
+        access = mmap.ACCESS_READ if self.readonly else mmap.ACCESS_WRITE
+        self.mapping = mmap.mmap(self.file.fileno(), HEADER_BYTES + table_bytes(size_mb), access=access)
+        self.view = memoryview(self.mapping)[HEADER_BYTES:]
+        self.table = TranspositionTable(size_mb, self.view)
+
+    def probe(self, key):
+        """(depth, score, flag, move_code) like TranspositionTable.probe, or None."""
+        if self.table is None:
+            self.open()
+        entry = self.table.probe(key)
+        if entry is not None:
+            self.hits += 1
+        return entry
+
+    def record(self, key, depth, score, flag, move_code=0):
+        """Queues a result for the next write-back (the deepest per key wins)."""
+        if self.readonly:
+            return
+        previous = self.pending.get(key)
+        if previous is None or previous[0] <= depth:
+            self.pending[key] = (depth, score, flag, move_code)
+            if len(self.pending) >= MAX_PENDING:
+                self.write_back()
+
+    def write_back(self):
+        """Writes the queued results into the file."""
+        if not self.pending:
+            return
+        if self.table is None:
+            self.open()
+        store = self.table.store
+        for key, (depth, score, flag, move_code) in self.pending.items():
+            store(key, depth, score, flag, move_code)
+        self.written += len(self.pending)
+        self.pending = {}
+        # Other processes see the mapping at once, this only makes it durable
+        if time.perf_counter() - self.last_sync >= SYNC_INTERVAL:
+            self.sync()
+
+    def sync(self):
+        if self.mapping is not None and not self.readonly:
+            self.mapping.flush()
+        self.last_sync = time.perf_counter()
+
+    def end_iteration(self):
+        if self.write_policy == "iteration":
+            self.write_back()
+
+    def end_search(self):
+        if self.write_policy in ("search", "iteration"):
+            self.write_back()
+
+    def close(self):
+        self.write_back()
+        if self.table is None:
+            return
+        self.sync()
+        self.table.close()
+        self.view.release()
+        self.mapping.close()
+        self.file.close()
+        self.table = self.view = self.mapping = self.file = None
+
+    def stats(self):
+        """Entry count by a full scan of the file, and this process' counters."""
+        if self.table is None:
+            self.open()
+        table = self.table.table
+        entries = sum(1 for i in range(1, len(table), 2) if table[i])
+        return {
+            'path': self.path,
+            'size_mb': self.size_mb,
+            'seed': zobrist.ZOBRIST_SEED,
+            'entries': entries,
+            'occupancy': entries / self.table.num_slots,
+            'hits': self.hits,
+            'written': self.written
+        }
+
+def main():
+    parser = argparse.ArgumentParser(description="Inspect or create a persistent analysis cache")
+    parser.add_argument("path")
+    parser.add_argument("--size", type=int, default=DEFAULT_SIZE_MB, help="Size in MB when creating the file")
+    parser.add_argument("--fen", default=None, help="Look up one position")
+    args = parser.parse_args()
+
+    cache = AnalysisCache(args.path, args.size, readonly=os.path.exists(args.path))
+    if args.fen:
+        import chess
+        board = chess.Board(args.fen)
+        entry = cache.probe(zobrist.compute_hash(board))
+        if entry is None:
+            print("Not cached")
+        else:
+            depth, score, flag, move_code = entry
+            move = decode_move(move_code)
+            print(f"depth {depth} score {score} bound {('exact', 'lower', 'upper')[flag]} move {board.san(move) if move and board.is_legal(move) else '-'}")
+    else:
+        for name, value in cache.stats().items():
+            print(f"{name}: {value}")
+    cache.close()
+
+if __name__ == "__main__":
+    main()
@@ -10,6 +10,9 @@ PIECE_VALUES = {
     chess.KING: 20000
 }
 
+# Score of a checkmate, the search subtracts the distance to the mate from it
+MATE_SCORE = 99999
+
 # Piece-Square Tables (PST)
 # Values are for WHITE. For BLACK, we mirror the square index (flip rank).
 
@@ -73,53 +76,200 @@ kingtable = [
     -30,-40,-40,-50,-50,-40,-40,-30,
     -30,-40,-40,-50,-50,-40,-40,-30]
 
-def evaluate_board(board):
+PIECE_SQUARE_TABLES = {
+    chess.PAWN: pawntable,
+    chess.KNIGHT: knighttable,
+    chess.BISHOP: bishoptable,
+    chess.ROOK: rooktable,
+    chess.QUEEN: queentable,
+    chess.KING: kingtable
+}
+
+# Flat lookups indexed like the Zobrist table: piece_index = (piece_type - 1) + 6 * color
+# PST_BY_INDEX[piece_index][square] is already mirrored for Black.
+MATERIAL_BY_INDEX = [PIECE_VALUES[(i % 6) + 1] for i in range(12)]
+PST_BY_INDEX = [
+    [PIECE_SQUARE_TABLES[(i % 6) + 1][square if i >= 6 else chess.square_mirror(square)] for square in range(64)]
+    for i in range(12)
+]
+
+def evaluate_material(board):
+    """
+    Material + PST score from White's perspective, without terminal checks.
+    """
+    score = 0
+    for square, piece in board.piece_map().items():
+        idx = (piece.piece_type - 1) + 6 * int(piece.color)
+        if piece.color == chess.WHITE:
+            score += MATERIAL_BY_INDEX[idx] + PST_BY_INDEX[idx][square]
+        else:
+            score -= MATERIAL_BY_INDEX[idx] + PST_BY_INDEX[idx][square]
+    return score
+
+class EvalAccumulator:
+    """
+    Running material and PST sums per side, updated with per-move deltas
+    instead of walking the piece map at every evaluation.
+    Sums are indexed by color (chess.BLACK = 0, chess.WHITE = 1).
+    """
+    def __init__(self):
+        self.material = [0, 0]
+        self.pst = [0, 0]
+        self.stack = []
+
+    def reset(self, board):
+        self.material = [0, 0]
+        self.pst = [0, 0]
+        self.stack = []
+        for square, piece in board.piece_map().items():
+            idx = (piece.piece_type - 1) + 6 * int(piece.color)
+            self.material[piece.color] += MATERIAL_BY_INDEX[idx]
+            self.pst[piece.color] += PST_BY_INDEX[idx][square]
+
+    def score(self):
+        return (self.material[1] - self.material[0]) + (self.pst[1] - self.pst[0])
+
+    def push(self, board, move):
+        """
+        Applies the deltas of `move`. Must be called BEFORE board.push(move).
+        """
+        material = self.material
+        pst = self.pst
+        self.stack.append((material[0], material[1], pst[0], pst[1]))
+
+        from_square = move.from_square
+        to_square = move.to_square
+        color = board.turn
+        offset = 6 if color else 0
+
+        piece_type = board.piece_type_at(from_square)
+        mover = piece_type - 1 + offset
+        placed = (move.promotion or piece_type) - 1 + offset
+        pst[color] += PST_BY_INDEX[placed][to_square] - PST_BY_INDEX[mover][from_square]
+        if move.promotion:
+            material[color] += MATERIAL_BY_INDEX[placed] - MATERIAL_BY_INDEX[mover]
+
+        # Captures (en-passant removes the pawn behind the target square)
+        captured_type = board.piece_type_at(to_square)
+        captured_square = to_square
+        if not captured_type and piece_type == chess.PAWN and (from_square & 7) != (to_square & 7):
+            captured_type = chess.PAWN
+            captured_square = to_square - 8 if color else to_square + 8
+        if captured_type:
+            victim = captured_type - 1 + 6 - offset
+            material[not color] -= MATERIAL_BY_INDEX[victim]
+            pst[not color] -= PST_BY_INDEX[victim][captured_square]
+
+        # Castling moves the rook too
+        if piece_type == chess.KING and abs(to_square - from_square) == 2:
+            rank_base = from_square & ~7
+            if to_square > from_square:
+                rook_from, rook_to = rank_base + 7, rank_base + 5
+            else:
+                rook_from, rook_to = rank_base, rank_base + 3
+            rook = chess.ROOK - 1 + offset
+            pst[color] += PST_BY_INDEX[rook][rook_to] - PST_BY_INDEX[rook][rook_from]
+
+    def pop(self):
+        mat_black, mat_white, pst_black, pst_white = self.stack.pop()
+        self.material[0] = mat_black
+        self.material[1] = mat_white
+        self.pst[0] = pst_black
+        self.pst[1] = pst_white
+
+# evaluate_many works on chunks of this many positions. Each chunk unpacks
+# to a chunk x 768 uint8 bit array (3 MB), which the integer matmul casts to
+# int32 (12 MB): about 15 MB at peak, whatever the batch size
+BATCH_CHUNK = 4096
+
+# NumPy weights of evaluate_many, built on first use
+_batch_weights = None
+
+def _import_numpy():
+    try:
+        import numpy
+    except ImportError:
+        raise ImportError("evaluate_many needs NumPy (pip install numpy)") from None
+    return numpy
+
+def pack_bitboards(boards):
+    """
+    N x 12 uint64 array of piece bitboards, planes ordered like the Zobrist
+    table: (piece_type - 1) + 6 * color, Black's pieces first.
+    """
+    np = _import_numpy()
+    rows = []
+    for board in boards:
+        black, white = board.occupied_co
+        pawns, knights, bishops, rooks, queens, kings = board.pawns, board.knights, board.bishops, board.rooks, board.queens, board.kings
+        rows.append((
+            pawns & black, knights & black, bishops & black, rooks & black, queens & black, kings & black,
+            pawns & white, knights & white, bishops & white, rooks & white, queens & white, kings & white
+        ))
+    return np.array(rows, dtype=np.uint64).reshape(-1, 12)
+
+def evaluate_bitboards(bitboards):
+    """
+    Material + PST scores (White's perspective, like evaluate_material) of
+    an N x 12 bitboard array from pack_bitboards. Returns int64 scores.
+    """
+    global _batch_weights
+    np = _import_numpy()
+    if _batch_weights is None:
+        # One signed weight per (plane, square) bit, integers keep every sum exact
+        weights = np.array([
+            [(MATERIAL_BY_INDEX[i] + PST_BY_INDEX[i][square]) * (1 if i >= 6 else -1) for square in range(64)]
+            for i in range(12)
+        ], dtype=np.int32)
+        _batch_weights = weights.reshape(12 * 64)
+
+    bitboards = np.ascontiguousarray(bitboards, dtype="<u8")
+    scores = np.empty(len(bitboards), dtype=np.int64)
+    for start in range(0, len(bitboards), BATCH_CHUNK):
+        chunk = bitboards[start:start + BATCH_CHUNK]
+        # Little-endian bytes, least significant bit first: bit 64 * plane + square
+        bits = np.unpackbits(chunk.view(np.uint8), axis=1, bitorder="little")
+        scores[start:start + len(chunk)] = bits @ _batch_weights
+    return scores
+
+def evaluate_many(boards, terminal=True):
+    """
+    Scores a batch of boards, identical to evaluate_board on each of them.
+    Material and PST are summed for the whole batch with NumPy; with
+    terminal=True the checkmate/game-over checks still run per board, with
+    terminal=False the result equals evaluate_material. Needs NumPy.
+    """
+    boards = list(boards)
+    scores = evaluate_bitboards(pack_bitboards(boards))
+    if terminal:
+        # One outcome() call covers both of evaluate_board's checks
+        for i, board in enumerate(boards):
+            outcome = board.outcome()
+            if outcome is not None:
+                if outcome.winner is None:
+                    scores[i] = 0
+                else:
+                    scores[i] = MATE_SCORE if outcome.winner == chess.WHITE else -MATE_SCORE
+    return scores
+
+def evaluate_board(board, accumulator=None):
     """
     Returns a score from White's perspective.
     Positive = White advantage, Negative = Black advantage.
+    If an EvalAccumulator in sync with `board` is given, its running sums are
+    used instead of a full walk over the piece map; the checkmate and
+    game-over checks still run first and cost far more than either.
     """
     if board.is_checkmate():
         if board.turn == chess.WHITE:
-            return -99999
+            return -MATE_SCORE
         else:
-            return 99999
+            return MATE_SCORE
     
     if board.is_game_over():
         return 0
 
-    score = 0
-    piece_map = board.piece_map()
-    
-    for square, piece in piece_map.items():
-        # Material
-        val = PIECE_VALUES.get(piece.piece_type, 0)
-        
-        # Position
-        pst_val = 0
-        
-        # White Piece
-        if piece.color == chess.WHITE:
-            if piece.piece_type == chess.PAWN: pst_val = pawntable[square]
-            elif piece.piece_type == chess.KNIGHT: pst_val = knighttable[square]
-            elif piece.piece_type == chess.BISHOP: pst_val = bishoptable[square]
-            elif piece.piece_type == chess.ROOK: pst_val = rooktable[square]
-            elif piece.piece_type == chess.QUEEN: pst_val = queentable[square]
-            elif piece.piece_type == chess.KING: pst_val = kingtable[square]
-            
-            score += val + pst_val
-            
-        # Black Piece
-        else:
-            # Mirror the square for Black to use the same table
-            mirror_square = chess.square_mirror(square)
-            
-            if piece.piece_type == chess.PAWN: pst_val = pawntable[mirror_square]
-            elif piece.piece_type == chess.KNIGHT: pst_val = knighttable[mirror_square]
-            elif piece.piece_type == chess.BISHOP: pst_val = bishoptable[mirror_square]
-            elif piece.piece_type == chess.ROOK: pst_val = rooktable[mirror_square]
-            elif piece.piece_type == chess.QUEEN: pst_val = queentable[mirror_square]
-            elif piece.piece_type == chess.KING: pst_val = kingtable[mirror_square]
-            
-            score -= (val + pst_val)
-            
-    return score
+    if accumulator is not None:
+        return accumulator.score()
+
+    return evaluate_material(board)
@@ -1,12 +1,31 @@
+from book import BOOK_MODES
 from logic import GameLogic
-from search import SearchEngine
 from ui import ChessUI
+from worker import EngineWorker, WorkerError
+import argparse
 import chess
 import pygame
+import time
+
+ENGINE_POLL_MS = 20 # How often the loop checks for the engine's answer while it thinks
 
 def main():
+    parser = argparse.ArgumentParser(description="Play against the engine")
+    parser.add_argument("--book", default=None, help="Polyglot opening book (.bin)")
+    parser.add_argument("--book-mode", choices=BOOK_MODES, default="weighted")
+    parser.add_argument("--syzygy", default=None, help="Syzygy tablebase directory")
+    parser.add_argument("--syzygy-limit", type=int, default=None, help="Only probe positions with at most this many pieces")
+    parser.add_argument("--telemetry", default=None, help="Append the statistics of every search to this JSON lines file")
+    parser.add_argument("--quiet", action="store_true", help="Don't print the search statistics")
+    parser.add_argument("--ponder", action="store_true", help="Search the expected reply while you think")
+    args = parser.parse_args()
+
     game = GameLogic()
-    engine = SearchEngine(depth=4)
+    # The engine runs in its own process, the UI loop never waits for it
+    worker = EngineWorker(
+        depth=4, verbose=not args.quiet, book=args.book, book_mode=args.book_mode,
+        syzygy=args.syzygy, syzygy_limit=args.syzygy_limit, telemetry=args.telemetry
+    )
     ui = ChessUI()
 
     # Select Color
@@ -15,11 +34,45 @@ def main():
         if choice in ['w', 'b']:
             player_color = chess.WHITE if choice == 'w' else chess.BLACK
             break
+
+    # Pondering: the reply the running search assumes, and its result if it
+    # finished before the human moved
+    expected_move = None
+    ponder_result = None
+    search_start = None
+
+    def play_engine_move(data):
+        nonlocal expected_move
+        ui.thinking = False
+        move_uci = data['move']
+        nodes = data['nodes']
+        # For a ponder hit: the time the human waited
+        duration = time.perf_counter() - search_start
+        if not move_uci:
+            return
+
+        # Re-create move object bound to the current board state
+        ai_move = chess.Move.from_uci(move_uci)
+        if ai_move in game.get_board().legal_moves:
+            game.make_move(ai_move)
+        print(f"AI Move: {ai_move} | Nodes: {nodes} | Time: {duration:.3f}s | NPS: {int(nodes/duration) if duration > 0 else 0}")
+
+        # Think on the human's time about the reply we expect
+        pv = data['pv']
+        if args.ponder and len(pv) > 1 and pv[0] == move_uci and not game.is_game_over():
+            expected_move = chess.Move.from_uci(pv[1])
+            if expected_move in game.get_board().legal_moves:
+                ponder_board = game.get_board().copy()
+                ponder_board.push(expected_move)
+                worker.submit(ponder_board)
+            else:
+                expected_move = None
             
+    events = []
     running = True
     while running:
         # 1. Event Handling
-        for event in pygame.event.get():
+        for event in events:
             if event.type == pygame.QUIT:
                 running = False
             
@@ -27,62 +80,57 @@ def main():
                 move = ui.update_selection(game.get_board(), player_color)
                 if move:
                     game.make_move(move)
+                    if expected_move is not None:
+                        search_start = time.perf_counter()
+                        if move != expected_move:
+                            # Miss: drop the ponder search, its TT entries stay in the worker
+                            worker.cancel()
+                        elif ponder_result is not None:
+                            # Hit, and the answer is already there
+                            play_engine_move(ponder_result)
+                        else:
+                            # Hit: the running search is already on this position
+                            ui.thinking = True
+                        expected_move = None
+                        ponder_result = None
 
         # 2. AI Turn logic
         # Check for AI Result FIRST
-        if hasattr(ui, 'ai_result') and ui.ai_result:
-            move_uci, nodes, duration = ui.ai_result
-            ui.ai_result = None # Reset
-            
-            if move_uci:
-                # Re-create move object bound to the current board state
-                ai_move = chess.Move.from_uci(move_uci)
-                if ai_move in game.get_board().legal_moves:
-                    game.make_move(ai_move)
-                print(f"AI Move: {ai_move} | Nodes: {nodes} | Time: {duration:.3f}s | NPS: {int(nodes/duration) if duration > 0 else 0}")
+        try:
+            messages = worker.poll()
+        except WorkerError as e:
+            print(f"Engine error: {e}")
+            break
+        for kind, _, data in messages:
+            if kind == "error":
+                print(f"Engine error: {data['message']}")
+                ui.thinking = False
+            elif kind == "bestmove":
+                if ui.thinking:
+                    play_engine_move(data)
+                elif expected_move is not None:
+                    ponder_result = data
        
-        # Check if we need to start AI thread
+        # Check if we need to start a search
         if not game.is_game_over() and game.get_board().turn != player_color:
-            if not getattr(ui, 'thinking', False):
+            if not ui.thinking:
                 ui.thinking = True
-                
-                # Start AI in a separate thread
-                import threading
-                def ai_task():
-                    import time
-                    start_time = time.perf_counter()
-                    # Copy board for thread safety
-                    board_copy = game.get_board().copy()
-                    best_move, nodes = engine.get_best_move(board_copy)
-                    duration = time.perf_counter() - start_time
-                    
-                    # Convert move to UCI string to pass safely between threads/contexts
-                    move_uci = best_move.uci() if best_move else None
-                    ui.ai_result = (move_uci, nodes, duration)
-                    ui.thinking = False
-
-                threading.Thread(target=ai_task, daemon=True).start()
+                search_start = time.perf_counter()
+                worker.submit(game.get_board())
                     
-        # 3. Drawing
-        ui.draw_board(game.get_board(), player_color)
-        
-        if getattr(ui, 'thinking', False):
-            font = pygame.font.Font(None, 40)
-            text = font.render("AI is thinking...", True, (50, 50, 50))
-            rect = text.get_rect(center=(300, 300))
-            ui.screen.blit(text, rect)
+        # 3. Drawing: only what changed
+        messages = []
+        if ui.thinking:
+            messages.append(("AI is thinking...", 40, (50, 50, 50), (300, 300)))
         
         # Check Winner
-        if game.is_game_over():
-             font = pygame.font.Font(None, 60)
+        game_over = game.is_game_over()
+        if game_over:
              if game.get_board().is_checkmate():
                  winner = "Black" if game.get_board().turn == chess.WHITE else "White"
-                 text = font.render(f"Checkmate! {winner} Wins!", True, (200, 50, 50))
+                 messages.append((f"Checkmate! {winner} Wins!", 60, (200, 50, 50), (400, 400)))
              else:
-                 text = font.render("Draw / Stalemate", True, (50, 50, 200))
-             
-             rect = text.get_rect(center=(400, 400))
-             ui.screen.blit(text, rect)
+                 messages.append(("Draw / Stalemate", 60, (50, 50, 200), (400, 400)))
 
              # Print FEN once
              if not getattr(game, 'fen_printed', False):
@@ -90,9 +138,16 @@ def main():
                  print(f"Final FEN: {game.get_board().fen()}")
                  game.fen_printed = True
 
-        pygame.display.flip()
-        ui.clock.tick(60)
+        ui.draw_board(game.get_board(), player_color, messages)
+
+        # 4. Idle: sleep until the next event, waking up regularly only
+        # while the engine has to be polled (or started)
+        if ui.thinking or (not game_over and game.get_board().turn != player_color):
+            events = ui.wait_for_events(ENGINE_POLL_MS)
+        else:
+            events = ui.wait_for_events()
 
+    worker.close()
     pygame.quit()
 
 if __name__ == "__main__":
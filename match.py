@@ -0,0 +1,408 @@
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+from batch import read_positions
+from bench import BENCH_POSITIONS
+from search import SearchEngine, SEARCH_MODES
+import argparse
+import chess
+import chess.pgn
+import json
+import math
+import multiprocessing
+import os
+import sys
+import time
+
+# Engine-vs-engine matches between two SearchEngine configurations, "A" (the
+# candidate) and "B" (the baseline). Every opening is played twice with
+# colours reversed, games run concurrently in a pool of engine processes.
+# Results are appended to a JSONL file as games finish, so an interrupted
+# match continues with --resume; the PGN is rebuilt from it at the end.
+
+# Options an engine spec may set, e.g. "search_mode=pvs,depth=6" or "nodes=20000"
+ENGINE_KEYS = ("depth", "hash_mb", "threads", "search_mode", "strict_terminal", "time", "nodes")
+DEFAULT_DEPTH = 4 # Without a time or node budget
+MAX_DEPTH = 64
+
+# Adjudication, on the scores the engines report after their own moves
+RESIGN_SCORE = 1000 # Centipawns
+RESIGN_PLIES = 6 # Consecutive plies (both engines) agreeing the game is lost
+DRAW_SCORE = 10
+DRAW_PLIES = 12
+DRAW_AFTER = 60 # Plies played before a draw can be adjudicated
+MAX_PLIES = 400
+
+# Floor of the per-game score variance in sprt_llr, about that of a match
+# with 96% draws
+MIN_SCORE_VARIANCE = 0.01
+
+# Per-process engines, created once by the pool initializer
+_worker_engines = None
+
+def parse_engine(spec):
+    """
+    Engine options from a comma separated key=value list. Returns a dict
+    with the SearchEngine arguments and the per-move 'time'/'nodes' budget.
+    """
+    options = {}
+    for item in filter(None, (part.strip() for part in spec.split(","))):
+        key, _, value = item.partition("=")
+        if key not in ENGINE_KEYS:
+            raise ValueError(f"Unknown engine option {key!r} (expected one of {', '.join(ENGINE_KEYS)})")
+        if key == "search_mode":
+            if value not in SEARCH_MODES:
+                raise ValueError(f"Unknown search mode {value!r}")
+            options[key] = value
+        elif key == "strict_terminal":
+            options[key] = value.lower() in ("1", "true", "yes", "")
+        elif key == "time":
+            options[key] = float(value)
+        else:
+            options[key] = int(value)
+    return options
+
+def read_openings(path):
+    """
+    Yields (opening_id, fen, moves). From a PGN every game's mainline is an
+    opening (its moves go into the output PGN), otherwise every position of
+    an EPD/FEN file (see batch.read_positions).
+    """
+    if os.path.splitext(path)[1].lower() != ".pgn":
+        for position_id, fen in read_positions(path):
+            yield position_id, fen, []
+        return
+    with open(path, encoding="utf-8", errors="replace") as f:
+        game_number = 0
+        while True:
+            game = chess.pgn.read_game(f)
+            if game is None:
+                break
+            game_number += 1
+            yield f"{path}:{game_number}", game.board().fen(), [move.uci() for move in game.mainline_moves()]
+
+def elo_from_score(score):
+    if score <= 0.0:
+        return -math.inf
+    if score >= 1.0:
+        return math.inf
+    return -400 * math.log10(1 / score - 1)
+
+def score_from_elo(elo):
+    return 1 / (1 + 10 ** (-elo / 400))
+
+def score_stats(wins, draws, losses):
+    """Mean score per game and its variance (trinomial model)."""
+    games = wins + draws + losses
+    if games == 0:
+        return 0.5, 0.0
+    mean = (wins + 0.5 * draws) / games
+    variance = (wins * (1 - mean) ** 2 + draws * (0.5 - mean) ** 2 + losses * mean ** 2) / games
+    return mean, variance
+
+def elo_interval(wins, draws, losses, z=1.96):
+    """Returns (elo, low, high), a 95% confidence interval by default."""
+    games = wins + draws + losses
+    mean, variance = score_stats(wins, draws, losses)
+    margin = z * math.sqrt(variance / games) if games else 0.0
+    return elo_from_score(mean), elo_from_score(mean - margin), elo_from_score(mean + margin)
+
+def sprt_llr(wins, draws, losses, elo0, elo1):
+    """
+    Log-likelihood ratio of H1 (A is elo1 stronger) against H0 (elo0), in
+    the normal approximation of the trinomial model.
+    """
+    games = wins + draws + losses
+    if games == 0:
+        return 0.0
+    mean, variance = score_stats(wins, draws, losses)
+    # All draws, or all wins, has no spread yet: floor it so that such a
+    # one-sided result still moves the LLR towards a bound
+    variance = max(variance, MIN_SCORE_VARIANCE)
+    s0, s1 = score_from_elo(elo0), score_from_elo(elo1)
+    return games * (s1 - s0) * (2 * mean - s0 - s1) / (2 * variance)
+
+def sprt_bounds(alpha, beta):
+    return math.log(beta / (1 - alpha)), math.log((1 - beta) / alpha)
+
+def sprt_verdict(llr, alpha, beta):
+    lower, upper = sprt_bounds(alpha, beta)
+    if llr >= upper:
+        return "H1"
+    if llr <= lower:
+        return "H0"
+    return None
+
+def _init_worker(engine_options):
+    global _worker_engines
+    _worker_engines = {}
+    for name, options in engine_options.items():
+        options = dict(options)
+        time_limit = options.pop('time', None)
+        node_limit = options.pop('nodes', None)
+        depth = options.pop('depth', MAX_DEPTH if time_limit or node_limit else DEFAULT_DEPTH)
+        _worker_engines[name] = (SearchEngine(depth, verbose=False, **options), time_limit, node_limit)
+
+def play_game(engines, index, fen, opening_moves, white, adjudicate=True):
+    """
+    Plays one game from the opening with `white` ("A" or "B") as White.
+    Returns the JSON record of the game.
+    """
+    board = chess.Board(fen)
+    for uci in opening_moves:
+        board.push_uci(uci)
+    black = "B" if white == "A" else "A"
+    stats = {}
+    for name, (engine, _, _) in engines.items():
+        # Every game starts from an empty table, games stay independent
+        engine.transposition_table.clear()
+        stats[name] = {'moves': 0, 'nodes': 0, 'time': 0.0, 'depth': 0}
+
+    moves = []
+    resign_plies = 0
+    resign_sign = 0
+    draw_plies = 0
+    result = reason = None
+    while True:
+        outcome = board.outcome(claim_draw=True)
+        if outcome is not None:
+            result, reason = outcome.result(), outcome.termination.name.lower()
+            break
+        if len(moves) >= MAX_PLIES:
+            result, reason = "1/2-1/2", "max_plies"
+            break
+
+        name = white if board.turn == chess.WHITE else black
+        engine, time_limit, node_limit = engines[name]
+        start = time.perf_counter()
+        move, nodes = engine.get_best_move(board, time_limit=time_limit, node_limit=node_limit)
+        duration = time.perf_counter() - start
+        side = stats[name]
+        side['moves'] += 1
+        side['nodes'] += nodes
+        side['time'] += duration
+        side['depth'] += engine.completed_depth
+        board.push(move)
+        moves.append(move.uci())
+
+        if not adjudicate:
+            continue
+        # White's perspective, like every SearchEngine score
+        score = engine.best_score
+        if abs(score) >= RESIGN_SCORE:
+            sign = 1 if score > 0 else -1
+            resign_plies = resign_plies + 1 if sign == resign_sign else 1
+            resign_sign = sign
+        else:
+            resign_plies = 0
+        draw_plies = draw_plies + 1 if abs(score) <= DRAW_SCORE else 0
+
+        # Both engines agree on the winner for several moves
+        if resign_plies >= RESIGN_PLIES:
+            result, reason = ("1-0" if resign_sign > 0 else "0-1"), "adjudicated_win"
+            break
+        if draw_plies >= DRAW_PLIES and len(moves) >= DRAW_AFTER:
+            result, reason = "1/2-1/2", "adjudicated_draw"
+            break
+
+    points = {"1-0": 1.0, "0-1": 0.0, "1/2-1/2": 0.5}[result]
+    return {
+        'index': index,
+        'fen': fen,
+        'opening_moves': list(opening_moves),
+        'white': white,
+        'result': result,
+        'reason': reason,
+        'score_a': points if white == "A" else 1.0 - points,
+        'moves': moves,
+        'stats': stats
+    }
+
+def _play(index, fen, opening_moves, white, adjudicate):
+    return play_game(_worker_engines, index, fen, opening_moves, white, adjudicate)
+
+class MatchStats:
+    """Running totals from A's point of view."""
+    def __init__(self):
+        self.wins = 0
+        self.draws = 0
+        self.losses = 0
+        self.sides = {name: {'moves': 0, 'nodes': 0, 'time': 0.0, 'depth': 0} for name in ("A", "B")}
+
+    def add(self, record):
+        if record['score_a'] == 1.0:
+            self.wins += 1
+        elif record['score_a'] == 0.0:
+            self.losses += 1
+        else:
+            self.draws += 1
+        for name, side in record['stats'].items():
+            for key, value in side.items():
+                self.sides[name][key] += value
+
+    def games(self):
+        return self.wins + self.draws + self.losses
+
+    def side_summary(self, name):
+        side = self.sides[name]
+        nps = int(side['nodes'] / side['time']) if side['time'] > 0 else 0
+        depth = side['depth'] / side['moves'] if side['moves'] else 0.0
+        return nps, depth
+
+def format_elo(elo):
+    return f"{elo:+.1f}" if math.isfinite(elo) else ("+inf" if elo > 0 else "-inf")
+
+def game_to_pgn(record, names):
+    board = chess.Board(record['fen'])
+    game = chess.pgn.Game()
+    game.setup(board)
+    white = record['white']
+    black = "B" if white == "A" else "A"
+    game.headers["Event"] = "Engine match"
+    game.headers["Round"] = str(record['index'] + 1)
+    game.headers["White"] = names[white]
+    game.headers["Black"] = names[black]
+    game.headers["Result"] = record['result']
+    game.headers["Termination"] = record['reason']
+    node = game
+    for uci in record['opening_moves'] + record['moves']:
+        node = node.add_variation(chess.Move.from_uci(uci))
+    return str(game)
+
+def load_results(path, settings):
+    """
+    Records of finished games in `path`. The first line holds the match
+    settings, which must equal `settings`. A line cut off by an interrupted
+    run is removed.
+    """
+    records = []
+    with open(path, "r+b") as f:
+        header = f.readline()
+        if header and json.loads(header) != settings:
+            raise ValueError(f"{path} was written by a match with different settings")
+        offset = f.tell()
+        for line in f:
+            try:
+                records.append(json.loads(line))
+            except ValueError:
+                break
+            offset += len(line)
+        f.truncate(offset)
+    return records
+
+def run_match(engine_a, engine_b, output_path, openings=None, games=None, workers=None, adjudicate=True,
+              elo0=0.0, elo1=5.0, alpha=0.05, beta=0.05, sprt_stop=False, pgn_path=None, resume=False, out=sys.stderr):
+    """
+    Plays the match and returns its MatchStats. `engine_a`/`engine_b` are
+    engine specs (see parse_engine), `openings` a list of (id, fen, moves).
+    """
+    names = {"A": engine_a, "B": engine_b}
+    engine_options = {"A": parse_engine(engine_a), "B": parse_engine(engine_b)}
+    openings = openings or [(str(i), fen, []) for i, fen in enumerate(BENCH_POSITIONS)]
+    games = games or 2 * len(openings)
+    workers = workers or os.cpu_count() or 1
+    # A resumed match may play more games, but nothing else may change
+    settings = {'type': 'match', 'engines': names, 'adjudicate': adjudicate,
+                'openings': [[fen, moves] for _, fen, moves in openings]}
+
+    stats = MatchStats()
+    done = set()
+    if resume and os.path.exists(output_path):
+        for record in load_results(output_path, settings):
+            stats.add(record)
+            done.add(record['index'])
+        output = open(output_path, "a")
+    else:
+        output = open(output_path, "w")
+        output.write(json.dumps(settings) + "\n")
+        output.flush()
+
+    def decided():
+        llr = sprt_llr(stats.wins, stats.draws, stats.losses, elo0, elo1)
+        return sprt_stop and sprt_verdict(llr, alpha, beta) is not None
+
+    def record_result(record):
+        output.write(json.dumps(record) + "\n")
+        output.flush()
+        stats.add(record)
+        elo, low, high = elo_interval(stats.wins, stats.draws, stats.losses)
+        llr = sprt_llr(stats.wins, stats.draws, stats.losses, elo0, elo1)
+        print(f"Game {record['index'] + 1}/{games}: {record['white']} as White {record['result']} ({record['reason']}) | "
+              f"A +{stats.wins} ={stats.draws} -{stats.losses} | Elo {format_elo(elo)} [{format_elo(low)}, {format_elo(high)}] | "
+              f"LLR {llr:.2f}", file=out)
+
+    context = multiprocessing.get_context("spawn")
+    start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=workers, mp_context=context, initializer=_init_worker,
+                             initargs=(engine_options,)) as pool:
+        pending = set()
+        for index in range(games):
+            if index in done:
+                continue
+            if decided():
+                break
+            while len(pending) >= workers * 2:
+                finished, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    record_result(future.result())
+            _, fen, moves = openings[(index // 2) % len(openings)]
+            white = "A" if index % 2 == 0 else "B"
+            pending.add(pool.submit(_play, index, fen, moves, white, adjudicate))
+        for future in wait(pending)[0]:
+            record_result(future.result())
+    output.close()
+
+    if pgn_path:
+        records = load_results(output_path, settings)
+        with open(pgn_path, "w") as f:
+            for record in sorted(records, key=lambda record: record['index']):
+                f.write(game_to_pgn(record, names) + "\n\n")
+
+    print(f"Played {stats.games()} games in {time.perf_counter() - start:.1f}s", file=out)
+    return stats
+
+def report(stats, elo0, elo1, alpha, beta, out=sys.stdout):
+    elo, low, high = elo_interval(stats.wins, stats.draws, stats.losses)
+    llr = sprt_llr(stats.wins, stats.draws, stats.losses, elo0, elo1)
+    lower, upper = sprt_bounds(alpha, beta)
+    verdict = sprt_verdict(llr, alpha, beta)
+    print(f"Games     : {stats.games()} (A +{stats.wins} ={stats.draws} -{stats.losses})", file=out)
+    print(f"Elo (A-B) : {format_elo(elo)} [{format_elo(low)}, {format_elo(high)}] (95%)", file=out)
+    print(f"SPRT      : elo0 {elo0} elo1 {elo1} LLR {llr:.2f} [{lower:.2f}, {upper:.2f}] -> "
+          + {"H1": "H1 accepted (A is stronger)", "H0": "H0 accepted (no gain)", None: "inconclusive"}[verdict], file=out)
+    for name in ("A", "B"):
+        nps, depth = stats.side_summary(name)
+        print(f"Engine {name}  : {nps} nps, average depth {depth:.2f}", file=out)
+
+def main():
+    parser = argparse.ArgumentParser(description="Play a match between two engine configurations")
+    parser.add_argument("-a", "--engine-a", required=True, help="Candidate, e.g. 'search_mode=pvs,nodes=20000'")
+    parser.add_argument("-b", "--engine-b", required=True, help="Baseline, same format")
+    parser.add_argument("-o", "--output", required=True, help="JSONL results file")
+    parser.add_argument("--openings", nargs="+", default=None, help=".epd, .pgn or one-FEN-per-line files (default: the bench positions)")
+    parser.add_argument("--games", type=int, default=None, help="Games to play (default: every opening with both colours)")
+    parser.add_argument("--workers", type=int, default=None, help="Engine processes (default: CPU count)")
+    parser.add_argument("--pgn", default=None, help="Write all games to this PGN file at the end")
+    parser.add_argument("--no-adjudicate", action="store_true", help="Play every game to the end (or the ply limit)")
+    parser.add_argument("--elo0", type=float, default=0.0)
+    parser.add_argument("--elo1", type=float, default=5.0)
+    parser.add_argument("--alpha", type=float, default=0.05)
+    parser.add_argument("--beta", type=float, default=0.05)
+    parser.add_argument("--sprt", action="store_true", help="Stop as soon as the SPRT accepts a hypothesis")
+    parser.add_argument("--resume", action="store_true", help="Continue the match in OUTPUT")
+    args = parser.parse_args()
+
+    try:
+        parse_engine(args.engine_a)
+        parse_engine(args.engine_b)
+        openings = [opening for path in args.openings for opening in read_openings(path)] if args.openings else None
+    except ValueError as e:
+        parser.error(str(e))
+
+    stats = run_match(
+        args.engine_a, args.engine_b, args.output, openings=openings, games=args.games, workers=args.workers,
+        adjudicate=not args.no_adjudicate, elo0=args.elo0, elo1=args.elo1, alpha=args.alpha, beta=args.beta,
+        sprt_stop=args.sprt, pgn_path=args.pgn, resume=args.resume
+    )
+    report(stats, args.elo0, args.elo1, args.alpha, args.beta)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,194 @@
+from evaluation import PIECE_VALUES
+import chess
+
+MAX_PLY = 128
+
+# Ordering scores, highest first:
+# hash/PV move > captures (MVV-LVA) and promotions > killers > quiet moves by history
+HASH_MOVE_SCORE = 1_000_000
+CAPTURE_SCORE = 100_000
+PROMOTION_SCORE = 90_000
+KILLER_SCORES = (80_000, 79_000)
+HISTORY_MAX = 50_000
+
+# MVV-LVA (Most Valuable Victim - Least Valuable Aggressor), indexed by piece type
+ORDER_VALUES = [0, 1, 3, 3, 5, 9, 100]
+MVV_LVA = [[10 * ORDER_VALUES[victim] - ORDER_VALUES[attacker] for attacker in range(7)] for victim in range(7)]
+
+# Static exchange evaluation values, indexed by piece type
+SEE_VALUES = [0] + [PIECE_VALUES[piece_type] for piece_type in chess.PIECE_TYPES]
+
+def attackers_with_occupancy(board, square, occupied):
+    """
+    Pieces of both colors attacking `square` when only `occupied` squares are
+    filled, so sliders behind a removed piece (x-rays) show up.
+    """
+    queens_and_rooks = board.queens | board.rooks
+    queens_and_bishops = board.queens | board.bishops
+    attackers = (
+        (chess.BB_KING_ATTACKS[square] & board.kings) |
+        (chess.BB_KNIGHT_ATTACKS[square] & board.knights) |
+        (chess.BB_RANK_ATTACKS[square][chess.BB_RANK_MASKS[square] & occupied] & queens_and_rooks) |
+        (chess.BB_FILE_ATTACKS[square][chess.BB_FILE_MASKS[square] & occupied] & queens_and_rooks) |
+        (chess.BB_DIAG_ATTACKS[square][chess.BB_DIAG_MASKS[square] & occupied] & queens_and_bishops) |
+        (chess.BB_PAWN_ATTACKS[chess.WHITE][square] & board.pawns & board.occupied_co[chess.BLACK]) |
+        (chess.BB_PAWN_ATTACKS[chess.BLACK][square] & board.pawns & board.occupied_co[chess.WHITE])
+    )
+    return attackers & occupied
+
+def see(board, move):
+    """
+    Static exchange evaluation: material balance (for the side to move) of
+    the capture sequence on the target square, both sides always recapturing
+    with their least valuable attacker and free to stop. Pins are ignored.
+    """
+    to_square = move.to_square
+    from_square = move.from_square
+    attacker_type = board.piece_type_at(from_square)
+    victim_type = board.piece_type_at(to_square)
+    occupied = board.occupied ^ chess.BB_SQUARES[from_square]
+    if victim_type is None:
+        if attacker_type == chess.PAWN and to_square == board.ep_square:
+            victim_type = chess.PAWN
+            occupied ^= chess.BB_SQUARES[to_square - 8 if board.turn else to_square + 8]
+        else:
+            victim_type = 0
+
+    gains = [SEE_VALUES[victim_type]]
+    if move.promotion:
+        gains[0] += SEE_VALUES[move.promotion] - SEE_VALUES[chess.PAWN]
+        attacker_type = move.promotion
+
+    side = not board.turn
+    on_square = SEE_VALUES[attacker_type]
+    while True:
+        candidates = attackers_with_occupancy(board, to_square, occupied) & board.occupied_co[side]
+        if not candidates:
+            break
+        for piece_type in chess.PIECE_TYPES:
+            attacker = candidates & board.pieces_mask(piece_type, side)
+            if attacker:
+                break
+        gains.append(on_square - gains[-1])
+        occupied ^= attacker & -attacker
+        on_square = SEE_VALUES[piece_type]
+        side = not side
+
+    for i in range(len(gains) - 1, 0, -1):
+        gains[i - 1] = -max(-gains[i - 1], gains[i])
+    return gains[0]
+
+def staged_captures(board):
+    """
+    Quiescence move generator. Yields (move, material_gain) in stages, only
+    generating a stage when the previous one didn't cut off:
+    1. Captures, most valuable victim first, cheapest attacker first
+    2. Non-capturing queen promotions (only when a pawn is about to promote)
+    Under-promotions are skipped.
+    """
+    piece_type_at = board.piece_type_at
+    captures = list(board.generate_legal_captures())
+    if captures:
+        # En-passant is the only capture onto an empty square
+        captures.sort(key=lambda move: MVV_LVA[piece_type_at(move.to_square) or chess.PAWN][piece_type_at(move.from_square)], reverse=True)
+        for move in captures:
+            gain = SEE_VALUES[piece_type_at(move.to_square) or chess.PAWN]
+            if move.promotion:
+                if move.promotion != chess.QUEEN:
+                    continue
+                gain += SEE_VALUES[chess.QUEEN] - SEE_VALUES[chess.PAWN]
+            yield move, gain
+
+    promoters = board.pawns & board.occupied_co[board.turn] & (chess.BB_RANK_7 if board.turn else chess.BB_RANK_2)
+    if promoters:
+        for move in board.generate_legal_moves(promoters, ~board.occupied & chess.BB_ALL):
+            if move.promotion == chess.QUEEN:
+                yield move, SEE_VALUES[chess.QUEEN] - SEE_VALUES[chess.PAWN]
+
+class MoveOrderer:
+    """
+    Move ordering state for one search: two killer moves per ply and a
+    butterfly history table (color x from x to) bumped on beta cutoffs.
+    """
+    def __init__(self):
+        self.killers = [[None, None] for _ in range(MAX_PLY)]
+        self.history = [[0] * 4096 for _ in range(2)]
+        self.cutoffs = 0
+        self.first_move_cutoffs = 0
+
+    def new_search(self):
+        for slot in self.killers:
+            slot[0] = slot[1] = None
+        # Keep what history learned last move, but let it fade
+        for table in self.history:
+            for i in range(4096):
+                table[i] >>= 1
+        self.cutoffs = 0
+        self.first_move_cutoffs = 0
+
+    def order(self, board, ply=0, hash_move=None, only_captures=False):
+        """
+        Returns the legal moves (or only the captures) sorted best first.
+        """
+        if only_captures:
+            moves = list(board.generate_legal_captures())
+        else:
+            moves = list(board.legal_moves)
+
+        piece_type_at = board.piece_type_at
+        enemies = board.occupied_co[not board.turn]
+        ep_square = board.ep_square
+        pawns = board.pawns
+        killer1, killer2 = self.killers[ply] if ply < MAX_PLY else (None, None)
+        history = self.history[board.turn]
+
+        def score(move):
+            if move == hash_move:
+                return HASH_MOVE_SCORE
+            to_square = move.to_square
+            from_square = move.from_square
+            if enemies & chess.BB_SQUARES[to_square]:
+                value = CAPTURE_SCORE + MVV_LVA[piece_type_at(to_square)][piece_type_at(from_square)]
+                if move.promotion:
+                    value += PROMOTION_SCORE
+                return value
+            if to_square == ep_square and pawns & chess.BB_SQUARES[from_square]:
+                return CAPTURE_SCORE + MVV_LVA[chess.PAWN][chess.PAWN]
+            if move.promotion:
+                return PROMOTION_SCORE
+            if move == killer1:
+                return KILLER_SCORES[0]
+            if move == killer2:
+                return KILLER_SCORES[1]
+            return history[from_square * 64 + to_square]
+
+        moves.sort(key=score, reverse=True)
+        return moves
+
+    def record_cutoff(self, board, move, depth, ply, move_index):
+        """
+        Called after a beta cutoff by `move`, with the board back in the
+        position where it was played.
+        """
+        self.cutoffs += 1
+        if move_index == 0:
+            self.first_move_cutoffs += 1
+
+        if move.promotion or board.is_capture(move):
+            return
+
+        if ply < MAX_PLY:
+            killers = self.killers[ply]
+            if killers[0] != move:
+                killers[1] = killers[0]
+                killers[0] = move
+
+        table = self.history[board.turn]
+        index = move.from_square * 64 + move.to_square
+        table[index] += depth * depth
+        if table[index] > HISTORY_MAX:
+            for i in range(4096):
+                table[i] >>= 1
+
+    def first_move_cutoff_rate(self):
+        return self.first_move_cutoffs / self.cutoffs if self.cutoffs else 0.0
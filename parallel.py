@@ -0,0 +1,148 @@
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+import multiprocessing
+from search import SearchEngine
+from transposition import table_bytes
+import argparse
+import chess
+import time
+
+# Per-process engine, created once by the pool initializer
+_worker_engine = None
+_worker_shm = None
+
+def _init_worker(shm_name, depth, hash_mb, stop_event, search_mode, tablebases):
+    global _worker_engine, _worker_shm
+    # The coordinator owns the block and unlinks it, workers only attach
+    _worker_shm = shared_memory.SharedMemory(name=shm_name, track=False)
+    if tablebases is not None:
+        # (paths, probe_limit): every worker opens its own file handles
+        from tablebase import Tablebases
+        tablebases = Tablebases(*tablebases)
+    _worker_engine = SearchEngine(depth, hash_mb=hash_mb, verbose=False, tt_buffer=_worker_shm.buf, search_mode=search_mode, tablebases=tablebases)
+    _worker_engine.stop_signal = stop_event
+
+def _search_root_moves(root_fen, move_stack, root_moves, depth, age, node_limit=None, time_limit=None):
+    """
+    Runs iterative deepening on a subset of the root moves.
+    Returns (best_move_uci, score, nodes, completed_depth).
+    """
+    board = chess.Board(root_fen)
+    for uci in move_stack:
+        board.push(chess.Move.from_uci(uci))
+
+    engine = _worker_engine
+    engine.depth = depth
+    # get_best_move bumps the age, keep every worker on the coordinator's age
+    engine.transposition_table.age = (age - 1) & 63
+    moves = [chess.Move.from_uci(uci) for uci in root_moves]
+    best_move, nodes = engine.get_best_move(board, root_moves=moves, time_limit=time_limit, node_limit=node_limit)
+    return (best_move.uci() if best_move else None, engine.best_score, nodes, engine.completed_depth)
+
+class ParallelSearch:
+    """
+    Root-splitting parallel search. The root moves are dealt round-robin
+    (in move-ordering order) to `threads` worker processes, which all read
+    and write one transposition table held in shared memory.
+    """
+    def __init__(self, depth, threads, hash_mb=16, search_mode="minimax", tablebases=None):
+        self.depth = depth
+        self.threads = threads
+        self.hash_mb = hash_mb
+        self.shm = shared_memory.SharedMemory(create=True, size=table_bytes(hash_mb))
+        # Spawn rather than fork: forking from a search thread while another
+        # thread holds a lock (e.g. a blocking stdin read in uci.py) deadlocks
+        context = multiprocessing.get_context("spawn")
+        self.stop_event = context.Event()
+        # Coordinator view on the shared table, used for root move ordering and aging
+        self.engine = SearchEngine(depth, hash_mb=hash_mb, verbose=False, tt_buffer=self.shm.buf)
+        self.engine.transposition_table.clear()
+        self.pool = ProcessPoolExecutor(
+            max_workers=threads,
+            mp_context=context,
+            initializer=_init_worker,
+            initargs=(self.shm.name, depth, hash_mb, self.stop_event, search_mode, tablebases)
+        )
+
+    def stop(self):
+        self.stop_event.set()
+
+    def reset_stop(self):
+        self.stop_event.clear()
+
+    def search(self, board, node_limit=None, time_limit=None):
+        """
+        Returns (best_move, score, nodes, depth) merged over all workers.
+        A node limit is split evenly between the workers.
+        """
+        tt = self.engine.transposition_table
+        tt.new_search()
+
+        moves = [move.uci() for move in self.engine.order_moves(board)]
+        if not moves:
+            return None, 0, 0, 0
+
+        root = board.root()
+        move_stack = [move.uci() for move in board.move_stack]
+        groups = [group for group in (moves[i::self.threads] for i in range(self.threads)) if group]
+        worker_limit = node_limit // len(groups) if node_limit is not None else None
+        futures = [
+            self.pool.submit(_search_root_moves, root.fen(), move_stack, group, self.depth, tt.age, worker_limit, time_limit)
+            for group in groups
+        ]
+
+        best_move = None
+        best_score = None
+        best_depth = 0
+        total_nodes = 0
+        for future in futures:
+            move_uci, score, nodes, depth = future.result()
+            total_nodes += nodes
+            if move_uci is None:
+                continue
+            better = best_score is None or (score > best_score if board.turn == chess.WHITE else score < best_score)
+            if better:
+                best_move = chess.Move.from_uci(move_uci)
+                best_score = score
+                best_depth = depth
+
+        return best_move, best_score, total_nodes, best_depth
+
+    def close(self):
+        self.pool.shutdown(wait=True, cancel_futures=True)
+        self.engine.close()
+        self.shm.close()
+        self.shm.unlink()
+
+def benchmark(fen, depth, worker_counts, hash_mb):
+    board = chess.Board(fen)
+    baseline = None
+    print(f"{'workers':>7} {'time (s)':>9} {'nodes':>10} {'nps':>9} {'speedup':>8}  move")
+    for workers in worker_counts:
+        engine = SearchEngine(depth, hash_mb=hash_mb, threads=workers, verbose=False)
+        if workers > 1:
+            # Start the pool outside the timed region
+            engine.parallel = ParallelSearch(depth, workers, hash_mb)
+            engine.parallel.pool.submit(int).result()
+
+        start = time.perf_counter()
+        move, nodes = engine.get_best_move(board.copy())
+        duration = time.perf_counter() - start
+        engine.close()
+
+        if baseline is None:
+            baseline = duration
+        nps = int(nodes / duration) if duration > 0 else 0
+        print(f"{workers:>7} {duration:>9.3f} {nodes:>10} {nps:>9} {baseline / duration:>7.2f}x  {move}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Parallel search scaling benchmark")
+    parser.add_argument("--fen", default="r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R w KQkq - 0 1")
+    parser.add_argument("--depth", type=int, default=4)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--hash", type=int, default=64, help="Transposition table size in MB")
+    args = parser.parse_args()
+    benchmark(args.fen, args.depth, args.workers, args.hash)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,189 @@
+from concurrent.futures import ProcessPoolExecutor
+from zobrist import compute_hash, update_hash
+import argparse
+import chess
+import multiprocessing
+import sys
+import time
+
+# Move-generation benchmark and correctness guard: counts the leaf nodes of
+# the legal move tree and compares them to well-known reference counts.
+
+# (name, fen, [expected nodes at depth 1, 2, ...])
+PERFT_SUITE = [
+    ("startpos", chess.STARTING_FEN, [20, 400, 8902, 197281, 4865609]),
+    ("kiwipete", "r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R w KQkq - 0 1", [48, 2039, 97862, 4085603]),
+    ("position3", "8/2p5/3p4/KP5r/1R3p1k/8/4P1P1/8 w - - 0 1", [14, 191, 2812, 43238, 674624]),
+    ("position4", "r3k2r/Pppp1ppp/1b3nbN/nP6/BBP1P3/q4N2/Pp1P2PP/R2Q1RK1 w kq - 0 1", [6, 264, 9467, 422333]),
+    ("position5", "rnbq1k1r/pp1Pbppp/2p5/8/2B5/8/PPP1NnPP/RNBQK2R w KQ - 1 8", [44, 1486, 62379, 2103487]),
+    ("position6", "r4rk1/1pp1qppp/p1np1n2/2b1p1B1/2B1P1b1/P1NP1N2/1PP1QPPP/R4RK1 w - - 0 10", [46, 2079, 89890, 3894594]),
+]
+
+class PerftCache:
+    """
+    Leaf counts keyed by (Zobrist key, depth). Cleared when it reaches
+    `max_entries` so memory stays bounded.
+    """
+    def __init__(self, max_entries=1_000_000):
+        self.max_entries = max_entries
+        self.tables = {}
+        self.size = 0
+        self.hits = 0
+
+    def get(self, key, depth):
+        table = self.tables.get(depth)
+        if table is None:
+            return None
+        count = table.get(key)
+        if count is not None:
+            self.hits += 1
+        return count
+
+    def put(self, key, depth, count):
+        if self.size >= self.max_entries:
+            self.tables = {}
+            self.size = 0
+        self.tables.setdefault(depth, {})[key] = count
+        self.size += 1
+
+def perft(board, depth):
+    if depth == 0:
+        return 1
+    if depth == 1:
+        # Bulk counting: leaves don't need to be made
+        return board.legal_moves.count()
+
+    nodes = 0
+    for move in board.legal_moves:
+        board.push(move)
+        nodes += perft(board, depth - 1)
+        board.pop()
+    return nodes
+
+def perft_hashed(board, depth, cache, key=None):
+    if key is None:
+        key = compute_hash(board)
+    if depth <= 1:
+        return perft(board, depth)
+
+    count = cache.get(key, depth)
+    if count is not None:
+        return count
+
+    nodes = 0
+    for move in board.legal_moves:
+        child_key = update_hash(board, move, key)
+        board.push(move)
+        nodes += perft_hashed(board, depth - 1, cache, child_key)
+        board.pop()
+    cache.put(key, depth, nodes)
+    return nodes
+
+def _perft_moves(fen, moves, depth, cache_entries):
+    """Worker: (uci, count) for each root move in `moves`."""
+    board = chess.Board(fen)
+    cache = PerftCache(cache_entries) if cache_entries else None
+    results = []
+    for uci in moves:
+        board.push(chess.Move.from_uci(uci))
+        count = perft_hashed(board, depth - 1, cache) if cache else perft(board, depth - 1)
+        board.pop()
+        results.append((uci, count))
+    return results
+
+def start_pool(workers):
+    """
+    Process pool for divide(). Starting the spawn processes and importing
+    this module in them takes far longer than a shallow perft, so the pool
+    is started and warmed up once, outside of any timing.
+    """
+    context = multiprocessing.get_context("spawn")
+    pool = ProcessPoolExecutor(max_workers=workers, mp_context=context)
+    # One trivial task per worker makes the pool start all of them now
+    for future in [pool.submit(_perft_moves, chess.STARTING_FEN, [], 1, 0) for _ in range(workers)]:
+        future.result()
+    return pool
+
+def divide(board, depth, workers=1, cache_entries=0, pool=None):
+    """
+    Returns [(move_uci, count)] for every root move. With workers > 1 the
+    root moves are split across `pool` (from start_pool), or across a pool
+    started for this call only.
+    """
+    moves = [move.uci() for move in board.legal_moves]
+    if depth < 1:
+        return []
+    if workers <= 1:
+        return _perft_moves(board.fen(), moves, depth, cache_entries)
+    if pool is None:
+        with start_pool(workers) as pool:
+            return divide(board, depth, workers, cache_entries, pool)
+
+    groups = [moves[i::workers] for i in range(workers)]
+    futures = [pool.submit(_perft_moves, board.fen(), group, depth, cache_entries) for group in groups if group]
+    results = {}
+    for future in futures:
+        results.update(future.result())
+    return [(uci, results[uci]) for uci in moves]
+
+def run_suite(max_depth, workers=1, cache_entries=0, out=sys.stdout, pool=None):
+    """
+    Runs every suite position up to `max_depth`. Returns True if all counts match.
+    """
+    if workers > 1 and pool is None:
+        with start_pool(workers) as pool:
+            return run_suite(max_depth, workers, cache_entries, out, pool)
+
+    all_ok = True
+    total_nodes = 0
+    total_time = 0.0
+    for name, fen, expected in PERFT_SUITE:
+        board = chess.Board(fen)
+        for depth in range(1, min(max_depth, len(expected)) + 1):
+            start = time.perf_counter()
+            nodes = sum(count for _, count in divide(board, depth, workers, cache_entries, pool))
+            duration = time.perf_counter() - start
+            ok = nodes == expected[depth - 1]
+            all_ok = all_ok and ok
+            total_nodes += nodes
+            total_time += duration
+            nps = int(nodes / duration) if duration > 0 else 0
+            print(f"{name:<10} depth {depth}  {nodes:>10}  {'ok' if ok else 'FAIL expected ' + str(expected[depth - 1]):<8} {duration:>8.3f}s {nps:>10} nps", file=out)
+
+    nps = int(total_nodes / total_time) if total_time > 0 else 0
+    print(f"Total: {total_nodes} nodes in {total_time:.3f}s ({nps} nps) - {'all ok' if all_ok else 'MISMATCH'}", file=out)
+    return all_ok
+
+def main():
+    parser = argparse.ArgumentParser(description="Perft move-generation benchmark")
+    parser.add_argument("--fen", default=chess.STARTING_FEN)
+    parser.add_argument("--depth", type=int, default=4)
+    parser.add_argument("--divide", action="store_true", help="Print the count below every root move")
+    parser.add_argument("--suite", action="store_true", help="Run the reference suite up to --depth")
+    parser.add_argument("--workers", type=int, default=1, help="Split root moves across processes")
+    parser.add_argument("--cache", type=int, default=0, help="Hashed perft cache size in entries (0 = off)")
+    args = parser.parse_args()
+
+    if args.suite:
+        sys.exit(0 if run_suite(args.depth, args.workers, args.cache) else 1)
+
+    board = chess.Board(args.fen)
+    pool = start_pool(args.workers) if args.workers > 1 else None
+    try:
+        start = time.perf_counter()
+        results = divide(board, args.depth, args.workers, args.cache, pool)
+        duration = time.perf_counter() - start
+    finally:
+        if pool is not None:
+            pool.shutdown()
+    if args.divide:
+        for uci, count in results:
+            print(f"{uci}: {count}")
+        print()
+    nodes = sum(count for _, count in results)
+    print(f"Nodes: {nodes}")
+    print(f"Time: {duration:.3f}s")
+    print(f"NPS: {int(nodes / duration) if duration > 0 else 0}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,521 @@
+from array import array
+from evaluation import MATERIAL_BY_INDEX, PST_BY_INDEX, evaluate_material
+from zobrist import ZOBRIST_TABLE, ZOBRIST_CASTLING, ZOBRIST_EP_FILE, CASTLING_INDEX, ALL_CORNERS, compute_hash
+from transposition import encode_move, decode_move
+import zobrist
+import argparse
+import chess
+import sys
+import time
+
+# Compact position for search code: twelve int bitboards, a flat mailbox
+# array and in-place make/unmake that keeps the Zobrist key (same keys as
+# zobrist.compute_hash) and the material/PST sums (same as
+# evaluation.evaluate_material) up to date. Moves are ints encoded like TT
+# moves (transposition.encode_move):
+#   from_square | to_square << 6 | promotion piece type << 12
+# Standard chess only (no 960 castling). Converted from and to chess.Board
+# at the root; `python position.py --check` walks the perft tree next to
+# python-chess and compares moves, keys and scores at every node.
+# So far it is only a perft backend: SearchEngine still searches chess.Board.
+
+BB_SQUARES = chess.BB_SQUARES
+BB_KNIGHT_ATTACKS = chess.BB_KNIGHT_ATTACKS
+BB_KING_ATTACKS = chess.BB_KING_ATTACKS
+BB_PAWN_ATTACKS = chess.BB_PAWN_ATTACKS
+BB_RANK_ATTACKS, BB_RANK_MASKS = chess.BB_RANK_ATTACKS, chess.BB_RANK_MASKS
+BB_FILE_ATTACKS, BB_FILE_MASKS = chess.BB_FILE_ATTACKS, chess.BB_FILE_MASKS
+BB_DIAG_ATTACKS, BB_DIAG_MASKS = chess.BB_DIAG_ATTACKS, chess.BB_DIAG_MASKS
+BB_RAYS = chess.BB_RAYS
+
+EMPTY = -1
+PERFT_DEPTH = 4
+# The check runs python-chess alongside at every node: depth 3 of the whole
+# suite takes about a minute, depth 4 well over ten
+CHECK_DEPTH = 3
+# Promotions in the order they are generated
+PROMOTION_TYPES = (chess.QUEEN, chess.ROOK, chess.BISHOP, chess.KNIGHT)
+# Squares that must be empty / not attacked for castling, by king target square
+CASTLING_PATHS = {
+    chess.G1: (chess.BB_F1 | chess.BB_G1, (chess.F1, chess.G1)),
+    chess.C1: (chess.BB_B1 | chess.BB_C1 | chess.BB_D1, (chess.D1, chess.C1)),
+    chess.G8: (chess.BB_F8 | chess.BB_G8, (chess.F8, chess.G8)),
+    chess.C8: (chess.BB_B8 | chess.BB_C8 | chess.BB_D8, (chess.D8, chess.C8)),
+}
+# King target square -> (rook from, rook to, castling right corner)
+CASTLING_ROOKS = {
+    chess.G1: (chess.H1, chess.F1, chess.BB_H1),
+    chess.C1: (chess.A1, chess.D1, chess.BB_A1),
+    chess.G8: (chess.H8, chess.F8, chess.BB_H8),
+    chess.C8: (chess.A8, chess.D8, chess.BB_A8),
+}
+
+class Position:
+    """
+    Mutable position. Pieces are indexed like the Zobrist table:
+    (piece_type - 1) + 6 * color, so Black's are 0-5 and White's 6-11.
+    `turn` is 1 for White and 0 for Black, `ep_square` 0 when there is none.
+    """
+    __slots__ = ("pieces", "occupied_co", "occupied", "mailbox", "turn", "castling", "ep_square",
+                 "halfmove", "fullmove", "hash", "material", "pst", "stack")
+
+    def __init__(self):
+        self.pieces = [0] * 12
+        self.occupied_co = [0, 0]
+        self.occupied = 0
+        self.mailbox = array("b", [EMPTY] * 64)
+        self.turn = 1
+        self.castling = 0
+        self.ep_square = 0
+        self.halfmove = 0
+        self.fullmove = 1
+        self.hash = 0
+        self.material = [0, 0]
+        self.pst = [0, 0]
+        # Undo records of make()
+        self.stack = []
+
+    @classmethod
+    def from_board(cls, board):
+        position = cls()
+        for square, piece in board.piece_map().items():
+            index = (piece.piece_type - 1) + 6 * int(piece.color)
+            position.pieces[index] |= BB_SQUARES[square]
+            position.mailbox[square] = index
+            position.material[piece.color] += MATERIAL_BY_INDEX[index]
+            position.pst[piece.color] += PST_BY_INDEX[index][square]
+        position.occupied_co = [board.occupied_co[chess.BLACK], board.occupied_co[chess.WHITE]]
+        position.occupied = board.occupied
+        position.turn = int(board.turn)
+        position.castling = board.clean_castling_rights() & ALL_CORNERS
+        position.ep_square = board.ep_square or 0
+        position.halfmove = board.halfmove_clock
+        position.fullmove = board.fullmove_number
+        position.hash = compute_hash(board)
+        return position
+
+    def fen(self):
+        rows = []
+        for rank in range(7, -1, -1):
+            row = ""
+            empty = 0
+            for file in range(8):
+                index = self.mailbox[rank * 8 + file]
+                if index == EMPTY:
+                    empty += 1
+                    continue
+                if empty:
+                    row += str(empty)
+                    empty = 0
+                symbol = chess.PIECE_SYMBOLS[index % 6 + 1]
+                row += symbol.upper() if index >= 6 else symbol
+            rows.append(row + (str(empty) if empty else ""))
+        castling = "".join(symbol for symbol, corner in (("K", chess.BB_H1), ("Q", chess.BB_A1), ("k", chess.BB_H8), ("q", chess.BB_A8))
+                           if self.castling & corner) or "-"
+        ep = chess.SQUARE_NAMES[self.ep_square] if self.ep_square else "-"
+        return f"{'/'.join(rows)} {'w' if self.turn else 'b'} {castling} {ep} {self.halfmove} {self.fullmove}"
+
+    def to_board(self):
+        """The position as a chess.Board (without the move history)."""
+        return chess.Board(self.fen())
+
+    def score(self):
+        """Material + PST from White's perspective, equal to evaluate_material."""
+        return (self.material[1] - self.material[0]) + (self.pst[1] - self.pst[0])
+
+    def ep_key(self):
+        # Hashed only if a pawn of the side to move can capture (see zobrist.ep_key)
+        ep_square = self.ep_square
+        if ep_square and BB_PAWN_ATTACKS[self.turn ^ 1][ep_square] & self.pieces[6 * self.turn]:
+            return ZOBRIST_EP_FILE[ep_square & 7]
+        return 0
+
+    def is_attacked(self, color, square, occupied=None, removed=0):
+        """
+        Whether `color` attacks `square`, with `occupied` as the blockers and
+        the pieces on `removed` (a bitboard) ignored.
+        """
+        if occupied is None:
+            occupied = self.occupied
+        pieces = self.pieces
+        offset = 6 * color
+        keep = ~removed
+        if BB_KNIGHT_ATTACKS[square] & pieces[offset + 1] & keep:
+            return True
+        if BB_KING_ATTACKS[square] & pieces[offset + 5]:
+            return True
+        if BB_PAWN_ATTACKS[color ^ 1][square] & pieces[offset] & keep:
+            return True
+        queens = pieces[offset + 4]
+        if (BB_RANK_ATTACKS[square][BB_RANK_MASKS[square] & occupied] | BB_FILE_ATTACKS[square][BB_FILE_MASKS[square] & occupied]) & (pieces[offset + 3] | queens) & keep:
+            return True
+        if BB_DIAG_ATTACKS[square][BB_DIAG_MASKS[square] & occupied] & (pieces[offset + 2] | queens) & keep:
+            return True
+        return False
+
+    def king_square(self, color):
+        return self.pieces[6 * color + 5].bit_length() - 1
+
+    def is_check(self):
+        return self.is_attacked(self.turn ^ 1, self.king_square(self.turn))
+
+    def pinned(self, color, king):
+        """Bitboard of `color`'s pieces pinned to its king on `king`."""
+        pieces = self.pieces
+        offset = 6 * (color ^ 1)
+        queens = pieces[offset + 4]
+        snipers = ((BB_RANK_ATTACKS[king][0] | BB_FILE_ATTACKS[king][0]) & (pieces[offset + 3] | queens)) | \
+                  (BB_DIAG_ATTACKS[king][0] & (pieces[offset + 2] | queens))
+        pinned = 0
+        own = self.occupied_co[color]
+        occupied = self.occupied
+        while snipers:
+            sniper_bb = snipers & -snipers
+            snipers ^= sniper_bb
+            blockers = chess.between(king, sniper_bb.bit_length() - 1) & occupied
+            if blockers and not blockers & (blockers - 1) and blockers & own:
+                pinned |= blockers
+        return pinned
+
+    def pseudo_moves(self):
+        """Pseudo-legal moves (the king may be left in check)."""
+        moves = []
+        append = moves.append
+        color = self.turn
+        pieces = self.pieces
+        offset = 6 * color
+        own = self.occupied_co[color]
+        enemy = self.occupied_co[color ^ 1]
+        occupied = self.occupied
+        not_own = ~own
+
+        # Pawns
+        pawns = pieces[offset]
+        forward = 8 if color else -8
+        start_rank = chess.BB_RANK_2 if color else chess.BB_RANK_7
+        last_rank = chess.BB_RANK_8 if color else chess.BB_RANK_1
+        ep_bb = BB_SQUARES[self.ep_square] if self.ep_square else 0
+        while pawns:
+            from_bb = pawns & -pawns
+            pawns ^= from_bb
+            from_square = from_bb.bit_length() - 1
+            targets = BB_PAWN_ATTACKS[color][from_square] & (enemy | ep_bb)
+            one = from_square + forward
+            if not BB_SQUARES[one] & occupied:
+                targets |= BB_SQUARES[one]
+                if from_bb & start_rank and not BB_SQUARES[one + forward] & occupied:
+                    targets |= BB_SQUARES[one + forward]
+            while targets:
+                to_bb = targets & -targets
+                targets ^= to_bb
+                move = from_square | (to_bb.bit_length() - 1) << 6
+                if to_bb & last_rank:
+                    for promotion in PROMOTION_TYPES:
+                        append(move | promotion << 12)
+                else:
+                    append(move)
+
+        # Pieces
+        for piece_type in (chess.KNIGHT, chess.BISHOP, chess.ROOK, chess.QUEEN, chess.KING):
+            bb = pieces[offset + piece_type - 1]
+            while bb:
+                from_bb = bb & -bb
+                bb ^= from_bb
+                from_square = from_bb.bit_length() - 1
+                if piece_type == chess.KNIGHT:
+                    targets = BB_KNIGHT_ATTACKS[from_square]
+                elif piece_type == chess.KING:
+                    targets = BB_KING_ATTACKS[from_square]
+                else:
+                    targets = 0
+                    if piece_type != chess.BISHOP:
+                        targets = BB_RANK_ATTACKS[from_square][BB_RANK_MASKS[from_square] & occupied] | \
+                                  BB_FILE_ATTACKS[from_square][BB_FILE_MASKS[from_square] & occupied]
+                    if piece_type != chess.ROOK:
+                        targets |= BB_DIAG_ATTACKS[from_square][BB_DIAG_MASKS[from_square] & occupied]
+                targets &= not_own
+                while targets:
+                    to_bb = targets & -targets
+                    targets ^= to_bb
+                    append(from_square | (to_bb.bit_length() - 1) << 6)
+
+        # Castling: the rights imply king and rook on their squares
+        rights = self.castling & (chess.BB_RANK_1 if color else chess.BB_RANK_8)
+        if rights:
+            king = chess.E1 if color else chess.E8
+            for to_square in ((chess.G1, chess.C1) if color else (chess.G8, chess.C8)):
+                empty, safe = CASTLING_PATHS[to_square]
+                if rights & CASTLING_ROOKS[to_square][2] and not occupied & empty:
+                    if not any(self.is_attacked(color ^ 1, square) for square in (king,) + safe):
+                        append(king | to_square << 6)
+        return moves
+
+    def generate_moves(self):
+        """Legal moves as ints."""
+        color = self.turn
+        enemy = color ^ 1
+        king = self.king_square(color)
+        king_bb = BB_SQUARES[king]
+        checked = self.is_attacked(enemy, king)
+        pinned = self.pinned(color, king)
+        pawns = self.pieces[6 * color]
+        occupied = self.occupied
+        legal = []
+        for move in self.pseudo_moves():
+            from_square = move & 63
+            to_square = (move >> 6) & 63
+            from_bb = BB_SQUARES[from_square]
+            if from_bb & king_bb:
+                if abs(to_square - from_square) == 2:
+                    # Castling, checked during generation
+                    legal.append(move)
+                elif not self.is_attacked(enemy, to_square, occupied & ~king_bb, BB_SQUARES[to_square]):
+                    legal.append(move)
+                continue
+
+            ep_capture = from_bb & pawns and to_square == self.ep_square and (from_square ^ to_square) & 7
+            if not checked and not ep_capture:
+                # A pinned piece may only move along the pin
+                if not from_bb & pinned or BB_RAYS[king][from_square] & BB_SQUARES[to_square]:
+                    legal.append(move)
+                continue
+
+            # In check, or en passant (two pieces leave the rank): try it
+            captured_bb = BB_SQUARES[to_square - 8 if color else to_square + 8] if ep_capture else BB_SQUARES[to_square]
+            after = (occupied & ~from_bb & ~captured_bb) | BB_SQUARES[to_square]
+            if not self.is_attacked(enemy, king, after, captured_bb):
+                legal.append(move)
+        return legal
+
+    def make(self, move):
+        from_square = move & 63
+        to_square = (move >> 6) & 63
+        promotion = move >> 12
+        mailbox = self.mailbox
+        pieces = self.pieces
+        occupied_co = self.occupied_co
+        material = self.material
+        pst = self.pst
+        color = self.turn
+        enemy = color ^ 1
+        mover = mailbox[from_square]
+        captured = mailbox[to_square]
+        self.stack.append((move, captured, self.castling, self.ep_square, self.halfmove, self.hash,
+                           material[0], material[1], pst[0], pst[1]))
+
+        from_bb = BB_SQUARES[from_square]
+        to_bb = BB_SQUARES[to_square]
+        h = self.hash ^ self.ep_key()
+
+        # Lift the mover, remove a captured piece, drop the (promoted) piece
+        pieces[mover] ^= from_bb
+        h ^= ZOBRIST_TABLE[from_square][mover]
+        pst[color] -= PST_BY_INDEX[mover][from_square]
+        if captured != EMPTY:
+            pieces[captured] ^= to_bb
+            occupied_co[enemy] ^= to_bb
+            h ^= ZOBRIST_TABLE[to_square][captured]
+            material[enemy] -= MATERIAL_BY_INDEX[captured]
+            pst[enemy] -= PST_BY_INDEX[captured][to_square]
+        placed = promotion - 1 + 6 * color if promotion else mover
+        if promotion:
+            material[color] += MATERIAL_BY_INDEX[placed] - MATERIAL_BY_INDEX[mover]
+        pieces[placed] |= to_bb
+        h ^= ZOBRIST_TABLE[to_square][placed]
+        pst[color] += PST_BY_INDEX[placed][to_square]
+        mailbox[from_square] = EMPTY
+        mailbox[to_square] = placed
+        occupied_co[color] ^= from_bb | to_bb
+
+        mover_type = mover - 6 * color + 1
+        ep_square = 0
+        if mover_type == chess.PAWN:
+            if to_square - from_square in (16, -16):
+                ep_square = (from_square + to_square) // 2
+            elif captured == EMPTY and (from_square ^ to_square) & 7:
+                # En passant: the pawn behind the target square
+                victim_square = to_square - 8 if color else to_square + 8
+                victim = 6 * enemy
+                victim_bb = BB_SQUARES[victim_square]
+                pieces[victim] ^= victim_bb
+                occupied_co[enemy] ^= victim_bb
+                mailbox[victim_square] = EMPTY
+                h ^= ZOBRIST_TABLE[victim_square][victim]
+                material[enemy] -= MATERIAL_BY_INDEX[victim]
+                pst[enemy] -= PST_BY_INDEX[victim][victim_square]
+        elif mover_type == chess.KING and to_square - from_square in (2, -2):
+            rook_from, rook_to, _ = CASTLING_ROOKS[to_square]
+            rook = 6 * color + chess.ROOK - 1
+            rook_bb = BB_SQUARES[rook_from] | BB_SQUARES[rook_to]
+            pieces[rook] ^= rook_bb
+            occupied_co[color] ^= rook_bb
+            mailbox[rook_from] = EMPTY
+            mailbox[rook_to] = rook
+            h ^= ZOBRIST_TABLE[rook_from][rook] ^ ZOBRIST_TABLE[rook_to][rook]
+            pst[color] += PST_BY_INDEX[rook][rook_to] - PST_BY_INDEX[rook][rook_from]
+
+        # Castling rights: moving from or onto a corner clears it, king moves clear both
+        castling = self.castling & ~from_bb & ~to_bb
+        if mover_type == chess.KING:
+            castling &= ~(chess.BB_RANK_1 if color else chess.BB_RANK_8)
+        if castling != self.castling:
+            h ^= ZOBRIST_CASTLING[CASTLING_INDEX[self.castling]] ^ ZOBRIST_CASTLING[CASTLING_INDEX[castling]]
+            self.castling = castling
+
+        self.ep_square = ep_square
+        self.halfmove = 0 if mover_type == chess.PAWN or captured != EMPTY else self.halfmove + 1
+        if not color:
+            self.fullmove += 1
+        self.turn = enemy
+        self.occupied = occupied_co[0] | occupied_co[1]
+        self.hash = h ^ self.ep_key() ^ zobrist.ZOBRIST_BLACK_TURN
+
+    def unmake(self):
+        (move, captured, self.castling, self.ep_square, self.halfmove, self.hash,
+         material_black, material_white, pst_black, pst_white) = self.stack.pop()
+        from_square = move & 63
+        to_square = (move >> 6) & 63
+        mailbox = self.mailbox
+        pieces = self.pieces
+        occupied_co = self.occupied_co
+        self.material[0], self.material[1] = material_black, material_white
+        self.pst[0], self.pst[1] = pst_black, pst_white
+        color = self.turn ^ 1
+        enemy = self.turn
+        self.turn = color
+        if not color:
+            self.fullmove -= 1
+
+        from_bb = BB_SQUARES[from_square]
+        to_bb = BB_SQUARES[to_square]
+        placed = mailbox[to_square]
+        mover = 6 * color if move >> 12 else placed
+        pieces[placed] ^= to_bb
+        pieces[mover] |= from_bb
+        mailbox[from_square] = mover
+        mailbox[to_square] = captured
+        occupied_co[color] ^= from_bb | to_bb
+        if captured != EMPTY:
+            pieces[captured] |= to_bb
+            occupied_co[enemy] |= to_bb
+
+        mover_type = mover - 6 * color + 1
+        if mover_type == chess.PAWN:
+            if captured == EMPTY and (from_square ^ to_square) & 7:
+                victim_square = to_square - 8 if color else to_square + 8
+                victim_bb = BB_SQUARES[victim_square]
+                pieces[6 * enemy] |= victim_bb
+                occupied_co[enemy] |= victim_bb
+                mailbox[victim_square] = 6 * enemy
+        elif mover_type == chess.KING and to_square - from_square in (2, -2):
+            rook_from, rook_to, _ = CASTLING_ROOKS[to_square]
+            rook = 6 * color + chess.ROOK - 1
+            rook_bb = BB_SQUARES[rook_from] | BB_SQUARES[rook_to]
+            pieces[rook] ^= rook_bb
+            occupied_co[color] ^= rook_bb
+            mailbox[rook_to] = EMPTY
+            mailbox[rook_from] = rook
+        self.occupied = occupied_co[0] | occupied_co[1]
+
+    def make_null(self):
+        """The side to move passes, for null-move pruning."""
+        self.stack.append((None, self.ep_square, self.halfmove, self.hash))
+        self.hash ^= self.ep_key() ^ zobrist.ZOBRIST_BLACK_TURN
+        self.ep_square = 0
+        self.halfmove += 1
+        self.turn ^= 1
+
+    def unmake_null(self):
+        _, self.ep_square, self.halfmove, self.hash = self.stack.pop()
+        self.turn ^= 1
+
+def perft(position, depth):
+    if depth == 0:
+        return 1
+    moves = position.generate_moves()
+    if depth == 1:
+        return len(moves)
+    nodes = 0
+    for move in moves:
+        position.make(move)
+        nodes += perft(position, depth - 1)
+        position.unmake()
+    return nodes
+
+def check_equivalence(board, position, depth, path=()):
+    """
+    Walks the legal move tree of `board` and `position` together. At every
+    node the move lists, Zobrist keys and material/PST scores must match,
+    and unmake must restore the position exactly. Returns the leaf count;
+    raises AssertionError with the FEN and moves on the first difference.
+    """
+    def fail(message):
+        raise AssertionError(f"{message} at {board.fen()} after {' '.join(path) or 'the root'}")
+
+    if position.hash != compute_hash(board):
+        fail("Zobrist key differs")
+    if position.score() != evaluate_material(board):
+        fail("Score differs")
+    if depth == 0:
+        return 1
+
+    expected = sorted(encode_move(move) for move in board.legal_moves)
+    moves = sorted(position.generate_moves())
+    if moves != expected:
+        missing = [decode_move(move).uci() for move in expected if move not in moves]
+        extra = [decode_move(move).uci() for move in moves if move not in expected]
+        fail(f"Moves differ (missing {missing}, extra {extra})")
+
+    nodes = 0
+    for move in moves:
+        before = (list(position.pieces), position.mailbox.tobytes(), position.fen(), position.hash)
+        board.push(decode_move(move))
+        position.make(move)
+        nodes += check_equivalence(board, position, depth - 1, path + (board.peek().uci(),))
+        position.unmake()
+        board.pop()
+        if (list(position.pieces), position.mailbox.tobytes(), position.fen(), position.hash) != before:
+            fail(f"unmake of {decode_move(move).uci()} did not restore the position")
+    return nodes
+
+def run_check(max_depth, out=sys.stdout):
+    """Runs check_equivalence on the perft suite. Returns True if everything matches."""
+    from perft import PERFT_SUITE
+    all_ok = True
+    for name, fen, expected in PERFT_SUITE:
+        depth = min(max_depth, len(expected))
+        board = chess.Board(fen)
+        start = time.perf_counter()
+        try:
+            nodes = check_equivalence(board, Position.from_board(board), depth)
+            ok = nodes == expected[depth - 1]
+            status = "ok" if ok else f"FAIL expected {expected[depth - 1]}"
+        except AssertionError as e:
+            ok, nodes, status = False, 0, f"FAIL {e}"
+        all_ok = all_ok and ok
+        print(f"{name:<10} depth {depth}  {nodes:>10}  {status} {time.perf_counter() - start:.3f}s", file=out)
+    return all_ok
+
+def main():
+    parser = argparse.ArgumentParser(description="Compact position: perft and equivalence check against python-chess")
+    parser.add_argument("--fen", default=chess.STARTING_FEN)
+    parser.add_argument("--depth", type=int, default=None, help=f"Default {PERFT_DEPTH}, or {CHECK_DEPTH} with --check")
+    parser.add_argument("--check", action="store_true", help="Compare with python-chess on the perft suite up to --depth")
+    args = parser.parse_args()
+
+    if args.check:
+        sys.exit(0 if run_check(args.depth or CHECK_DEPTH) else 1)
+    if args.depth is None:
+        args.depth = PERFT_DEPTH
+
+    from perft import perft as board_perft
+    board = chess.Board(args.fen)
+    position = Position.from_board(board)
+    for name, count in (("Position", lambda: perft(position, args.depth)), ("chess.Board", lambda: board_perft(board, args.depth))):
+        start = time.perf_counter()
+        nodes = count()
+        duration = time.perf_counter() - start
+        print(f"{name:<12} nodes {nodes} time {duration:.3f}s nps {int(nodes / duration) if duration > 0 else 0}")
+
+if __name__ == "__main__":
+    main()
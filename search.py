@@ -1,139 +1,796 @@
-from evaluation import evaluate_board
+from evaluation import evaluate_board, evaluate_material, EvalAccumulator, MATE_SCORE
+from zobrist import compute_hash, update_hash, update_hash_null
+from transposition import TranspositionTable, EXACT, LOWERBOUND, UPPERBOUND, encode_move, decode_move
+from ordering import MoveOrderer, staged_captures, see, MAX_PLY
+from telemetry import SearchTelemetry
 import chess
-import random
+import math
+import time
 
-# Zobrist Initialization
-ZOBRIST_TABLE = [[random.getrandbits(64) for _ in range(12)] for _ in range(64)]
-ZOBRIST_BLACK_TURN = random.getrandbits(64)
+ASPIRATION_WINDOW = 50 # Centipawns either side of the previous iteration's score
+# Don't start another iteration once this share of the time limit is used up,
+# the next one usually takes several times longer than the last
+SOFT_TIME_RATIO = 0.5
+# Safety margin for delta pruning in quiescence search
+DELTA_MARGIN = 200
+DRAW_SCORE = 0
+
+# "minimax": the original two-sided alpha-beta. "pvs": negamax principal
+# variation search with null-move pruning, late-move reductions and futility pruning
+SEARCH_MODES = ("minimax", "pvs")
+NULL_MOVE_MIN_DEPTH = 3
+NULL_MOVE_REDUCTION = 2 # Plus one more from depth 7
+LMR_MIN_DEPTH = 3
+LMR_MIN_MOVES = 3 # Moves searched at full depth before reducing
+# Reduction by remaining depth and move number, grows with both logarithmically
+LMR_TABLE = [[0] + [int(0.75 + math.log(d) * math.log(m) / 2.25) if d else 0 for m in range(1, 64)] for d in range(64)]
+FUTILITY_MARGINS = [0, 200, 500] # By remaining depth, frontier nodes only
+LATE_MOVE_COUNTS = [0, 8, 12, 18] # Quiet moves searched before the rest are pruned, by remaining depth
+# Scores beyond this are mates
+MATE_BOUND = MATE_SCORE - 1000
+# Tablebase wins, below any mate but above any evaluation
+TB_WIN_SCORE = 20000
+# Scores beyond this (tablebase wins and mates) count plies from the root,
+# they are stored in the TT relative to the node instead
+TB_BOUND = TB_WIN_SCORE - 1000
+
+def score_to_tt(score, ply):
+    if score > TB_BOUND:
+        return score + ply
+    if score < -TB_BOUND:
+        return score - ply
+    return score
+
+def score_from_tt(score, ply):
+    if score > TB_BOUND:
+        return score - ply
+    if score < -TB_BOUND:
+        return score + ply
+    return score
+
+class SearchAborted(Exception):
+    """Raised inside the search when a stop was requested or the node limit was hit."""
 
 class SearchEngine:
-    def __init__(self, depth):
+    def __init__(self, depth, hash_mb=16, threads=1, verbose=True, debug_hash=False, debug_eval=False, tt_buffer=None, strict_terminal=False, search_mode="minimax", book=None, tablebases=None, analysis_cache=None):
+        if search_mode not in SEARCH_MODES:
+            raise ValueError(f"Unknown search mode: {search_mode}")
         self.depth = depth
+        self.search_mode = search_mode
+        self.hash_mb = hash_mb
         self.nodes_visited = 0
-        self.transposition_table = {} # Key -> {depth, score, flag}
-        self.used_cache_moves = 0
+        self.qnodes = 0 # Quiescence share of nodes_visited (not counted under python -O)
+        self.transposition_table = TranspositionTable(hash_mb, tt_buffer) # Key -> (depth, score, flag, move)
+        self.used_cache_moves = 0 # Nodes ended by a TT entry (not counted under python -O)
+        self.best_score = 0
+        # Print the telemetry summary after every search
+        self.verbose = verbose
+
+        # SearchTelemetry of the last search, also passed to telemetry_callback
+        # (e.g. telemetry.JsonLinesWriter). search_hooks get start() before and
+        # stop(telemetry) after every search (telemetry.CProfileHook, SamplingHook)
+        self.telemetry = None
+        self.telemetry_callback = None
+        self.search_hooks = []
+
+        # Optional opening book (book.OpeningBook), probed before searching
+        self.book = book
+        self.book_hits = 0
+        # Optional Syzygy tablebases (tablebase.Tablebases), probed at the
+        # root and at interior nodes right after a capture or pawn move
+        self.tablebases = tablebases
+        self.tb_hits = 0
+        # Optional persistent results (cache.AnalysisCache), probed on a TT
+        # miss and fed with results of at least its min_depth
+        self.analysis_cache = analysis_cache
+
+        # threads > 1 splits the root moves across a process pool (see parallel.py)
+        self.threads = threads
+        self.parallel = None
+
+        # Interruption: stop() from another thread, a shared stop_signal
+        # (anything with is_set(), e.g. multiprocessing.Event), a node limit
+        # or a time limit in seconds (turned into a deadline per search)
+        self.stop_requested = False
+        self.stop_signal = None
+        self.node_limit = None
+        self.time_limit = None
+        self.deadline = None
+
+        # Called after every completed iteration with a dict of
+        # depth, score (White's perspective), nodes, time and pv
+        self.info_callback = None
+        self.completed_depth = 0
+        self.pv = []
+        # Best (move, score) among root moves of the current iteration whose
+        # score is exact (inside the window)
+        self.root_best = None
+
+        # Incremental Zobrist keys, one per position on the search path
+        self.hash_stack = []
+        # Repetitions are only looked for from this hash_stack index on (the last null move)
+        self.repetition_floor = 0
+        self.null_floors = []
+        # Verify every incremental key against a full recompute (slow)
+        self.debug_hash = debug_hash
+
+        # Killer moves and history heuristic
+        self.orderer = MoveOrderer()
+
+        # Material + PST sums updated alongside the hash
+        self.evaluator = EvalAccumulator()
+        # Verify the running sums against a full evaluation (slow)
+        self.debug_eval = debug_eval
+
+        # Use board.is_game_over() at every node instead of the hash stack,
+        # halfmove clock and empty move lists, without check extensions (slow)
+        self.strict_terminal = strict_terminal
 
     def compute_hash(self, board):
-        h = 0
-        for square, piece in board.piece_map().items():
-            idx = (piece.piece_type - 1) + (6 * int(piece.color))
-            h ^= ZOBRIST_TABLE[square][idx]
-        
-        if board.turn == chess.BLACK:
-            h ^= ZOBRIST_BLACK_TURN
-            
-        return h
+        return compute_hash(board)
+
+    def game_history_keys(self, board):
+        """
+        Keys of the positions since the last capture or pawn move, oldest
+        first and ending with `board`, so the search sees repetitions of
+        positions played before the root.
+        """
+        keys = [compute_hash(board)]
+        plies = min(board.halfmove_clock, len(board.move_stack))
+        if plies:
+            history = board.copy()
+            for _ in range(plies):
+                history.pop()
+                keys.append(compute_hash(history))
+            keys.reverse()
+        return keys
+
+    def history_dependent(self, board, keys, move, depth):
+        """
+        True if a root result could depend on how `board` was reached: the
+        position already occurred in `keys` (game_history_keys), `move`
+        goes back to an earlier position, or the fifty-move rule is within
+        `depth` plies. Such results are not shared through the analysis cache.
+        """
+        if keys[-1] in keys[:-1] or board.halfmove_clock + depth >= 100:
+            return True
+        return not board.is_zeroing(move) and update_hash(board, move, keys[-1]) in keys
+
+    def is_draw(self, board):
+        """
+        Fifty-move rule, repetition and insufficient material without
+        generating moves. Any repetition counts as a draw inside the search.
+        """
+        clock = board.halfmove_clock
+        if clock >= 100 and (not board.is_check() or any(board.generate_legal_moves())):
+            return True
+
+        # Only positions since the last irreversible move with the same side to move can repeat
+        keys = self.hash_stack
+        key = keys[-1]
+        for i in range(len(keys) - 5, max(len(keys) - 2 - clock, self.repetition_floor - 1), -2):
+            if keys[i] == key:
+                return True
+
+        return chess.popcount(board.occupied) <= 4 and board.is_insufficient_material()
+
+    def tablebase_score(self, wdl, turn, ply):
+        """White-perspective score of a WDL result for the side to move `turn`."""
+        if wdl == 2:
+            score = TB_WIN_SCORE - ply
+        elif wdl == -2:
+            score = -(TB_WIN_SCORE - ply)
+        else:
+            # Draws, and results the fifty-move rule turns into draws
+            score = DRAW_SCORE
+        return score if turn == chess.WHITE else -score
+
+    def probe_tablebase(self, board, ply):
+        """
+        White-perspective tablebase score, or None. WDL tables assume a zero
+        halfmove clock, so only positions right after a capture or pawn move
+        are probed.
+        """
+        if board.halfmove_clock != 0 or not self.tablebases.can_probe(board):
+            return None
+        wdl = self.tablebases.probe_wdl(board, self.hash_stack[-1])
+        if wdl is None:
+            return None
+        self.tb_hits += 1
+        return self.tablebase_score(wdl, board.turn, ply)
+
+    def make_move(self, board, move):
+        h = update_hash(board, move, self.hash_stack[-1])
+        self.evaluator.push(board, move)
+        board.push(move)
+        if self.debug_hash:
+            expected = compute_hash(board)
+            if h != expected:
+                raise AssertionError(f"Incremental hash mismatch after {move} in {board.fen()}: {h:#x} != {expected:#x}")
+        if self.debug_eval:
+            expected = evaluate_material(board)
+            if self.evaluator.score() != expected:
+                raise AssertionError(f"Incremental eval mismatch after {move} in {board.fen()}: {self.evaluator.score()} != {expected}")
+        self.hash_stack.append(h)
+
+    def unmake_move(self, board):
+        board.pop()
+        self.hash_stack.pop()
+        self.evaluator.pop()
+
+    def make_null_move(self, board):
+        h = update_hash_null(board, self.hash_stack[-1])
+        board.push(chess.Move.null())
+        if self.debug_hash:
+            expected = compute_hash(board)
+            if h != expected:
+                raise AssertionError(f"Incremental hash mismatch after null move in {board.fen()}: {h:#x} != {expected:#x}")
+        self.hash_stack.append(h)
+        # A position before the pass is not a repetition
+        self.null_floors.append(self.repetition_floor)
+        self.repetition_floor = len(self.hash_stack) - 1
+
+    def unmake_null_move(self, board):
+        board.pop()
+        self.hash_stack.pop()
+        self.repetition_floor = self.null_floors.pop()
+
+    def stop(self):
+        """Asks a running search to return as soon as possible (thread-safe)."""
+        self.stop_requested = True
+        if self.parallel is not None:
+            self.parallel.stop()
+
+    def reset_stop(self):
+        self.stop_requested = False
+        if self.parallel is not None:
+            self.parallel.reset_stop()
+
+    def check_abort(self):
+        if self.stop_requested or (self.node_limit is not None and self.nodes_visited >= self.node_limit):
+            raise SearchAborted()
+        if self.deadline is not None and time.perf_counter() >= self.deadline:
+            raise SearchAborted()
+        if self.stop_signal is not None and self.stop_signal.is_set():
+            raise SearchAborted()
+
+    def get_pv(self, board, first_move, max_length=None):
+        table = self.parallel.engine.transposition_table if self.parallel is not None else self.transposition_table
+        return table.get_pv(board, first_move, max_length or self.depth)
+
+    def get_best_move(self, board, root_moves=None, time_limit=None, node_limit=None):
+        """
+        Iterative deepening up to self.depth. A time limit (seconds) or node
+        limit, given here or set on the engine, ends the search early with
+        the best move of the last completed iteration.
+        Returns (move, nodes); the statistics are left on self.telemetry.
+        """
+        self.telemetry = SearchTelemetry(board.fen(), self.search_mode)
+        for hook in self.search_hooks:
+            hook.start()
+        try:
+            best_move, nodes = self.run_search(board, root_moves, time_limit, node_limit)
+        finally:
+            for hook in self.search_hooks:
+                hook.stop(self.telemetry)
+
+        telemetry = self.telemetry
+        if telemetry.source == "search":
+            tt = self.transposition_table.stats()
+            tt['cutoffs'] = self.used_cache_moves if __debug__ else None
+            telemetry.finish(best_move, self.best_score, self.completed_depth, nodes, self.qnodes if __debug__ else None,
+                             tt, self.orderer.cutoffs, self.orderer.first_move_cutoffs)
+        else:
+            telemetry.finish(best_move, self.best_score, self.completed_depth, nodes)
+        if self.book is not None:
+            telemetry.counters['book_hits'] = self.book_hits
+        if self.tablebases is not None:
+            telemetry.counters['tb_hits'] = self.tb_hits
+        if self.analysis_cache is not None:
+            self.analysis_cache.end_search()
+            telemetry.counters['cache_hits'] = self.analysis_cache.hits
+
+        if self.verbose:
+            print(telemetry.summary())
+        if self.telemetry_callback:
+            self.telemetry_callback(telemetry)
+        return best_move, nodes
+
+    def run_search(self, board, root_moves, time_limit, node_limit):
+        start_time = time.perf_counter()
+        if time_limit is None:
+            time_limit = self.time_limit
+        if node_limit is None:
+            node_limit = self.node_limit
+
+        if self.book is not None and root_moves is None:
+            book_move = self.book.probe(board)
+            if book_move is not None:
+                self.book_hits += 1
+                self.nodes_visited = 0
+                self.completed_depth = 0
+                self.best_score = 0
+                self.pv = [book_move]
+                self.telemetry.source = "book"
+                return book_move, 0
+
+        self.tb_hits = 0
+        if self.tablebases is not None and root_moves is None and self.tablebases.can_probe(board):
+            result = self.tablebases.probe_root(board)
+            if result is not None:
+                self.tb_hits += 1
+                wdl, moves = result
+                if wdl != 0 or len(moves) == 1:
+                    # Solved: play the DTZ-optimal move without searching
+                    self.nodes_visited = 0
+                    self.completed_depth = 0
+                    self.best_score = self.tablebase_score(wdl, board.turn, 0)
+                    self.pv = moves[:1]
+                    self.telemetry.source = "tablebase"
+                    return moves[0], 0
+                # Drawn: search among the moves that hold the draw
+                root_moves = moves
+
+        if self.analysis_cache is not None and root_moves is None:
+            history = self.game_history_keys(board)
+            entry = self.analysis_cache.probe(history[-1])
+            if entry is not None:
+                cached_depth, cached_score, cached_flag, cached_move = entry
+                move = decode_move(cached_move)
+                if (cached_flag == EXACT and cached_depth >= self.depth and move is not None and board.is_legal(move)
+                        and not self.history_dependent(board, history, move, cached_depth)):
+                    # Searched at least this deep before, by this or another process
+                    self.nodes_visited = 0
+                    self.completed_depth = cached_depth
+                    self.best_score = cached_score
+                    self.pv = [move]
+                    self.telemetry.source = "cache"
+                    return move, 0
+
+        if self.threads > 1 and root_moves is None:
+            if self.parallel is None:
+                from parallel import ParallelSearch
+                tablebases = (self.tablebases.paths, self.tablebases.probe_limit) if self.tablebases is not None else None
+                self.parallel = ParallelSearch(self.depth, self.threads, self.hash_mb, self.search_mode, tablebases)
+            self.parallel.depth = self.depth
+            best_move, self.best_score, self.nodes_visited, self.completed_depth = self.parallel.search(board, node_limit, time_limit)
+            self.pv = self.get_pv(board, best_move, max(self.completed_depth, 1)) if best_move else []
+            # Worker counters stay in the workers, only the merged result is known
+            self.telemetry.source = "parallel"
+            if best_move:
+                self.telemetry.add_iteration(self.completed_depth, self.best_score, self.pv, self.nodes_visited, None, 0, 0, None, 0, 0)
+            if self.info_callback and best_move:
+                self.info_callback({'depth': self.completed_depth, 'score': self.best_score, 'nodes': self.nodes_visited, 'time': time.perf_counter() - start_time, 'pv': self.pv})
+            return best_move, self.nodes_visited
 
-    def get_best_move(self, board):
         self.used_cache_moves = 0
         self.nodes_visited = 0
+        self.qnodes = 0
+        self.completed_depth = 0
+        self.pv = []
+        self.root_best = None
+        self.hash_stack = self.game_history_keys(board)
+        self.repetition_floor = 0
+        self.null_floors = []
+        self.evaluator.reset(board)
+        self.transposition_table.new_search()
+        self.transposition_table.reset_stats()
+        self.orderer.new_search()
+        root_length = len(board.move_stack)
+        saved_node_limit = self.node_limit
+        self.node_limit = node_limit
+        self.deadline = start_time + time_limit if time_limit is not None else None
         
         best_move = None
         
         # Iterative Deepening
-        for current_depth in range(1, self.depth + 1):
-            move = self.search_root(board, current_depth)
-            if move:
-                best_move = move
+        try:
+            for current_depth in range(1, self.depth + 1):
+                move, score = self.search_aspiration(board, current_depth, root_moves, best_move)
+                if move:
+                    best_move = move
+                    self.best_score = score
+                    self.completed_depth = current_depth
+                    self.pv = self.get_pv(board, move, current_depth)
+                    tt = self.transposition_table
+                    self.telemetry.add_iteration(
+                        current_depth, score, self.pv, self.nodes_visited, self.qnodes if __debug__ else None,
+                        tt.probes, tt.hits, self.used_cache_moves if __debug__ else None,
+                        self.orderer.cutoffs, self.orderer.first_move_cutoffs
+                    )
+                    if self.analysis_cache is not None:
+                        # The root is never stored in the TT, keep it for later searches
+                        if (current_depth >= self.analysis_cache.min_depth and root_moves is None
+                                and not self.history_dependent(board, self.hash_stack, move, current_depth)):
+                            self.analysis_cache.record(self.hash_stack[-1], current_depth, score, EXACT, encode_move(move))
+                        self.analysis_cache.end_iteration()
+                    if self.info_callback:
+                        self.info_callback({'depth': current_depth, 'score': score, 'nodes': self.nodes_visited, 'time': time.perf_counter() - start_time, 'pv': self.pv})
+                if time_limit is not None and time.perf_counter() - start_time > time_limit * SOFT_TIME_RATIO:
+                    break
+        except SearchAborted:
+            # Unwind the moves of the interrupted iteration
+            while len(board.move_stack) > root_length:
+                board.pop()
+            # The previous best move is searched first, so a root move proven
+            # inside the window of the interrupted iteration is at least as
+            # good; otherwise keep the last completed iteration's move
+            if self.root_best is not None:
+                best_move, self.best_score = self.root_best
+        finally:
+            self.node_limit = saved_node_limit
+            self.deadline = None
+
+        if best_move is None:
+            # Interrupted before the first iteration finished
+            moves = self.order_moves(board)
+            if root_moves is not None:
+                moves = [move for move in moves if move in root_moves]
+            best_move = moves[0] if moves else None
                 
-        print("Length of transposition table: ", len(self.transposition_table))
-        print("Used cache moves: ", self.used_cache_moves)
         return best_move, self.nodes_visited
 
-    def search_root(self, board, depth):
+    def close(self):
+        if self.book is not None:
+            self.book.close()
+            self.book = None
+        if self.tablebases is not None:
+            self.tablebases.close()
+            self.tablebases = None
+        if self.parallel is not None:
+            self.parallel.close()
+            self.parallel = None
+        if self.analysis_cache is not None:
+            self.analysis_cache.close()
+            self.analysis_cache = None
+        self.transposition_table.close()
+
+    def search_aspiration(self, board, depth, root_moves=None, pv_move=None):
+        """
+        Searches the root in a narrow window around the previous iteration's
+        score, widening the failing side and re-searching on fail low/high.
+        """
+        if depth == 1 or pv_move is None:
+            return self.search_root(board, depth, root_moves, pv_move=pv_move)
+
+        window = ASPIRATION_WINDOW
+        alpha = self.best_score - window
+        beta = self.best_score + window
+        while True:
+            move, score = self.search_root(board, depth, root_moves, alpha, beta, pv_move)
+            if score <= alpha and alpha > -float('inf'):
+                # Fail low (White's perspective): only an upper bound
+                window *= 2
+                alpha = score - window if window < 1000 else -float('inf')
+            elif score >= beta and beta < float('inf'):
+                # Fail high: only a lower bound
+                window *= 2
+                beta = score + window if window < 1000 else float('inf')
+            else:
+                return move, score
+            pv_move = move or pv_move
+
+    def search_root(self, board, depth, root_moves=None, alpha=-float('inf'), beta=float('inf'), pv_move=None):
         best_move = None
         max_eval = -float('inf') if board.turn == chess.WHITE else float('inf')
-        
-        alpha = -float('inf')
-        beta = float('inf')
+        self.root_best = None
 
-        moves = self.order_moves(board)
+        moves = self.order_moves(board, hash_move=pv_move)
+        if root_moves is not None:
+            moves = [move for move in moves if move in root_moves]
 
-        for move in moves:
-            board.push(move)
-            eval = self.minimax(board, depth - 1, alpha, beta, board.turn == chess.WHITE)
-            board.pop()
+        for i, move in enumerate(moves):
+            self.make_move(board, move)
+            if self.search_mode == "minimax":
+                eval = self.minimax(board, depth - 1, alpha, beta, board.turn == chess.WHITE, 1)
+            elif i == 0:
+                eval = self.search_child(board, depth - 1, alpha, beta)
+            else:
+                # Prove the move is no better than the best so far with a null window
+                if board.turn == chess.BLACK and alpha > -float('inf'):
+                    eval = self.search_child(board, depth - 1, alpha, alpha + 1)
+                elif board.turn == chess.WHITE and beta < float('inf'):
+                    eval = self.search_child(board, depth - 1, beta - 1, beta)
+                else:
+                    eval = None
+                if eval is None or alpha < eval < beta:
+                    eval = self.search_child(board, depth - 1, alpha, beta)
+            self.unmake_move(board)
 
+            # Exact scores only: a fail-low bound says nothing about the move,
+            # and an aborted iteration falls back on the moves kept here
+            exact = alpha < eval < beta
             if board.turn == chess.WHITE:
                 if eval > max_eval:
                     max_eval = eval
                     best_move = move
+                    if exact:
+                        self.root_best = (move, eval)
                 alpha = max(alpha, eval)
             else: # Black's turn
                 if eval < max_eval:
                     max_eval = eval
                     best_move = move
+                    if exact:
+                        self.root_best = (move, eval)
                 beta = min(beta, eval)
+
+            if alpha >= beta:
+                break
         
-        return best_move
+        return best_move, max_eval
 
-    def minimax(self, board, depth, alpha, beta, maximizing_player):
+    def minimax(self, board, depth, alpha, beta, maximizing_player, ply=0):
         self.nodes_visited += 1
+        if self.nodes_visited & 255 == 0:
+            self.check_abort()
         
+        board_hash = self.hash_stack[-1]
+        in_check = board.is_check()
+        if not self.strict_terminal:
+            # Before the TT probe: the same position can be a draw on one path and not on another
+            if self.is_draw(board):
+                return DRAW_SCORE
+            # Check extension
+            if in_check and ply < MAX_PLY:
+                depth += 1
+
+        if self.tablebases is not None:
+            tb_score = self.probe_tablebase(board, ply)
+            if tb_score is not None:
+                return tb_score
+
         # 1. Transposition Table Probe
-        board_hash = self.compute_hash(board)
-        tt_entry = self.transposition_table.get(board_hash)
+        tt_entry = self.transposition_table.probe(board_hash)
+        if tt_entry is None and self.analysis_cache is not None and depth >= self.analysis_cache.min_depth:
+            tt_entry = self.analysis_cache.probe(board_hash)
+        hash_move = None
         
-        if tt_entry and tt_entry['depth'] >= depth:
-             if tt_entry['flag'] == 'exact':
-                 self.used_cache_moves += 1
-                 return tt_entry['score']
-             elif tt_entry['flag'] == 'lowerbound': # Alpha
-                 alpha = max(alpha, tt_entry['score'])
-             elif tt_entry['flag'] == 'upperbound': # Beta
-                 beta = min(beta, tt_entry['score'])
-             
-             if alpha >= beta:
-                 return tt_entry['score']
-
-        if depth == 0 or board.is_game_over():
-            return self.quiescence(board, alpha, beta)
+        if tt_entry:
+             tt_depth, tt_score, tt_flag, tt_move = tt_entry
+             hash_move = decode_move(tt_move)
+             tt_score = score_from_tt(tt_score, ply)
+             if tt_depth >= depth:
+                 if tt_flag == EXACT:
+                     if __debug__:
+                         self.used_cache_moves += 1
+                     return tt_score
+                 elif tt_flag == LOWERBOUND: # Alpha
+                     alpha = max(alpha, tt_score)
+                 elif tt_flag == UPPERBOUND: # Beta
+                     beta = min(beta, tt_score)
+                 
+                 if alpha >= beta:
+                     if __debug__:
+                         self.used_cache_moves += 1
+                     return tt_score
+
+        if depth == 0 or (self.strict_terminal and board.is_game_over()):
+            return self.quiescence(board, alpha, beta, ply)
 
         original_alpha = alpha
-        moves = self.order_moves(board)
+        moves = self.order_moves(board, hash_move=hash_move, ply=ply)
+        if not moves:
+            # Checkmate (the nearer the better) or stalemate
+            if not in_check:
+                return DRAW_SCORE
+            return -(MATE_SCORE - ply) if board.turn == chess.WHITE else MATE_SCORE - ply
+        best_move = None
         
         if maximizing_player:
             max_eval = -float('inf')
-            for move in moves:
-                board.push(move)
-                eval = self.minimax(board, depth - 1, alpha, beta, False)
-                board.pop()
-                max_eval = max(max_eval, eval)
+            for i, move in enumerate(moves):
+                self.make_move(board, move)
+                eval = self.minimax(board, depth - 1, alpha, beta, False, ply + 1)
+                self.unmake_move(board)
+                if eval > max_eval:
+                    max_eval = eval
+                    best_move = move
                 alpha = max(alpha, eval)
                 if beta <= alpha:
+                    self.orderer.record_cutoff(board, move, depth, ply, i)
                     break
             
             # Store in TT
-            flag = 'exact'
-            if max_eval <= original_alpha: flag = 'upperbound' # Fail low
-            elif max_eval >= beta: flag = 'lowerbound' # Fail high
+            flag = EXACT
+            if max_eval <= original_alpha: flag = UPPERBOUND # Fail low
+            elif max_eval >= beta: flag = LOWERBOUND # Fail high
             
-            self.transposition_table[board_hash] = {'depth': depth, 'score': max_eval, 'flag': flag}
+            self.transposition_table.store(board_hash, depth, score_to_tt(max_eval, ply), flag, encode_move(best_move))
+            if self.analysis_cache is not None and depth >= self.analysis_cache.min_depth:
+                self.analysis_cache.record(board_hash, depth, score_to_tt(max_eval, ply), flag, encode_move(best_move))
             return max_eval
         else:
             min_eval = float('inf')
-            for move in moves:
-                board.push(move)
-                eval = self.minimax(board, depth - 1, alpha, beta, True)
-                board.pop()
-                min_eval = min(min_eval, eval)
+            for i, move in enumerate(moves):
+                self.make_move(board, move)
+                eval = self.minimax(board, depth - 1, alpha, beta, True, ply + 1)
+                self.unmake_move(board)
+                if eval < min_eval:
+                    min_eval = eval
+                    best_move = move
                 beta = min(beta, eval)
                 if beta <= alpha:
+                    self.orderer.record_cutoff(board, move, depth, ply, i)
                     break
             
             # Store in TT
-            flag = 'exact'
-            if min_eval <= original_alpha: flag = 'upperbound'
-            elif min_eval >= beta: flag = 'lowerbound'
+            flag = EXACT
+            if min_eval <= original_alpha: flag = UPPERBOUND
+            elif min_eval >= beta: flag = LOWERBOUND
             
-            self.transposition_table[board_hash] = {'depth': depth, 'score': min_eval, 'flag': flag}
+            self.transposition_table.store(board_hash, depth, score_to_tt(min_eval, ply), flag, encode_move(best_move))
+            if self.analysis_cache is not None and depth >= self.analysis_cache.min_depth:
+                self.analysis_cache.record(board_hash, depth, score_to_tt(min_eval, ply), flag, encode_move(best_move))
             return min_eval
 
-    def quiescence(self, board, alpha, beta):
+    def search_child(self, board, depth, alpha, beta):
+        """
+        White-perspective score of a root child with the negamax search.
+        """
+        if board.turn == chess.WHITE:
+            return self.negamax(board, depth, alpha, beta, 1)
+        return -self.negamax(board, depth, -beta, -alpha, 1)
+
+    def negamax(self, board, depth, alpha, beta, ply, null_allowed=True):
+        """
+        Principal variation search. Scores and the window are from the side
+        to move's perspective; TT entries stay in White's perspective so both
+        search modes read them the same way.
+        """
+        self.nodes_visited += 1
+        if self.nodes_visited & 255 == 0:
+            self.check_abort()
+
+        color = 1 if board.turn == chess.WHITE else -1
+        pv_node = beta - alpha > 1
+        board_hash = self.hash_stack[-1]
+        # Always needed: null move and the pruning below are unsound in check.
+        # strict_terminal only turns off the draw shortcut and the extension
+        in_check = board.is_check()
+        if not self.strict_terminal:
+            if self.is_draw(board):
+                return DRAW_SCORE
+            if in_check and ply < MAX_PLY:
+                depth += 1
+
+        if self.tablebases is not None:
+            tb_score = self.probe_tablebase(board, ply)
+            if tb_score is not None:
+                return tb_score * color
+
+        tt_entry = self.transposition_table.probe(board_hash)
+        if tt_entry is None and self.analysis_cache is not None and depth >= self.analysis_cache.min_depth:
+            tt_entry = self.analysis_cache.probe(board_hash)
+        hash_move = None
+        if tt_entry:
+            tt_depth, tt_score, tt_flag, tt_move = tt_entry
+            hash_move = decode_move(tt_move)
+            tt_score = score_from_tt(tt_score, ply) * color
+            if color < 0 and tt_flag != EXACT:
+                tt_flag = LOWERBOUND if tt_flag == UPPERBOUND else UPPERBOUND
+            if tt_depth >= depth:
+                if tt_flag == EXACT:
+                    if __debug__:
+                        self.used_cache_moves += 1
+                    return tt_score
+                elif tt_flag == LOWERBOUND:
+                    alpha = max(alpha, tt_score)
+                elif tt_flag == UPPERBOUND:
+                    beta = min(beta, tt_score)
+                if alpha >= beta:
+                    if __debug__:
+                        self.used_cache_moves += 1
+                    return tt_score
+
+        if depth <= 0 or (self.strict_terminal and board.is_game_over()):
+            if color > 0:
+                return self.quiescence(board, alpha, beta, ply)
+            return -self.quiescence(board, -beta, -alpha, ply)
+
+        static_eval = self.evaluator.score() * color
+
+        # Reverse futility: at frontier nodes a static eval far above beta holds
+        if (not pv_node and not in_check and depth < len(FUTILITY_MARGINS)
+                and abs(beta) < MATE_BOUND and static_eval - FUTILITY_MARGINS[depth] >= beta):
+            return static_eval
+
+        # Null-move pruning: if passing still fails high, a real move will too.
+        # Not in check, and not without pieces where passing may be the best move (zugzwang)
+        if (null_allowed and not pv_node and not in_check and depth >= NULL_MOVE_MIN_DEPTH
+                and static_eval >= beta and beta < MATE_BOUND
+                and board.occupied_co[board.turn] & ~(board.pawns | board.kings)):
+            reduction = NULL_MOVE_REDUCTION + (1 if depth > 6 else 0)
+            self.make_null_move(board)
+            score = -self.negamax(board, depth - 1 - reduction, -beta, -beta + 1, ply + 1, False)
+            self.unmake_null_move(board)
+            if score >= beta:
+                return beta
+
+        # Futility pruning: at frontier nodes, quiet moves can't lift a hopeless static eval to alpha
+        futile = (not pv_node and not in_check and depth < len(FUTILITY_MARGINS)
+                  and abs(alpha) < MATE_BOUND and static_eval + FUTILITY_MARGINS[depth] <= alpha)
+
+        # Late-move pruning: at shallow depth, quiet moves ordered this late rarely matter
+        late_pruning = not pv_node and not in_check and depth < len(LATE_MOVE_COUNTS) and abs(alpha) < MATE_BOUND
+
+        original_alpha = alpha
+        best_score = -float('inf')
+        best_move = None
+        for i, move in enumerate(self.staged_moves(board, hash_move, ply)):
+            quiet = not move.promotion and not board.is_capture(move)
+            if quiet and i > 0 and (futile or (late_pruning and i >= LATE_MOVE_COUNTS[depth])):
+                continue
+
+            self.make_move(board, move)
+            if i == 0:
+                score = -self.negamax(board, depth - 1, -beta, -alpha, ply + 1)
+            else:
+                # Late-move reductions for quiet moves ordered late
+                reduction = 0
+                if depth >= LMR_MIN_DEPTH and i >= LMR_MIN_MOVES and quiet and not in_check and not board.is_check():
+                    reduction = LMR_TABLE[min(depth, 63)][min(i, 63)]
+                    reduction = max(1, min(reduction, depth - 2))
+                score = -self.negamax(board, depth - 1 - reduction, -alpha - 1, -alpha, ply + 1)
+                if reduction and score > alpha:
+                    score = -self.negamax(board, depth - 1, -alpha - 1, -alpha, ply + 1)
+                if alpha < score < beta:
+                    score = -self.negamax(board, depth - 1, -beta, -alpha, ply + 1)
+            self.unmake_move(board)
+
+            if score > best_score:
+                best_score = score
+                best_move = move
+            if score > alpha:
+                alpha = score
+            if alpha >= beta:
+                self.orderer.record_cutoff(board, move, depth, ply, i)
+                break
+
+        if best_move is None:
+            # No legal moves: checkmate (the nearer the better) or stalemate
+            return -(MATE_SCORE - ply) if in_check else DRAW_SCORE
+
+        flag = EXACT
+        if best_score <= original_alpha: flag = UPPERBOUND
+        elif best_score >= beta: flag = LOWERBOUND
+        if color < 0 and flag != EXACT:
+            flag = LOWERBOUND if flag == UPPERBOUND else UPPERBOUND
+        self.transposition_table.store(board_hash, depth, score_to_tt(best_score * color, ply), flag, encode_move(best_move))
+        if self.analysis_cache is not None and depth >= self.analysis_cache.min_depth:
+            self.analysis_cache.record(board_hash, depth, score_to_tt(best_score * color, ply), flag, encode_move(best_move))
+        return best_score
+
+    def staged_moves(self, board, hash_move, ply):
+        """
+        Yields a legal hash move before generating and ordering the other
+        moves, which is often not needed when it cuts off.
+        """
+        if hash_move is not None and board.is_legal(hash_move):
+            yield hash_move
+            for move in self.order_moves(board, ply=ply):
+                if move != hash_move:
+                    yield move
+        else:
+            yield from self.order_moves(board, ply=ply)
+
+    def quiescence(self, board, alpha, beta, ply=0):
+        # No standing pat in check: search all evasions, so mates are seen
+        if not self.strict_terminal and ply < MAX_PLY and board.is_check():
+            return self.minimax(board, 0, alpha, beta, board.turn == chess.WHITE, ply)
+
         self.nodes_visited += 1
+        if __debug__:
+            self.qnodes += 1
+        if self.nodes_visited & 255 == 0:
+            self.check_abort()
         
         # Stand-pat score: What is the score if we just stop capturing?
-        stand_pat = evaluate_board(board)
+        if self.strict_terminal:
+            # Pays for evaluate_board's full checkmate/game-over detection at every node
+            stand_pat = evaluate_board(board, self.evaluator)
+        else:
+            stand_pat = self.evaluator.score()
         
         if board.turn == chess.WHITE:
             if stand_pat >= beta:
@@ -146,14 +803,18 @@ class SearchEngine:
             if beta > stand_pat:
                 beta = stand_pat
 
-        # Generate ONLY captures
-        moves = self.order_moves(board, only_captures=True)
-        
+        # Captures and queen promotions only, generated stage by stage
         if board.turn == chess.WHITE:
-            for move in moves:
-                board.push(move)
-                score = self.quiescence(board, alpha, beta)
-                board.pop()
+            for move, gain in staged_captures(board):
+                # Delta pruning: even winning the piece can't raise the score to alpha
+                if stand_pat + gain + DELTA_MARGIN <= alpha:
+                    continue
+                # Skip captures that lose material
+                if see(board, move) < 0:
+                    continue
+                self.make_move(board, move)
+                score = self.quiescence(board, alpha, beta, ply + 1)
+                self.unmake_move(board)
 
                 if score >= beta:
                     return beta
@@ -161,10 +822,14 @@ class SearchEngine:
                     alpha = score
             return alpha
         else:
-            for move in moves:
-                board.push(move)
-                score = self.quiescence(board, alpha, beta)
-                board.pop()
+            for move, gain in staged_captures(board):
+                if stand_pat - gain - DELTA_MARGIN >= beta:
+                    continue
+                if see(board, move) < 0:
+                    continue
+                self.make_move(board, move)
+                score = self.quiescence(board, alpha, beta, ply + 1)
+                self.unmake_move(board)
 
                 if score <= alpha:
                     return alpha
@@ -172,52 +837,13 @@ class SearchEngine:
                     beta = score
             return beta
 
-    def order_moves(self, board, only_captures=False):
+    def order_moves(self, board, only_captures=False, hash_move=None, ply=0):
         """
-        Orders moves to improve alpha-beta pruning.
+        Orders moves to improve alpha-beta pruning (see ordering.MoveOrderer).
         Prioritizes:
+        0. The hash move (best move stored in the transposition table)
         1. Captures (MVV-LVA: Most Valuable Victim - Least Valuable Aggressor)
         2. Promotions
+        3. Killer moves, then quiet moves by history score
         """
-        moves = list(board.legal_moves)
-        scores = []
-        
-        final_moves = []
-        final_scores = []
-        
-        for move in moves:
-            if only_captures and not board.is_capture(move):
-                continue
-                
-            score = 0
-            
-            # 1. Captures
-            if board.is_capture(move):
-                # MVV-LVA
-                victim_piece = board.piece_at(move.to_square)
-                aggressor_piece = board.piece_at(move.from_square)
-                
-                victim_value = 0
-                if victim_piece:
-                    # Use values from evaluation.py (need to import or redefine)
-                    values = {1: 1, 2: 3, 3: 3, 4: 5, 5: 9, 6: 100}
-                    victim_value = values.get(victim_piece.piece_type, 0)
-                
-                aggressor_value = 0
-                if aggressor_piece:
-                    values = {1: 1, 2: 3, 3: 3, 4: 5, 5: 9, 6: 100}
-                    aggressor_value = values.get(aggressor_piece.piece_type, 0)
-                
-                score = 10 * victim_value - aggressor_value
-            
-            # 2. Promotions
-            if move.promotion:
-                score += 900
-            
-            final_moves.append(move)
-            final_scores.append(score)
-            
-        # Zipping and sorting
-        moves_with_scores = zip(final_moves, final_scores)
-        sorted_moves = sorted(moves_with_scores, key=lambda x: x[1], reverse=True)
-        return [m[0] for m in sorted_moves]
+        return self.orderer.order(board, ply, hash_move, only_captures)
@@ -0,0 +1,113 @@
+import argparse
+import chess
+import chess.syzygy
+import os
+
+# Syzygy endgame tablebases, read from local WDL (.rtbw) and DTZ (.rtbz)
+# files with python-chess. Nothing is downloaded.
+
+DEFAULT_CACHE_ENTRIES = 1_000_000
+
+def max_pieces_in(directory):
+    """Largest piece count among the WDL tables in `directory` (KRvK -> 3)."""
+    pieces = 0
+    for name in os.listdir(directory):
+        stem, extension = os.path.splitext(name)
+        if extension == ".rtbw":
+            pieces = max(pieces, len(stem) - 1)
+    return pieces
+
+class Tablebases:
+    """
+    WDL/DTZ probing for positions with at most `probe_limit` pieces (default:
+    the largest tables found, 0 turns probing off). `paths` is one directory
+    or several joined with os.pathsep, like the UCI SyzygyPath option. WDL
+    results are cached by Zobrist key.
+    """
+    def __init__(self, paths, probe_limit=None, cache_entries=DEFAULT_CACHE_ENTRIES):
+        self.paths = paths
+        directories = [path for path in paths.split(os.pathsep) if path]
+        if not directories:
+            raise ValueError("No tablebase directory given")
+        self.tablebase = chess.syzygy.Tablebase()
+        self.max_pieces = 0
+        for directory in directories:
+            self.tablebase.add_directory(directory)
+            self.max_pieces = max(self.max_pieces, max_pieces_in(directory))
+        self.probe_limit = self.max_pieces if probe_limit is None else min(probe_limit, self.max_pieces)
+        self.cache_entries = cache_entries
+        self.cache = {}
+
+    def can_probe(self, board):
+        # Tables don't cover castling rights
+        return chess.popcount(board.occupied) <= self.probe_limit and not board.castling_rights
+
+    def probe_wdl(self, board, key):
+        """
+        WDL for the side to move: 2 win, 1 win spoiled by the fifty-move rule,
+        0 draw, -1 loss saved by the fifty-move rule, -2 loss. Assumes the
+        halfmove clock was just reset. None if the table is missing.
+        """
+        if key in self.cache:
+            return self.cache[key]
+        wdl = self.tablebase.get_wdl(board)
+        if len(self.cache) >= self.cache_entries:
+            self.cache = {}
+        self.cache[key] = wdl
+        return wdl
+
+    def probe_root(self, board):
+        """
+        Returns (wdl, moves): the best WDL for the side to move and the moves
+        that keep it, the fastest win (or slowest loss) by DTZ first.
+        None if a table is missing.
+        """
+        ranked = []
+        for move in board.legal_moves:
+            zeroing = board.is_zeroing(move)
+            board.push(move)
+            try:
+                if board.is_checkmate():
+                    wdl, dtz = 2, 0
+                else:
+                    wdl = -self.tablebase.probe_wdl(board)
+                    dtz = -self.tablebase.probe_dtz(board)
+                    # A capture or pawn move that keeps the win restarts the count
+                    if zeroing and wdl > 0:
+                        dtz = 1
+            except KeyError:
+                return None
+            finally:
+                board.pop()
+            ranked.append((wdl, dtz, move))
+
+        if not ranked:
+            return None
+        ranked.sort(key=lambda entry: (-entry[0], entry[1]))
+        best_wdl = ranked[0][0]
+        return best_wdl, [move for wdl, _, move in ranked if wdl == best_wdl]
+
+    def close(self):
+        self.tablebase.close()
+
+def main():
+    parser = argparse.ArgumentParser(description="Probe local Syzygy tablebases")
+    parser.add_argument("path", help="Tablebase directory (several joined with the path separator)")
+    parser.add_argument("--fen", required=True)
+    args = parser.parse_args()
+
+    tablebases = Tablebases(args.path)
+    board = chess.Board(args.fen)
+    if not tablebases.can_probe(board):
+        print(f"Not in the tablebases (up to {tablebases.max_pieces} pieces, no castling rights)")
+        return
+    result = tablebases.probe_root(board)
+    if result is None:
+        print("Table missing")
+    else:
+        wdl, moves = result
+        print(f"WDL {wdl}: {' '.join(board.san(move) for move in moves)}")
+    tablebases.close()
+
+if __name__ == "__main__":
+    main()
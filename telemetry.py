@@ -0,0 +1,206 @@
+from collections import Counter
+import cProfile
+import json
+import pstats
+import sys
+import threading
+import time
+
+# Search statistics. Every get_best_move call leaves a SearchTelemetry on
+# engine.telemetry and hands it to engine.telemetry_callback (e.g. a
+# JsonLinesWriter). Counters that cost time in the hot path (quiescence nodes,
+# TT cutoffs) sit behind `if __debug__:` and are compiled out by `python -O`;
+# they are reported as None then.
+
+class SearchTelemetry:
+    """
+    Statistics of one search: one entry per completed iteration plus totals.
+    `source` is "search", "parallel", "book", "tablebase" or "cache".
+    """
+    def __init__(self, fen, search_mode, source="search"):
+        self.fen = fen
+        self.search_mode = search_mode
+        self.source = source
+        self.iterations = []
+        self.bestmove = None
+        self.score = None
+        self.depth = 0
+        self.nodes = 0
+        self.qnodes = None
+        self.time = 0.0
+        self.tt = {}
+        self.cutoffs = 0
+        self.first_move_cutoffs = 0
+        self.profile = None
+        # Extra totals, e.g. book_hits, tb_hits
+        self.counters = {}
+        self.start_time = time.perf_counter()
+
+    def add_iteration(self, depth, score, pv, nodes, qnodes, tt_probes, tt_hits, tt_cutoffs, cutoffs, first_move_cutoffs):
+        """
+        Records an iteration from the engine's running totals. Plain counters
+        are this iteration's share (the difference to the previous one), the
+        running totals are kept under a `total_` prefix. Counters compiled
+        out under python -O are None.
+        """
+        previous = self.iterations[-1] if self.iterations else None
+        elapsed = time.perf_counter() - self.start_time
+        totals = {
+            'nodes': nodes,
+            'qnodes': qnodes,
+            'tt_probes': tt_probes,
+            'tt_hits': tt_hits,
+            'tt_cutoffs': tt_cutoffs,
+            'cutoffs': cutoffs,
+            'first_move_cutoffs': first_move_cutoffs,
+        }
+        iteration = {'depth': depth, 'score': score, 'pv': [move.uci() for move in pv]}
+        for name, total in totals.items():
+            before = previous[f"total_{name}"] if previous else 0
+            iteration[name] = total - before if total is not None and before is not None else None
+            iteration[f"total_{name}"] = total
+
+        interior_nodes = iteration['nodes'] - (iteration['qnodes'] or 0)
+        iteration['beta_cutoff_rate'] = round(iteration['cutoffs'] / interior_nodes, 4) if interior_nodes > 0 else 0.0
+        iteration['first_move_cutoff_rate'] = (
+            round(iteration['first_move_cutoffs'] / iteration['cutoffs'], 4) if iteration['cutoffs'] else 0.0
+        )
+        # Effective branching factor: growth of the tree from one depth to the next
+        iteration['ebf'] = round(iteration['nodes'] / previous['nodes'], 3) if previous and previous['nodes'] else None
+        iteration['time'] = round(elapsed - (previous['total_time'] if previous else 0.0), 4)
+        iteration['total_time'] = round(elapsed, 4)
+        self.iterations.append(iteration)
+
+    def finish(self, bestmove, score, depth, nodes, qnodes=None, tt=None, cutoffs=0, first_move_cutoffs=0):
+        self.bestmove = bestmove.uci() if bestmove else None
+        self.score = score
+        self.depth = depth
+        self.nodes = nodes
+        self.qnodes = qnodes
+        self.tt = tt or {}
+        self.cutoffs = cutoffs
+        self.first_move_cutoffs = first_move_cutoffs
+        self.time = time.perf_counter() - self.start_time
+
+    def nps(self):
+        return int(self.nodes / self.time) if self.time > 0 else 0
+
+    def to_dict(self):
+        return {
+            'fen': self.fen,
+            'search_mode': self.search_mode,
+            'source': self.source,
+            'bestmove': self.bestmove,
+            'score': self.score,
+            'depth': self.depth,
+            'nodes': self.nodes,
+            'qnodes': self.qnodes,
+            'time': round(self.time, 4),
+            'nps': self.nps(),
+            'tt': self.tt,
+            'cutoffs': self.cutoffs,
+            'first_move_cutoff_rate': round(self.first_move_cutoffs / self.cutoffs, 4) if self.cutoffs else 0.0,
+            'counters': self.counters,
+            'iterations': self.iterations,
+            'profile': self.profile
+        }
+
+    def summary(self):
+        """Human readable lines for the console."""
+        lines = [f"{'depth':>5} {'score':>7} {'nodes':>9} {'ebf':>6} {'time':>8}  pv"]
+        for iteration in self.iterations:
+            ebf = f"{iteration['ebf']:.2f}" if iteration['ebf'] is not None else "-"
+            lines.append(f"{iteration['depth']:>5} {iteration['score']:>7} {iteration['nodes']:>9} {ebf:>6} {iteration['time']:>7.3f}s  {' '.join(iteration['pv'])}")
+        lines.append(f"Best move: {self.bestmove} ({self.source}) | Nodes: {self.nodes} | Time: {self.time:.3f}s | NPS: {self.nps()}")
+        if self.qnodes is not None:
+            lines.append(f"Quiescence nodes: {self.qnodes} of {self.nodes}")
+        if self.tt:
+            cutoffs = self.tt.get('cutoffs')
+            lines.append(f"TT: {self.tt.get('entries', 0)} entries, hit rate {self.tt.get('hit_rate', 0.0):.1%}" + (f", {cutoffs} cutoffs" if cutoffs is not None else ""))
+        if self.cutoffs:
+            lines.append(f"First-move cutoff rate: {self.first_move_cutoffs / self.cutoffs:.1%}")
+        for name, value in self.counters.items():
+            lines.append(f"{name}: {value}")
+        return "\n".join(lines)
+
+class JsonLinesWriter:
+    """Telemetry callback appending one JSON object per search to `path` ('-' for stdout)."""
+    def __init__(self, path):
+        self.path = path
+        self.lock = threading.Lock()
+
+    def __call__(self, telemetry):
+        line = json.dumps(telemetry.to_dict()) + "\n"
+        with self.lock:
+            if self.path == "-":
+                sys.stdout.write(line)
+                sys.stdout.flush()
+            else:
+                with open(self.path, "a") as f:
+                    f.write(line)
+
+class CProfileHook:
+    """
+    Search hook running cProfile around every search. Keeps the `top`
+    functions by internal time on the telemetry, and dumps the full stats
+    to `path` if given (one file, overwritten by every search).
+    """
+    def __init__(self, path=None, top=20):
+        self.path = path
+        self.top = top
+        self.profiler = None
+
+    def start(self):
+        self.profiler = cProfile.Profile()
+        self.profiler.enable()
+
+    def stop(self, telemetry):
+        self.profiler.disable()
+        if self.path:
+            self.profiler.dump_stats(self.path)
+        stats = pstats.Stats(self.profiler)
+        rows = []
+        for (filename, line, name), (_, calls, tottime, cumtime, _) in stats.stats.items():
+            rows.append({'function': f"{filename}:{line}({name})", 'calls': calls, 'tottime': round(tottime, 4), 'cumtime': round(cumtime, 4)})
+        rows.sort(key=lambda row: row['tottime'], reverse=True)
+        telemetry.profile = rows[:self.top]
+        self.profiler = None
+
+class SamplingHook:
+    """
+    Search hook sampling the searching thread's innermost frame every
+    `interval` seconds from a background thread. Much cheaper than cProfile
+    and doesn't distort fast functions; reports the `top` functions by share
+    of samples.
+    """
+    def __init__(self, interval=0.001, top=20):
+        self.interval = interval
+        self.top = top
+        self.samples = Counter()
+        self.running = threading.Event()
+        self.thread = None
+        self.target = None
+
+    def start(self):
+        self.samples = Counter()
+        self.target = threading.get_ident()
+        self.running.set()
+        self.thread = threading.Thread(target=self.sample, daemon=True)
+        self.thread.start()
+
+    def sample(self):
+        while self.running.is_set():
+            frame = sys._current_frames().get(self.target)
+            if frame is not None:
+                code = frame.f_code
+                self.samples[f"{code.co_filename}:{code.co_firstlineno}({code.co_name})"] += 1
+            time.sleep(self.interval)
+
+    def stop(self, telemetry):
+        self.running.clear()
+        self.thread.join()
+        total = sum(self.samples.values())
+        telemetry.profile = [
+            {'function': name, 'samples': count, 'share': round(count / total, 4)}
+            for name, count in self.samples.most_common(self.top)
+        ]
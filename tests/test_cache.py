@@ -0,0 +1,111 @@
+import chess
+import pytest
+
+import zobrist
+from cache import AnalysisCache, HEADER, MAGIC, VERSION
+from search import SearchEngine
+from transposition import EXACT, LOWERBOUND, encode_move
+
+KEY = 0x9D39247E33776D41
+
+@pytest.fixture
+def path(tmp_path):
+    return str(tmp_path / "analysis.cache")
+
+def test_opened_on_first_use(path, tmp_path):
+    cache = AnalysisCache(path, size_mb=1)
+    assert not (tmp_path / "analysis.cache").exists()
+    cache.record(KEY, 5, 10, EXACT)
+    assert not (tmp_path / "analysis.cache").exists()
+    cache.write_back()
+    assert (tmp_path / "analysis.cache").exists()
+    cache.close()
+
+    with pytest.raises(FileNotFoundError):
+        AnalysisCache(str(tmp_path / "missing.cache"), readonly=True).probe(KEY)
+
+def test_write_and_reopen(path):
+    move = encode_move(chess.Move.from_uci("e2e4"))
+    cache = AnalysisCache(path, size_mb=1)
+    cache.record(KEY, 6, -35, LOWERBOUND, move)
+    # The deepest result per key is kept
+    cache.record(KEY, 4, 99, EXACT)
+    cache.close()
+
+    # Created with 1 MB: the header wins over the size asked for
+    cache = AnalysisCache(path, size_mb=64, readonly=True)
+    assert cache.probe(KEY) == (6, -35, LOWERBOUND, move)
+    assert cache.probe(KEY + 1) is None
+    assert cache.size_mb == 1
+    stats = cache.stats()
+    assert stats['entries'] == 1 and stats['hits'] == 1
+    # Read-only caches never record
+    cache.record(KEY + 1, 8, 0, EXACT)
+    assert not cache.pending
+    cache.close()
+
+@pytest.mark.parametrize("header", [
+    HEADER.pack(MAGIC, VERSION, 1, zobrist.ZOBRIST_SEED + 1),
+    HEADER.pack(MAGIC, VERSION + 1, 1, zobrist.ZOBRIST_SEED),
+    HEADER.pack(b"NOTCACHE", VERSION, 1, zobrist.ZOBRIST_SEED),
+])
+def test_foreign_files_are_rejected(path, header):
+    cache = AnalysisCache(path, size_mb=1)
+    cache.record(KEY, 5, 10, EXACT)
+    cache.close()
+    with open(path, "r+b") as f:
+        f.write(header)
+    with pytest.raises(ValueError):
+        AnalysisCache(path).probe(KEY)
+
+@pytest.mark.parametrize("policy, after_iteration, after_search", [
+    ("iteration", 1, 2),
+    ("search", 0, 2),
+    ("close", 0, 0),
+])
+def test_write_policies(path, policy, after_iteration, after_search):
+    cache = AnalysisCache(path, size_mb=1, write_policy=policy)
+    cache.record(KEY, 5, 10, EXACT)
+    cache.end_iteration()
+    assert cache.written == after_iteration
+    cache.record(KEY + 1, 5, 20, EXACT)
+    cache.end_search()
+    assert cache.written == after_search
+    cache.close()
+    assert cache.written == 2
+    with pytest.raises(ValueError):
+        AnalysisCache(path, write_policy="never")
+
+def search(path, board):
+    engine = SearchEngine(3, verbose=False, analysis_cache=AnalysisCache(path, size_mb=1, min_depth=3))
+    move, nodes = engine.get_best_move(board)
+    source = engine.telemetry.source
+    engine.close()
+    return move, nodes, source
+
+def test_root_answered_from_the_cache(path):
+    board = chess.Board()
+    move, nodes, source = search(path, board)
+    assert source == "search" and nodes > 0
+    assert search(path, board) == (move, 0, "cache")
+
+def test_repeating_root_is_not_shared(path):
+    # The root position already occurred: its result depends on the history
+    board = chess.Board()
+    for uci in ("g1f3", "g8f6", "f3g1", "f6g8"):
+        board.push_uci(uci)
+    key = zobrist.compute_hash(board)
+    assert search(path, board)[2] == "search"
+    cache = AnalysisCache(path, readonly=True)
+    assert cache.probe(key) is None
+    cache.close()
+
+    # Searched without the history it is cached; with the history it still isn't used
+    search(path, chess.Board())
+    assert search(path, chess.Board())[2] == "cache"
+    assert search(path, board)[2] == "search"
+
+def test_fifty_move_rule_in_reach_is_not_shared(path):
+    board = chess.Board("4k3/8/8/8/8/8/8/R3K3 w - - 98 80")
+    search(path, board)
+    assert search(path, board)[2] == "search"
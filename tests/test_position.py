@@ -0,0 +1,53 @@
+import chess
+import pytest
+
+from perft import PERFT_SUITE
+from position import Position, check_equivalence, perft
+from transposition import encode_move
+
+# Position against python-chess: check_equivalence compares the legal moves,
+# Zobrist keys and material/PST scores at every node of the perft tree and
+# fails on an unmake that doesn't restore the position.
+
+SUITE_IDS = [name for name, _, _ in PERFT_SUITE]
+
+@pytest.mark.parametrize("name, fen, expected", PERFT_SUITE, ids=SUITE_IDS)
+def test_equivalence_with_python_chess(name, fen, expected):
+    board = chess.Board(fen)
+    position = Position.from_board(board)
+    assert check_equivalence(board, position, 2) == expected[1]
+    assert board.fen() == fen
+    assert position.fen() == fen
+    assert not position.stack
+
+@pytest.mark.parametrize("name, fen, expected", PERFT_SUITE, ids=SUITE_IDS)
+def test_perft_counts(name, fen, expected):
+    assert perft(Position.from_board(chess.Board(fen)), 2) == expected[1]
+
+@pytest.mark.parametrize("name, fen, expected", PERFT_SUITE, ids=SUITE_IDS)
+def test_board_round_trip(name, fen, expected):
+    # Every position one move from the root, castling, en passant and promotions included
+    board = chess.Board(fen)
+    position = Position.from_board(board)
+    assert position.to_board() == board
+    for move in board.legal_moves:
+        board.push(move)
+        position.make(encode_move(move))
+        assert position.to_board() == board
+        # Like FEN, Position keeps the en passant square of any double push
+        assert position.fen() == board.fen(en_passant="fen")
+        assert Position.from_board(board).fen() == position.fen()
+        position.unmake()
+        board.pop()
+
+def test_difference_is_reported():
+    board = chess.Board()
+    position = Position.from_board(board)
+    position.hash ^= 1
+    with pytest.raises(AssertionError, match="Zobrist key differs"):
+        check_equivalence(board, position, 1)
+
+    position = Position.from_board(board)
+    position.pst[1] += 1
+    with pytest.raises(AssertionError, match="Score differs"):
+        check_equivalence(board, position, 1)
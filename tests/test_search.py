@@ -0,0 +1,129 @@
+import chess
+import pytest
+
+from evaluation import MATE_SCORE
+from search import SearchEngine, SEARCH_MODES, DRAW_SCORE
+
+# Draws and mates found inside the search without board.is_game_over():
+# repetitions from the hash stack, the fifty-move rule from the halfmove
+# clock, and mate/stalemate when a node has no legal moves.
+
+def start_at(engine, board):
+    # The state run_search sets up before the first iteration
+    engine.hash_stack = engine.game_history_keys(board)
+    engine.repetition_floor = 0
+    engine.null_floors = []
+    engine.evaluator.reset(board)
+
+def play(board, *ucis):
+    for uci in ucis:
+        board.push_uci(uci)
+    return board
+
+def test_repetition_from_game_history():
+    engine = SearchEngine(1, verbose=False)
+    board = play(chess.Board(), "g1f3", "g8f6", "f3g1")
+    start_at(engine, board)
+    assert not engine.is_draw(board)
+
+    play(board, "f6g8")
+    start_at(engine, board)
+    # Any repetition counts inside the search
+    assert engine.is_draw(board)
+
+    play(board, "g1f3", "g8f6", "f3g1", "f6g8")
+    assert board.is_repetition(3)
+    start_at(engine, board)
+    assert engine.is_draw(board)
+
+def test_history_starts_at_the_last_irreversible_move():
+    engine = SearchEngine(1, verbose=False)
+    board = play(chess.Board(), "g1f3", "g8f6", "f3g1", "f6g8", "e2e3", "e7e6", "g1f3", "g8f6", "f3g1")
+    start_at(engine, board)
+    # Only the positions since e7e6 can repeat
+    assert len(engine.hash_stack) == board.halfmove_clock + 1 == 4
+    assert not engine.is_draw(board)
+    play(board, "f6g8")
+    start_at(engine, board)
+    assert engine.is_draw(board)
+
+@pytest.mark.parametrize("search_mode", SEARCH_MODES)
+def test_search_takes_repetition_when_lost(search_mode):
+    # Black is a queen up; after Nf3 Kd8 Ng1 Ke8 only Nf3 repeats a position
+    board = play(chess.Board("4k3/8/8/8/8/8/q7/6NK w - - 0 1"), "g1f3", "e8d8", "f3g1", "d8e8")
+    engine = SearchEngine(3, verbose=False, search_mode=search_mode)
+    move, _ = engine.get_best_move(board)
+    assert move == chess.Move.from_uci("g1f3")
+    assert engine.best_score == DRAW_SCORE
+
+    # Without the history the same move loses like the others
+    engine = SearchEngine(3, verbose=False, search_mode=search_mode)
+    engine.get_best_move(chess.Board(board.fen()))
+    assert engine.best_score < -500
+
+@pytest.mark.parametrize("search_mode", SEARCH_MODES)
+def test_fifty_move_rule(search_mode):
+    fen = "4k3/8/8/8/8/8/q7/6NK w - - {} 80"
+    engine = SearchEngine(2, verbose=False, search_mode=search_mode)
+    engine.get_best_move(chess.Board(fen.format(99)))
+    # Every move reaches the hundredth half-move: a draw however bad the position
+    assert engine.best_score == DRAW_SCORE
+
+    engine = SearchEngine(2, verbose=False, search_mode=search_mode)
+    engine.get_best_move(chess.Board(fen.format(90)))
+    assert engine.best_score < -500
+
+def test_fifty_move_rule_checkmate_first():
+    # The hundredth half-move gives mate: mate wins over the fifty-move rule
+    engine = SearchEngine(1, verbose=False)
+    board = chess.Board("k7/8/1K6/8/8/8/8/2Q5 w - - 99 80")
+    start_at(engine, board)
+    engine.make_move(board, chess.Move.from_uci("c1c8"))
+    assert board.halfmove_clock == 100
+    assert not engine.is_draw(board)
+    engine.unmake_move(board)
+    engine.make_move(board, chess.Move.from_uci("c1c7"))
+    assert engine.is_draw(board)
+
+@pytest.mark.parametrize("search_mode", SEARCH_MODES)
+@pytest.mark.parametrize("strict_terminal", [False, True])
+@pytest.mark.parametrize("fen, mate, stalemate", [
+    # Qc8 mates, Qc7 stalemates
+    ("k7/8/1K6/8/8/8/8/2Q5 w - - 0 1", "c1c8", "c1c7"),
+    ("2q5/8/8/8/8/1k6/8/K7 b - - 0 1", "c8c1", "c8c2"),
+])
+def test_mate_and_stalemate_at_interior_nodes(search_mode, strict_terminal, fen, mate, stalemate):
+    sign = 1 if chess.Board(fen).turn == chess.WHITE else -1
+    engine = SearchEngine(2, verbose=False, search_mode=search_mode, strict_terminal=strict_terminal)
+    move, _ = engine.get_best_move(chess.Board(fen))
+    assert move == chess.Move.from_uci(mate)
+    # Mate one ply from the root (strict_terminal scores it at the quiescence
+    # leaf with evaluate_board, without the distance)
+    assert engine.best_score == sign * (MATE_SCORE if strict_terminal else MATE_SCORE - 1)
+
+    stalemate = chess.Move.from_uci(stalemate)
+    assert engine.get_best_move(chess.Board(fen), root_moves=[stalemate])[0] == stalemate
+    assert engine.best_score == DRAW_SCORE
+
+def test_null_move_is_a_repetition_floor():
+    # Null moves for both sides around Kd8 Ke8 rebuild the root position,
+    # which is not a repetition: the passes are not moves of the game
+    board = chess.Board("4k3/8/8/8/8/8/8/4K2R w - - 0 1")
+    engine = SearchEngine(4, verbose=False, search_mode="pvs")
+    start_at(engine, board)
+    engine.make_null_move(board)
+    engine.make_move(board, chess.Move.from_uci("e8d8"))
+    engine.make_null_move(board)
+    engine.make_move(board, chess.Move.from_uci("d8e8"))
+    assert engine.hash_stack[-1] == engine.hash_stack[0]
+    assert not engine.is_draw(board)
+
+    # Unmade, the floor goes back and real moves repeat the position
+    engine.unmake_move(board)
+    engine.unmake_null_move(board)
+    engine.unmake_move(board)
+    engine.unmake_null_move(board)
+    assert engine.repetition_floor == 0 and len(engine.hash_stack) == 1
+    for uci in ("h1h2", "e8d8", "h2h1", "d8e8"):
+        engine.make_move(board, chess.Move.from_uci(uci))
+    assert engine.is_draw(board)
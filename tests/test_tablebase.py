@@ -0,0 +1,161 @@
+import chess
+import chess.syzygy
+import pytest
+
+import tablebase
+from search import SearchEngine, SEARCH_MODES, TB_WIN_SCORE, score_to_tt, score_from_tt
+from zobrist import compute_hash
+
+# Tablebases on a stub chess.syzygy.Tablebase: results come from a rule
+# function instead of .rtbw/.rtbz files. rule(board) returns (wdl, dtz) for
+# the side to move, or None for a missing table.
+
+class FakeTablebase:
+    rule = None
+
+    def __init__(self):
+        self.wdl_probes = 0
+
+    def add_directory(self, directory):
+        pass
+
+    def lookup(self, board):
+        result = type(self).rule(board)
+        if result is None:
+            raise chess.syzygy.MissingTableError(board.fen())
+        return result
+
+    def get_wdl(self, board, default=None):
+        self.wdl_probes += 1
+        try:
+            return self.lookup(board)[0]
+        except KeyError:
+            return default
+
+    def probe_wdl(self, board):
+        return self.lookup(board)[0]
+
+    def probe_dtz(self, board):
+        return self.lookup(board)[1]
+
+    def close(self):
+        pass
+
+@pytest.fixture
+def make_tablebases(monkeypatch, tmp_path):
+    def make(rule, table="KRvK", probe_limit=None):
+        (tmp_path / f"{table}.rtbw").touch()
+        monkeypatch.setattr(FakeTablebase, "rule", staticmethod(rule))
+        monkeypatch.setattr(chess.syzygy, "Tablebase", FakeTablebase)
+        return tablebase.Tablebases(str(tmp_path), probe_limit)
+    return make
+
+def root_move_rule(results, default):
+    # Result by the move played from the root (the first move on the stack)
+    def rule(board):
+        if not board.move_stack:
+            return None
+        return results.get(board.move_stack[0].uci(), default)
+    return rule
+
+def material_rule(board):
+    # Whoever has the extra piece wins
+    mine = chess.popcount(board.occupied_co[board.turn])
+    theirs = chess.popcount(board.occupied_co[not board.turn])
+    if mine == theirs:
+        return 0, 0
+    return (2, 10) if mine > theirs else (-2, -10)
+
+def test_probe_limit(make_tablebases):
+    assert make_tablebases(material_rule).probe_limit == 3
+    assert make_tablebases(material_rule, probe_limit=7).probe_limit == 3
+    tablebases = make_tablebases(material_rule, probe_limit=0)
+    assert tablebases.probe_limit == 0
+    assert not tablebases.can_probe(chess.Board("8/8/8/4k3/8/8/8/R3K3 w - - 0 1"))
+
+def test_probe_root_ranks_by_dtz(make_tablebases):
+    # KRPvK: results are from Black's side after each White move
+    rule = root_move_rule({'a1a5': (-2, -3), 'a1a6': (-2, -5), 'a1a8': (0, 0)}, (-2, -10))
+    tablebases = make_tablebases(rule, table="KRPvK")
+    board = chess.Board("8/8/8/4k3/8/8/4P3/R3K3 w - - 0 1")
+
+    wdl, moves = tablebases.probe_root(board)
+    assert wdl == 2
+    ucis = [move.uci() for move in moves]
+    # Pawn moves keep the win and restart the count, so they come first
+    assert ucis[:4] == ["e2e3", "e2e4", "a1a5", "a1a6"]
+    assert "a1a8" not in ucis
+    assert len(ucis) == board.legal_moves.count() - 1
+    assert board.fen() == "8/8/8/4k3/8/8/4P3/R3K3 w - - 0 1"
+
+def test_probe_root_missing_table(make_tablebases):
+    tablebases = make_tablebases(lambda board: None)
+    assert tablebases.probe_root(chess.Board("8/8/8/4k3/8/8/8/R3K3 w - - 0 1")) is None
+
+def test_solved_root_plays_without_searching(make_tablebases):
+    rule = root_move_rule({'a1a5': (-2, -3)}, (-2, -10))
+    engine = SearchEngine(3, verbose=False, tablebases=make_tablebases(rule))
+    move, nodes = engine.get_best_move(chess.Board("8/8/8/4k3/8/8/8/R3K3 w - - 0 1"))
+    assert move == chess.Move.from_uci("a1a5")
+    assert nodes == 0
+    assert engine.best_score == TB_WIN_SCORE
+    assert engine.telemetry.source == "tablebase"
+
+@pytest.mark.parametrize("search_mode", SEARCH_MODES)
+def test_drawn_root_searches_only_drawing_moves(make_tablebases, search_mode):
+    fen = "8/8/8/4k3/8/8/8/R3K3 w - - 0 1"
+    preferred, _ = SearchEngine(3, verbose=False, search_mode=search_mode).get_best_move(chess.Board(fen))
+    # Two moves the search would not pick by itself are the only ones that hold
+    holding = [move for move in chess.Board(fen).legal_moves if move != preferred][-2:]
+    rule = root_move_rule({move.uci(): (0, 0) for move in holding}, (2, 5))
+
+    engine = SearchEngine(3, verbose=False, search_mode=search_mode, tablebases=make_tablebases(rule))
+    move, nodes = engine.get_best_move(chess.Board(fen))
+    assert move in holding
+    assert nodes > 0
+    assert engine.telemetry.source == "search"
+
+@pytest.mark.parametrize("search_mode", SEARCH_MODES)
+@pytest.mark.parametrize("fen, capture, sign", [
+    ("8/8/8/4k3/8/8/3n4/R3K3 w - - 0 1", "e1d2", 1),
+    ("r3k3/3N4/8/8/4K3/8/8/8 b - - 0 1", "e8d7", -1),
+])
+def test_interior_score_sign_and_distance(make_tablebases, search_mode, fen, capture, sign):
+    # The root has four pieces, only the capture reaches the three-piece tables
+    tablebases = make_tablebases(material_rule)
+    engine = SearchEngine(2, verbose=False, search_mode=search_mode, tablebases=tablebases)
+    move, _ = engine.get_best_move(chess.Board(fen))
+    assert move == chess.Move.from_uci(capture)
+    # White's perspective, won one ply from the root
+    assert engine.best_score == sign * (TB_WIN_SCORE - 1)
+    assert engine.tb_hits > 0
+    assert engine.telemetry.counters['tb_hits'] == engine.tb_hits
+
+def test_tt_scores_are_relative_to_the_node():
+    # Won five plies from the root at ply 3: found again at ply 1, it is three plies away
+    assert score_from_tt(score_to_tt(TB_WIN_SCORE - 5, 3), 1) == TB_WIN_SCORE - 3
+    assert score_from_tt(score_to_tt(-(TB_WIN_SCORE - 5), 3), 1) == -(TB_WIN_SCORE - 3)
+    assert score_from_tt(score_to_tt(150, 3), 1) == 150
+
+@pytest.mark.parametrize("search_mode", SEARCH_MODES)
+def test_tablebase_scores_in_tt_and_wdl_cache(make_tablebases, search_mode):
+    tablebases = make_tablebases(material_rule)
+    engine = SearchEngine(3, verbose=False, search_mode=search_mode, tablebases=tablebases)
+    board = chess.Board("8/8/8/4k3/8/8/3n4/R3K3 b - - 0 1")
+    move, _ = engine.get_best_move(board)
+    score = engine.best_score
+    probes = tablebases.tablebase.wdl_probes
+    assert probes > 0
+
+    # After 1... Ke6 White wins the knight, a tablebase win one ply from that node
+    child = board.copy()
+    child.push_uci("e5e6")
+    entry = engine.transposition_table.probe(compute_hash(child))
+    assert entry is not None
+    assert entry[1] == TB_WIN_SCORE - 1
+
+    # Searched again, every WDL result comes from the cache
+    assert engine.get_best_move(board)[0] == move
+    assert engine.best_score == score
+    assert tablebases.tablebase.wdl_probes == probes
+    assert len(tablebases.cache) > 0
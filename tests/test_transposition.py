@@ -0,0 +1,105 @@
+import chess
+import pytest
+
+from transposition import (TranspositionTable, EXACT, LOWERBOUND, UPPERBOUND, SCORE_OFFSET,
+                           encode_move, decode_move, table_bytes)
+
+KEY = 0x9D39247E33776D41
+
+def same_bucket(tt, key, n):
+    # Keys landing in the same bucket as `key`
+    return key + n * tt.num_buckets
+
+def test_move_encoding_round_trip():
+    board = chess.Board("r3k2r/pPppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R w KQkq - 0 1")
+    moves = list(board.legal_moves)
+    assert any(move.promotion for move in moves)
+    for move in moves:
+        assert 0 < encode_move(move) < 1 << 15
+        assert decode_move(encode_move(move)) == move
+    assert encode_move(None) == 0
+    assert decode_move(0) is None
+
+@pytest.mark.parametrize("buffer", [False, True])
+def test_store_and_probe(buffer):
+    tt = TranspositionTable(1, bytearray(table_bytes(1)) if buffer else None)
+    move = chess.Move.from_uci("b7a8n")
+    tt.store(KEY, 7, -1234, UPPERBOUND, encode_move(move))
+    assert tt.probe(KEY) == (7, -1234, UPPERBOUND, encode_move(move))
+    assert tt.probe(KEY + 1) is None
+    assert len(tt) == 1
+    assert tt.hits == 1 and tt.probes == 2
+
+    # Out of range depths and scores are clamped into their fields
+    tt.store(KEY, 300, SCORE_OFFSET + 5, EXACT)
+    depth, score, flag, move_code = tt.probe(KEY)
+    assert (depth, score, flag) == (255, SCORE_OFFSET - 1, EXACT)
+    # Re-stored without a move: the old best move is kept
+    assert move_code == encode_move(move)
+
+def test_depth_preferred_and_always_replace_slots():
+    tt = TranspositionTable(1)
+    deep, shallow, newer, deeper = (same_bucket(tt, KEY, n) for n in range(4))
+    tt.store(deep, 8, 10, EXACT)
+    # Shallower result of the same search: the deep entry stays, the other slot takes it
+    tt.store(shallow, 3, 20, LOWERBOUND)
+    assert tt.probe(deep)[:2] == (8, 10)
+    assert tt.probe(shallow)[:2] == (3, 20)
+    # The always-replace slot is overwritten, the deep entry is not
+    tt.store(newer, 2, 30, EXACT)
+    assert tt.probe(shallow) is None
+    assert tt.probe(deep)[:2] == (8, 10)
+    assert tt.probe(newer)[:2] == (2, 30)
+    # A result at least as deep takes the depth-preferred slot
+    tt.store(deeper, 9, 40, EXACT)
+    assert tt.probe(deep) is None
+    assert tt.probe(deeper)[:2] == (9, 40)
+    assert tt.collisions == 2
+
+def test_stale_entries_are_replaced():
+    tt = TranspositionTable(1)
+    old, current = same_bucket(tt, KEY, 0), same_bucket(tt, KEY, 1)
+    tt.store(old, 12, 10, EXACT)
+    tt.new_search()
+    # Deeper, but from an older search: the shallow result replaces it
+    tt.store(current, 1, 20, EXACT)
+    assert tt.probe(old) is None
+    assert tt.probe(current)[:2] == (1, 20)
+
+def test_age_wraps_around():
+    tt = TranspositionTable(1)
+    for _ in range(63):
+        tt.new_search()
+    assert tt.age == 63
+    move = chess.Move.from_uci("h7h8q")
+    tt.store(KEY, 5, -7, LOWERBOUND, encode_move(move))
+    # The age bits don't spill into the move
+    assert tt.probe(KEY) == (5, -7, LOWERBOUND, encode_move(move))
+    tt.new_search()
+    assert tt.age == 0
+
+    # 64 searches after it was stored the 6-bit age matches again: the deep
+    # entry counts as current and keeps its slot
+    for _ in range(63):
+        tt.new_search()
+    tt.store(same_bucket(tt, KEY, 1), 1, 0, EXACT)
+    assert tt.probe(KEY)[0] == 5
+    # One search later it is stale
+    tt.new_search()
+    tt.store(same_bucket(tt, KEY, 2), 1, 0, EXACT)
+    assert tt.probe(KEY) is None
+
+def test_torn_entry_is_rejected():
+    tt = TranspositionTable(1, bytearray(table_bytes(1)))
+    other = same_bucket(tt, KEY, 1)
+    tt.store(KEY, 6, 50, EXACT)
+    tt.store(other, 6, 60, EXACT, encode_move(chess.Move.from_uci("e2e4")))
+    i = (KEY % tt.num_buckets) * 4
+    # Another process wrote only the data word of its entry
+    tt.table[i + 1] = tt.table[i + 3]
+    assert tt.probe(KEY) is None
+    # Only the key word
+    tt.store(KEY, 6, 50, EXACT)
+    tt.table[i + 2] = tt.table[i] ^ tt.table[i + 1] ^ tt.table[i + 3]
+    assert tt.probe(other) is None
+    assert tt.probe(KEY) == (6, 50, EXACT, 0)
@@ -0,0 +1,164 @@
+from array import array
+from zobrist import compute_hash
+import chess
+
+# Bound flags
+EXACT = 0
+LOWERBOUND = 1 # Fail high, score >= beta
+UPPERBOUND = 2 # Fail low, score <= alpha
+
+# Packed entry layout (one unsigned 64-bit word stored next to key ^ word):
+# bits  0-31 score + SCORE_OFFSET
+# bits 32-39 depth
+# bits 40-41 flag
+# bits 42-47 age
+# bits 48-62 move (from | to << 6 | promotion << 12), 0 = no move
+SCORE_OFFSET = 1 << 31
+BUCKET_SIZE = 2 # Slot 0: depth-preferred, slot 1: always-replace
+ENTRY_BYTES = 16
+
+def encode_move(move):
+    if move is None:
+        return 0
+    return move.from_square | (move.to_square << 6) | ((move.promotion or 0) << 12)
+
+def decode_move(code):
+    if not code:
+        return None
+    return chess.Move(code & 63, (code >> 6) & 63, (code >> 12) or None)
+
+def table_bytes(size_mb):
+    num_buckets = max(1, (size_mb * 1024 * 1024) // (ENTRY_BYTES * BUCKET_SIZE))
+    return num_buckets * BUCKET_SIZE * ENTRY_BYTES
+
+class TranspositionTable:
+    """
+    Fixed-size hash table of search results backed by a preallocated array.
+    Memory use is capped at `size_mb` regardless of how long the engine runs.
+
+    If `buffer` is given (e.g. SharedMemory.buf) the table lives in it, so
+    several processes can share one table without locks: the key is stored
+    XORed with its data word, and a torn write simply fails verification.
+    """
+    def __init__(self, size_mb=16, buffer=None):
+        self.size_mb = size_mb
+        self.num_buckets = max(1, (size_mb * 1024 * 1024) // (ENTRY_BYTES * BUCKET_SIZE))
+        self.num_slots = self.num_buckets * BUCKET_SIZE
+        self.buffer = buffer
+        self.age = 0
+        if buffer is not None:
+            self.table = memoryview(buffer)[:table_bytes(size_mb)].cast('Q')
+            self.filled = 0
+            self.reset_stats()
+        else:
+            self.clear()
+
+    def clear(self):
+        # Keys and packed data are interleaved: slot i -> table[2i], table[2i + 1]
+        if self.buffer is not None:
+            memoryview(self.buffer)[:table_bytes(self.size_mb)] = bytes(table_bytes(self.size_mb))
+        else:
+            self.table = array('Q', bytes(8 * 2 * self.num_slots))
+        self.filled = 0
+        self.reset_stats()
+
+    def close(self):
+        """Releases the view on an external buffer so it can be unmapped."""
+        if self.buffer is not None:
+            self.table.release()
+            self.buffer = None
+
+    def reset_stats(self):
+        self.probes = 0
+        self.hits = 0
+        self.stores = 0
+        self.collisions = 0
+
+    def new_search(self):
+        """Call once per search so entries from older searches get replaced first."""
+        self.age = (self.age + 1) & 63
+
+    def __len__(self):
+        return self.filled
+
+    def probe(self, key):
+        """
+        Returns (depth, score, flag, move_code) or None.
+        """
+        self.probes += 1
+        table = self.table
+        i = (key % self.num_buckets) * (2 * BUCKET_SIZE)
+        data = table[i + 1]
+        if table[i] ^ data != key:
+            data = table[i + 3]
+            if table[i + 2] ^ data != key:
+                return None
+        self.hits += 1
+        return ((data >> 32) & 0xFF, (data & 0xFFFFFFFF) - SCORE_OFFSET, (data >> 40) & 3, data >> 48)
+
+    def store(self, key, depth, score, flag, move_code=0):
+        self.stores += 1
+        table = self.table
+        i = (key % self.num_buckets) * (2 * BUCKET_SIZE)
+
+        # Depth-preferred slot unless it holds a deeper result from this search
+        slot_data = table[i + 1]
+        slot_key = table[i] ^ slot_data
+        if slot_key != key and slot_data != 0 and ((slot_data >> 32) & 0xFF) > depth and ((slot_data >> 42) & 63) == self.age:
+            i += 2
+            slot_data = table[i + 1]
+            slot_key = table[i] ^ slot_data
+
+        if slot_data == 0:
+            self.filled += 1
+        elif slot_key != key:
+            self.collisions += 1
+        elif not move_code:
+            # Keep the old best move when re-storing without one
+            move_code = slot_data >> 48
+
+        depth = min(max(depth, 0), 0xFF)
+        score = min(max(int(score), -SCORE_OFFSET), SCORE_OFFSET - 1)
+        data = (score + SCORE_OFFSET) | (depth << 32) | (flag << 40) | (self.age << 42) | (move_code << 48)
+        table[i] = key ^ data
+        table[i + 1] = data
+
+    def get_pv(self, board, first_move, max_length):
+        """
+        Principal variation: `first_move` followed by the chain of stored best moves.
+        """
+        pv = [first_move]
+        board = board.copy()
+        board.push(first_move)
+        key = compute_hash(board)
+        seen = {key}
+        while len(pv) < max_length:
+            entry = self.probe(key)
+            move = decode_move(entry[3]) if entry else None
+            if move is None or not board.is_legal(move):
+                break
+            pv.append(move)
+            board.push(move)
+            key = compute_hash(board)
+            if key in seen:
+                break
+            seen.add(key)
+        return pv
+
+    def hit_rate(self):
+        return self.hits / self.probes if self.probes else 0.0
+
+    def occupancy(self):
+        return self.filled / self.num_slots
+
+    def stats(self):
+        return {
+            'size_mb': self.size_mb,
+            'entries': self.filled,
+            'occupancy': self.occupancy(),
+            'probes': self.probes,
+            'hits': self.hits,
+            'hit_rate': self.hit_rate(),
+            'stores': self.stores,
+            'collisions': self.collisions
+        }
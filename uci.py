@@ -0,0 +1,312 @@
+from search import MATE_BOUND, SEARCH_MODES
+from book import BOOK_MODES
+from evaluation import MATE_SCORE
+from worker import EngineWorker, WorkerError
+import chess
+import sys
+import threading
+
+# Headless UCI front-end. Deliberately does not import pygame (ui.py/main.py).
+# The search runs in an EngineWorker process; a pump thread forwards its
+# messages, so the command loop always stays responsive.
+
+ENGINE_NAME = "chess-engine"
+ENGINE_AUTHOR = "hamza-mughal1"
+MAX_DEPTH = 64
+MOVE_OVERHEAD = 0.05 # Seconds kept in reserve for communication lag
+DEFAULT_MOVES_TO_GO = 30
+
+def allocate_time(params, turn):
+    """
+    Seconds to spend on this move from the `go` parameters, or None for no limit.
+    """
+    if 'movetime' in params:
+        return max(0.01, params['movetime'] / 1000 - MOVE_OVERHEAD)
+
+    time_left = params.get('wtime' if turn == chess.WHITE else 'btime')
+    if time_left is None:
+        return None
+    increment = params.get('winc' if turn == chess.WHITE else 'binc', params.get('inc', 0))
+    moves_to_go = params.get('movestogo', DEFAULT_MOVES_TO_GO)
+
+    budget = time_left / moves_to_go + increment * 0.75
+    # Never plan to use more than half of what is left
+    budget = min(budget, time_left / 2)
+    return max(0.01, budget / 1000 - MOVE_OVERHEAD)
+
+def format_score(score, turn):
+    # The engine scores from White's perspective, UCI wants the side to move
+    score = score if turn == chess.WHITE else -score
+    if abs(score) > MATE_BOUND:
+        # Mate scores are MATE_SCORE minus the distance in plies, UCI counts moves
+        plies = MATE_SCORE - abs(score)
+        return f"mate {(plies + 1) // 2 if score > 0 else -(plies // 2)}"
+    return f"cp {score}"
+
+class UCIEngine:
+    def __init__(self, output=None):
+        self.output = output or sys.stdout
+        self.output_lock = threading.Lock()
+        self.board = chess.Board()
+        self.hash_mb = 16
+        self.threads = 1
+        self.search_mode = "minimax"
+        self.book_file = ""
+        self.book_mode = "weighted"
+        self.syzygy_path = ""
+        self.syzygy_probe_limit = 7
+        self.worker = None
+
+        # Forwards the worker's messages of the running search
+        self.search_thread = None
+        self.search_board = None
+        self.timer = None
+        # Cleared during `go infinite` / `go ponder`: bestmove waits for stop or ponderhit
+        self.release = threading.Event()
+        self.ponder_budget = None
+
+    def send(self, line):
+        # The search thread and the command loop both send, keep lines whole
+        with self.output_lock:
+            self.output.write(line + "\n")
+            self.output.flush()
+
+    def get_worker(self):
+        if self.worker is not None and not self.worker.is_alive():
+            # Crashed: start a fresh one
+            self.worker.close()
+            self.worker = None
+        if self.worker is None:
+            self.worker = EngineWorker(
+                depth=MAX_DEPTH, hash_mb=self.hash_mb, threads=self.threads, search_mode=self.search_mode,
+                book=self.book_file or None, book_mode=self.book_mode,
+                syzygy=self.syzygy_path or None, syzygy_limit=self.syzygy_probe_limit
+            )
+        return self.worker
+
+    def send_info(self, info):
+        elapsed = info['time']
+        nps = int(info['nodes'] / elapsed) if elapsed > 0 else 0
+        pv = " ".join(info['pv'])
+        tbhits = f" tbhits {info['tbhits']}" if self.syzygy_path else ""
+        self.send(
+            f"info depth {info['depth']} score {format_score(info['score'], self.search_board.turn)} "
+            f"nodes {info['nodes']} nps {nps} time {int(elapsed * 1000)}{tbhits} pv {pv}"
+        )
+
+    def run(self, stream=None):
+        for line in (stream or sys.stdin):
+            if not self.handle(line):
+                break
+
+    def handle(self, line):
+        """
+        Processes one command line. Returns False on `quit`.
+        """
+        tokens = line.split()
+        if not tokens:
+            return True
+        command, args = tokens[0], tokens[1:]
+
+        if command == "uci":
+            self.send(f"id name {ENGINE_NAME}")
+            self.send(f"id author {ENGINE_AUTHOR}")
+            self.send("option name Hash type spin default 16 min 1 max 4096")
+            self.send("option name Threads type spin default 1 min 1 max 256")
+            self.send("option name Ponder type check default false")
+            self.send("option name SearchMode type combo default minimax " + " ".join(f"var {mode}" for mode in SEARCH_MODES))
+            self.send("option name BookFile type string default <empty>")
+            self.send("option name BookMode type combo default weighted " + " ".join(f"var {mode}" for mode in BOOK_MODES))
+            self.send("option name SyzygyPath type string default <empty>")
+            self.send("option name SyzygyProbeLimit type spin default 7 min 0 max 7")
+            self.send("uciok")
+        elif command == "isready":
+            self.get_worker()
+            self.send("readyok")
+        elif command == "setoption":
+            self.set_option(args)
+        elif command == "ucinewgame":
+            self.wait_for_search()
+            self.get_worker().new_game()
+        elif command == "position":
+            self.set_position(args)
+        elif command == "go":
+            self.go(args)
+        elif command == "stop":
+            self.stop_search()
+        elif command == "ponderhit":
+            self.ponder_hit()
+        elif command == "quit":
+            self.stop_search()
+            if self.worker is not None:
+                self.worker.close()
+            return False
+        return True
+
+    def set_option(self, args):
+        # setoption name <id> [value <x>]
+        if "name" not in args:
+            return
+        value_index = args.index("value") if "value" in args else len(args)
+        name = " ".join(args[args.index("name") + 1:value_index]).lower()
+        value = " ".join(args[value_index + 1:])
+
+        if name in ("hash", "threads", "searchmode", "bookfile", "bookmode", "syzygypath", "syzygyprobelimit"):
+            if name == "searchmode" and value not in SEARCH_MODES:
+                return
+            if name == "bookmode" and value not in BOOK_MODES:
+                return
+            if name in ("hash", "threads", "syzygyprobelimit"):
+                try:
+                    number = int(value)
+                except ValueError:
+                    # Keep the previous value
+                    self.send(f"info string invalid value {value!r} for option {name}")
+                    return
+            self.wait_for_search()
+            if name == "hash":
+                self.hash_mb = max(1, number)
+            elif name == "threads":
+                self.threads = max(1, number)
+            elif name == "searchmode":
+                self.search_mode = value
+            elif name == "bookfile":
+                self.book_file = "" if value in ("", "<empty>") else value
+            elif name == "bookmode":
+                self.book_mode = value
+            elif name == "syzygypath":
+                self.syzygy_path = "" if value in ("", "<empty>") else value
+            else:
+                self.syzygy_probe_limit = max(0, min(7, number))
+            # The engine process is restarted with the new settings
+            if self.worker is not None:
+                self.worker.close()
+                self.worker = None
+
+    def set_position(self, args):
+        if not args:
+            return
+        # A bad FEN or move (IllegalMoveError is a ValueError) keeps the previous position
+        try:
+            if args[0] == "startpos":
+                board = chess.Board()
+                rest = args[1:]
+            elif args[0] == "fen":
+                fen_end = args.index("moves") if "moves" in args else len(args)
+                board = chess.Board(" ".join(args[1:fen_end]))
+                rest = args[fen_end:]
+            else:
+                return
+
+            if rest and rest[0] == "moves":
+                for uci in rest[1:]:
+                    board.push_uci(uci)
+        except ValueError as e:
+            self.send(f"info string invalid position: {e}")
+            return
+        self.board = board
+
+    def go(self, args):
+        self.wait_for_search()
+
+        params = {}
+        flags = set()
+        i = 0
+        while i < len(args):
+            token = args[i]
+            if token in ("infinite", "ponder"):
+                flags.add(token)
+                i += 1
+            elif i + 1 < len(args):
+                try:
+                    params[token] = int(args[i + 1])
+                except ValueError:
+                    pass
+                i += 2
+            else:
+                i += 1
+
+        worker = self.get_worker()
+        budget = allocate_time(params, self.board.turn)
+        time_limit = None
+        if flags:
+            # Search until `stop`, or until `ponderhit` starts the clock
+            self.release.clear()
+            self.ponder_budget = budget if "ponder" in flags else None
+        else:
+            self.release.set()
+            time_limit = budget
+
+        self.search_board = self.board.copy()
+        worker.submit(self.search_board, depth=params.get('depth', MAX_DEPTH), time_limit=time_limit, node_limit=params.get('nodes'))
+        self.search_thread = threading.Thread(target=self.search_task, daemon=True)
+        self.search_thread.start()
+
+    def start_timer(self, budget):
+        # The deadline of a running (ponder) search can't be moved, stop it from outside
+        if budget is not None:
+            self.timer = threading.Timer(budget, self.worker.stop)
+            self.timer.daemon = True
+            self.timer.start()
+
+    def search_task(self):
+        while True:
+            try:
+                kind, _, data = self.worker.get()
+            except WorkerError as e:
+                kind, data = "error", {'message': str(e)}
+            if kind == "info":
+                self.send_info(data)
+            else:
+                break
+
+        if kind == "error":
+            self.send(f"info string error {data['message']}")
+            best_move, pv = None, []
+        else:
+            best_move, pv = data['move'], data['pv']
+            telemetry = data['telemetry']
+            if telemetry is not None and telemetry['source'] == "book":
+                self.send(f"info string book move {best_move}")
+        self.release.wait()
+        if self.timer is not None:
+            self.timer.cancel()
+            self.timer = None
+
+        if best_move is None:
+            self.send("bestmove 0000")
+        elif len(pv) > 1 and pv[0] == best_move:
+            self.send(f"bestmove {best_move} ponder {pv[1]}")
+        else:
+            self.send(f"bestmove {best_move}")
+
+    def ponder_hit(self):
+        if self.search_thread is None or self.release.is_set():
+            return
+        budget = self.ponder_budget
+        self.ponder_budget = None
+        self.release.set()
+        self.start_timer(budget)
+
+    def stop_search(self):
+        if self.search_thread is None:
+            return
+        self.worker.stop()
+        self.release.set()
+        self.search_thread.join()
+        self.search_thread = None
+
+    def wait_for_search(self):
+        # A new command that needs the engine ends any search still running
+        if self.search_thread is not None:
+            if not self.release.is_set():
+                self.stop_search()
+            else:
+                self.search_thread.join()
+                self.search_thread = None
+
+def main():
+    UCIEngine().run()
+
+if __name__ == "__main__":
+    main()
@@ -14,11 +14,15 @@ PIECE_SYMBOLS = {
 }
 
 class ChessUI:
+    """
+    Renders only what changed: the board background and the piece glyphs are
+    drawn once, and draw_board repaints the squares whose piece, selection or
+    move dot differ from what is on screen, updating just those rects.
+    """
     def __init__(self):
         pygame.init()
         self.screen = pygame.display.set_mode((WIDTH, HEIGHT))
         pygame.display.set_caption("My Chess")
-        self.clock = pygame.time.Clock()
         
         # Try to find a font that supports chess symbols
         self.font = None
@@ -32,48 +36,129 @@ class ChessUI:
 
         self.selected_square = None
         self.valid_moves = []
+        # Destination squares of valid_moves, for the move dots
+        self.target_squares = set()
         
-        # Threading state
+        # Set while the engine searches
         self.thinking = False
-        self.ai_result = None
 
-    def draw_board(self, board, player_color=chess.WHITE):
+        # Everything static is rendered once
+        self.glyphs = {symbol: self.font.render(char, True, (0, 0, 0)) for symbol, char in PIECE_SYMBOLS.items()}
+        self.background = pygame.Surface((WIDTH, HEIGHT))
         for row in range(8):
-            for col in range(8):               
-                display_row = row
-                display_col = col
-                
-                if player_color == chess.BLACK:
-                    rank = row 
-                    file = 7 - col
-                    # Calculate square 0-63
-                    square = chess.square(file, rank)
-                else: 
-                    # Default: White at bottom
-                    rank = 7 - row
-                    file = col
-                    square = chess.square(file, rank)
-                
-                # Color
-                color = COLORS[(display_row + display_col) % 2]
-                pygame.draw.rect(self.screen, color, (display_col * SQUARE_SIZE, display_row * SQUARE_SIZE, SQUARE_SIZE, SQUARE_SIZE))
-                
-                # Selection Highlight
-                if self.selected_square == square:
-                    pygame.draw.rect(self.screen, HIGHLIGHT_COLOR, (display_col * SQUARE_SIZE, display_row * SQUARE_SIZE, SQUARE_SIZE, SQUARE_SIZE))
-                
-                # Move Highlights
-                if any(m.to_square == square for m in self.valid_moves):
-                    center = (display_col * SQUARE_SIZE + SQUARE_SIZE // 2, display_row * SQUARE_SIZE + SQUARE_SIZE // 2)
-                    pygame.draw.circle(self.screen, (0, 0, 0, 30), center, 10)
-
-                # Piece
-                piece = board.piece_at(square)
-                if piece:
-                    symbol = PIECE_SYMBOLS.get(piece.symbol())
-                    text = self.font.render(symbol, True, (0, 0, 0))
-                    text_rect = text.get_rect(center=(display_col * SQUARE_SIZE + SQUARE_SIZE // 2, display_row * SQUARE_SIZE + SQUARE_SIZE // 2))
-                    self.screen.blit(text, text_rect)
+            for col in range(8):
+                pygame.draw.rect(self.background, COLORS[(row + col) % 2], (col * SQUARE_SIZE, row * SQUARE_SIZE, SQUARE_SIZE, SQUARE_SIZE))
+        self.fonts = {}
+        self.texts = {}
+
+        # What is on screen: square -> (piece symbol, selected, move target)
+        self.drawn_squares = {}
+        self.drawn_color = None
+        self.drawn_messages = []
+        self.message_rects = []
+
+    def invalidate(self):
+        """Forgets what is on screen, the next draw_board repaints everything."""
+        self.drawn_squares = {}
+
+    def square_rect(self, square, player_color=chess.WHITE):
+        if player_color == chess.BLACK:
+            col, row = 7 - chess.square_file(square), chess.square_rank(square)
+        else:
+            # Default: White at bottom
+            col, row = chess.square_file(square), 7 - chess.square_rank(square)
+        return pygame.Rect(col * SQUARE_SIZE, row * SQUARE_SIZE, SQUARE_SIZE, SQUARE_SIZE)
+
+    def render_text(self, text, size, color):
+        key = (text, size, color)
+        if key not in self.texts:
+            if size not in self.fonts:
+                self.fonts[size] = pygame.font.Font(None, size)
+            self.texts[key] = self.fonts[size].render(text, True, color)
+        return self.texts[key]
+
+    def draw_square(self, rect, state):
+        symbol, selected, target = state
+        self.screen.blit(self.background, rect, rect)
+        
+        # Selection Highlight
+        if selected:
+            pygame.draw.rect(self.screen, HIGHLIGHT_COLOR, rect)
+        
+        # Move Highlights
+        if target:
+            pygame.draw.circle(self.screen, (0, 0, 0, 30), rect.center, 10)
+
+        # Piece
+        if symbol:
+            glyph = self.glyphs[symbol]
+            self.screen.blit(glyph, glyph.get_rect(center=rect.center))
+
+    def draw_board(self, board, player_color=chess.WHITE, messages=()):
+        """
+        Brings the window up to date with `board` and the selection.
+        `messages` are (text, font size, color, center) drawn over the board.
+        Returns whether anything was redrawn.
+        """
+        if player_color != self.drawn_color:
+            self.invalidate()
+            self.drawn_color = player_color
+
+        messages = list(messages)
+        message_rects = []
+        for text, size, color, center in messages:
+            surface = self.render_text(text, size, color)
+            message_rects.append((surface, surface.get_rect(center=center)))
+
+        # Squares under a message that appears or disappears must be repainted
+        covered = []
+        if messages != self.drawn_messages:
+            covered = [rect for _, rect in message_rects] + self.message_rects
+            self.drawn_messages = messages
+        self.message_rects = [rect for _, rect in message_rects]
+
+        pieces = board.piece_map()
+        dirty = []
+        for square in chess.SQUARES:
+            piece = pieces.get(square)
+            state = (piece.symbol() if piece else None, square == self.selected_square, square in self.target_squares)
+            rect = self.square_rect(square, player_color)
+            if self.drawn_squares.get(square) != state or rect.collidelist(covered) != -1:
+                self.drawn_squares[square] = state
+                dirty.append((square, rect, state))
+
+        if not dirty:
+            return False
+
+        # Text is anti-aliased, blending it twice would smear it: repaint
+        # every square under the messages before drawing them again
+        if message_rects:
+            dirty_squares = {square for square, _, _ in dirty}
+            for square in chess.SQUARES:
+                rect = self.square_rect(square, player_color)
+                if square not in dirty_squares and rect.collidelist(self.message_rects) != -1:
+                    dirty.append((square, rect, self.drawn_squares[square]))
+
+        for _, rect, state in dirty:
+            self.draw_square(rect, state)
+        for surface, rect in message_rects:
+            self.screen.blit(surface, rect)
+        pygame.display.update([rect for _, rect, _ in dirty])
+        return True
+
+    def wait_for_events(self, timeout=None):
+        """
+        Sleeps until there is an event, or for at most `timeout` ms, and
+        returns all pending events. Nothing on the board animates, so there
+        is no reason to wake up otherwise.
+        """
+        first = pygame.event.wait(timeout) if timeout else pygame.event.wait()
+        events = [first] + pygame.event.get()
+        for event in events:
+            # The window contents were lost (uncovered, restored)
+            if event.type in (pygame.VIDEOEXPOSE, pygame.WINDOWEXPOSED):
+                self.invalidate()
+        return events
 
     def get_square_under_mouse(self, player_color=chess.WHITE):
         mouse_pos = pygame.mouse.get_pos()
@@ -99,12 +184,10 @@ class ChessUI:
             promotion_move = chess.Move(self.selected_square, clicked_square, promotion=chess.QUEEN)
             
             if move in board.legal_moves:
-                self.selected_square = None
-                self.valid_moves = []
+                self.clear_selection()
                 return move
             elif promotion_move in board.legal_moves:
-                self.selected_square = None
-                self.valid_moves = []
+                self.clear_selection()
                 return promotion_move
 
         # Otherwise, select the new square if it's our piece
@@ -112,8 +195,13 @@ class ChessUI:
         if piece and piece.color == board.turn:
             self.selected_square = clicked_square
             self.valid_moves = [m for m in board.legal_moves if m.from_square == clicked_square]
+            self.target_squares = {m.to_square for m in self.valid_moves}
         else:
-            self.selected_square = None
-            self.valid_moves = []
+            self.clear_selection()
         
         return None
+
+    def clear_selection(self):
+        self.selected_square = None
+        self.valid_moves = []
+        self.target_squares = set()
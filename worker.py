@@ -0,0 +1,222 @@
+import chess
+import multiprocessing
+import queue
+import threading
+import time
+
+# The search engine in its own process, so a front-end (pygame UI, UCI loop)
+# never shares the GIL with a running search. Requests go down one queue,
+# progress and results come back on another, tagged with the search id.
+# The engine (and its transposition table) lives as long as the worker, so
+# it stays warm from move to move.
+
+POLL_INTERVAL = 0.01 # Seconds between checks for stop/cancel during a search
+ALIVE_INTERVAL = 0.1 # Seconds get() waits before checking that the process still runs
+
+class WorkerError(RuntimeError):
+    """The engine process died; nothing more will arrive from it."""
+
+class SearchSignal:
+    """
+    Tells the worker whether search `search_id` should end: stopped (the
+    result is still wanted) or superseded by a newer submit/cancel.
+    """
+    def __init__(self, latest_id, stop_id, search_id):
+        self.latest_id = latest_id
+        self.stop_id = stop_id
+        self.search_id = search_id
+
+    def is_set(self):
+        return self.stop_id.value == self.search_id or self.latest_id.value != self.search_id
+
+def _watch(engine, signal, done):
+    # engine.stop() also reaches the processes of a parallel search
+    while not done.wait(POLL_INTERVAL):
+        if signal.is_set():
+            engine.stop()
+            return
+
+def _create_engine(options):
+    from search import SearchEngine
+    book = tablebases = None
+    if options.get('book'):
+        from book import OpeningBook
+        book = OpeningBook(options['book'], options.get('book_mode', "weighted"))
+    if options.get('syzygy'):
+        from tablebase import Tablebases
+        tablebases = Tablebases(options['syzygy'], options.get('syzygy_limit'))
+    engine = SearchEngine(
+        options.get('depth', 4), hash_mb=options.get('hash_mb', 16), threads=options.get('threads', 1),
+        verbose=options.get('verbose', False), search_mode=options.get('search_mode', "minimax"),
+        book=book, tablebases=tablebases
+    )
+    if options.get('telemetry'):
+        from telemetry import JsonLinesWriter
+        engine.telemetry_callback = JsonLinesWriter(options['telemetry'])
+    return engine
+
+def _worker_main(requests, responses, latest_id, stop_id, options):
+    # A bad book or tablebase path must not kill the process silently: every
+    # search is answered with the setup error instead
+    engine = None
+    setup_error = None
+    try:
+        engine = _create_engine(options)
+        default_depth = engine.depth
+    except Exception as e:
+        setup_error = f"{type(e).__name__}: {e}"
+
+    while True:
+        request = requests.get()
+        kind = request[0]
+        if kind == "quit":
+            break
+        if kind == "newgame":
+            if engine is not None:
+                engine.transposition_table.clear()
+            continue
+
+        _, search_id, fen, moves, limits = request
+        if latest_id.value != search_id:
+            # Superseded before it started
+            continue
+        if setup_error is not None:
+            responses.put(("error", search_id, {'message': setup_error}))
+            continue
+
+        board = chess.Board(fen)
+        for uci in moves:
+            board.push_uci(uci)
+
+        def send_info(info, search_id=search_id):
+            info = dict(info, pv=[move.uci() for move in info['pv']], tbhits=engine.tb_hits)
+            responses.put(("info", search_id, info))
+        engine.info_callback = send_info
+        engine.depth = limits.get('depth') or default_depth
+        engine.reset_stop()
+
+        signal = SearchSignal(latest_id, stop_id, search_id)
+        done = threading.Event()
+        watcher = threading.Thread(target=_watch, args=(engine, signal, done), daemon=True)
+        watcher.start()
+        try:
+            best_move, nodes = engine.get_best_move(board, time_limit=limits.get('time'), node_limit=limits.get('nodes'))
+            responses.put(("bestmove", search_id, {
+                'move': best_move.uci() if best_move else None,
+                'score': engine.best_score,
+                'depth': engine.completed_depth,
+                'nodes': nodes,
+                'pv': [move.uci() for move in engine.pv],
+                'telemetry': engine.telemetry.to_dict() if engine.telemetry else None
+            }))
+        except Exception as e:
+            responses.put(("error", search_id, {'message': f"{type(e).__name__}: {e}"}))
+        finally:
+            done.set()
+            watcher.join()
+
+    if engine is not None:
+        engine.close()
+
+class EngineWorker:
+    """
+    Client side of an engine process. submit() starts a search and returns
+    its id; messages come back from poll()/get() as (kind, search_id, data)
+    with kind "info" (after each iteration), "bestmove" or "error". Only
+    messages of the current search are returned. stop() ends the current
+    search early and still delivers its bestmove, cancel() drops it.
+
+    `options` are passed to the engine process: depth, hash_mb, threads,
+    search_mode, verbose, book, book_mode, syzygy, syzygy_limit, telemetry.
+    """
+    def __init__(self, **options):
+        # Spawn rather than fork: see parallel.py
+        context = multiprocessing.get_context("spawn")
+        self.requests = context.Queue()
+        self.responses = context.Queue()
+        self.latest_id = context.RawValue('q', 0)
+        self.stop_id = context.RawValue('q', 0)
+        self.search_id = 0
+        self.next_id = 0
+        self.process = context.Process(
+            target=_worker_main,
+            args=(self.requests, self.responses, self.latest_id, self.stop_id, options),
+            daemon=True
+        )
+        self.process.start()
+
+    def submit(self, board, depth=None, time_limit=None, node_limit=None):
+        """
+        Searches `board` (with its move history, for repetitions) and returns
+        the search id. A search still running is cancelled.
+        """
+        self.next_id += 1
+        self.search_id = self.next_id
+        self.latest_id.value = self.search_id
+        root = board.root()
+        moves = [move.uci() for move in board.move_stack]
+        limits = {'depth': depth, 'time': time_limit, 'nodes': node_limit}
+        self.requests.put(("search", self.search_id, root.fen(), moves, limits))
+        return self.search_id
+
+    def stop(self):
+        """Ends the current search as soon as possible; its bestmove still arrives."""
+        self.stop_id.value = self.search_id
+
+    def cancel(self):
+        """Abandons the current search; nothing more is returned for it."""
+        self.next_id += 1
+        self.latest_id.value = self.next_id
+        self.search_id = 0
+
+    def new_game(self):
+        self.cancel()
+        self.requests.put(("newgame",))
+
+    def is_alive(self):
+        return self.process.is_alive()
+
+    def get(self, timeout=None):
+        """
+        Next message of the current search, blocking up to `timeout` seconds
+        (forever if None). Returns None on timeout, raises WorkerError if
+        the engine process died.
+        """
+        deadline = time.perf_counter() + timeout if timeout is not None else None
+        while True:
+            wait = ALIVE_INTERVAL
+            if deadline is not None:
+                wait = min(wait, max(0.0, deadline - time.perf_counter()))
+            try:
+                message = self.responses.get(timeout=wait)
+            except queue.Empty:
+                if not self.process.is_alive():
+                    raise WorkerError(f"Engine process exited with code {self.process.exitcode}")
+                if deadline is not None and time.perf_counter() >= deadline:
+                    return None
+                continue
+            if message[1] == self.search_id:
+                return message
+
+    def poll(self):
+        """
+        All messages of the current search that already arrived, without
+        blocking. Raises WorkerError if there are none and the engine process died.
+        """
+        messages = []
+        while True:
+            try:
+                message = self.responses.get_nowait()
+            except queue.Empty:
+                if not messages and not self.process.is_alive():
+                    raise WorkerError(f"Engine process exited with code {self.process.exitcode}")
+                return messages
+            if message[1] == self.search_id:
+                messages.append(message)
+
+    def close(self):
+        self.cancel()
+        self.requests.put(("quit",))
+        self.process.join(timeout=5)
+        if self.process.is_alive():
+            self.process.terminate()
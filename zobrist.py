@@ -0,0 +1,143 @@
+import chess
+import random
+
+# Zobrist Initialization
+# Fixed seed: every process must derive the same keys to share a transposition
+# table, and node counts must be reproducible across runs (see bench.py).
+ZOBRIST_SEED = 0x5EED
+
+# ZOBRIST_TABLE[square][piece_index], piece_index = (piece_type - 1) + 6 * color
+ZOBRIST_TABLE = [[0] * 12 for _ in range(64)]
+ZOBRIST_BLACK_TURN = 0
+
+# One key per combination of the four standard castling rights
+ZOBRIST_CASTLING = [0] * 16
+ZOBRIST_EP_FILE = [0] * 8
+
+def seed_zobrist(seed=ZOBRIST_SEED):
+    """
+    (Re)generates every key from `seed`. Tables are filled in place so
+    modules that imported them keep seeing the current keys.
+    """
+    global ZOBRIST_BLACK_TURN, ZOBRIST_SEED
+    rng = random.Random(seed)
+    for square in range(64):
+        for i in range(12):
+            ZOBRIST_TABLE[square][i] = rng.getrandbits(64)
+    ZOBRIST_BLACK_TURN = rng.getrandbits(64)
+    for i in range(16):
+        ZOBRIST_CASTLING[i] = rng.getrandbits(64)
+    for i in range(8):
+        ZOBRIST_EP_FILE[i] = rng.getrandbits(64)
+    ZOBRIST_SEED = seed
+
+seed_zobrist()
+
+CASTLING_CORNERS = (chess.BB_H1, chess.BB_A1, chess.BB_H8, chess.BB_A8)
+ALL_CORNERS = chess.BB_A1 | chess.BB_H1 | chess.BB_A8 | chess.BB_H8
+
+# Castling rights bitboard (corners only) -> index into ZOBRIST_CASTLING
+CASTLING_INDEX = {}
+for _i in range(16):
+    _bb = 0
+    for _bit, _corner in enumerate(CASTLING_CORNERS):
+        if _i & (1 << _bit):
+            _bb |= _corner
+    CASTLING_INDEX[_bb] = _i
+
+
+def piece_index(piece_type, color):
+    return (piece_type - 1) + 6 * int(color)
+
+
+def castling_key(castling_rights):
+    return ZOBRIST_CASTLING[CASTLING_INDEX[castling_rights & ALL_CORNERS]]
+
+
+def ep_key(board):
+    """
+    En-passant only changes the position if the side to move could actually
+    play it, so the file is hashed only when one of its pawns attacks the
+    en-passant square.
+    """
+    ep_square = board.ep_square
+    if ep_square is None:
+        return 0
+    attackers = chess.BB_PAWN_ATTACKS[not board.turn][ep_square] & board.pawns & board.occupied_co[board.turn]
+    if attackers:
+        return ZOBRIST_EP_FILE[chess.square_file(ep_square)]
+    return 0
+
+
+def compute_hash(board):
+    """
+    Full recompute of the key: pieces, side to move, castling and en-passant.
+    """
+    h = 0
+    for square, piece in board.piece_map().items():
+        h ^= ZOBRIST_TABLE[square][piece_index(piece.piece_type, piece.color)]
+
+    if board.turn == chess.BLACK:
+        h ^= ZOBRIST_BLACK_TURN
+
+    h ^= castling_key(board.clean_castling_rights())
+    h ^= ep_key(board)
+    return h
+
+
+def update_hash(board, move, h):
+    """
+    Returns the key of the position after `move`, given the key `h` of the
+    current position. Must be called BEFORE board.push(move).
+    Only standard (non-960) castling is supported.
+    """
+    from_square = move.from_square
+    to_square = move.to_square
+    color = board.turn
+    offset = 6 if color else 0
+
+    piece_type = board.piece_type_at(from_square)
+    h ^= ZOBRIST_TABLE[from_square][piece_type - 1 + offset]
+    h ^= ZOBRIST_TABLE[to_square][(move.promotion or piece_type) - 1 + offset]
+
+    # Captures (en-passant removes the pawn behind the target square)
+    captured_type = board.piece_type_at(to_square)
+    if captured_type:
+        h ^= ZOBRIST_TABLE[to_square][captured_type - 1 + 6 - offset]
+    elif piece_type == chess.PAWN and chess.square_file(from_square) != chess.square_file(to_square):
+        captured_square = to_square - 8 if color else to_square + 8
+        h ^= ZOBRIST_TABLE[captured_square][6 - offset]
+
+    # Castling moves the rook too
+    if piece_type == chess.KING and abs(to_square - from_square) == 2:
+        rank_base = from_square & ~7
+        if to_square > from_square:
+            rook_from, rook_to = rank_base + 7, rank_base + 5
+        else:
+            rook_from, rook_to = rank_base, rank_base + 3
+        rook_index = chess.ROOK - 1 + offset
+        h ^= ZOBRIST_TABLE[rook_from][rook_index] ^ ZOBRIST_TABLE[rook_to][rook_index]
+
+    # Castling rights: moving from or onto a corner clears it, king moves clear both
+    rights = board.clean_castling_rights() & ALL_CORNERS
+    new_rights = rights & ~chess.BB_SQUARES[from_square] & ~chess.BB_SQUARES[to_square]
+    if piece_type == chess.KING:
+        new_rights &= ~(chess.BB_RANK_1 if color else chess.BB_RANK_8)
+    if new_rights != rights:
+        h ^= ZOBRIST_CASTLING[CASTLING_INDEX[rights]] ^ ZOBRIST_CASTLING[CASTLING_INDEX[new_rights]]
+
+    # En-passant: drop the old key, add a new one after a capturable double push
+    h ^= ep_key(board)
+    if piece_type == chess.PAWN and abs(to_square - from_square) == 16:
+        ep_square = (from_square + to_square) // 2
+        if chess.BB_PAWN_ATTACKS[color][ep_square] & board.pawns & board.occupied_co[not color]:
+            h ^= ZOBRIST_EP_FILE[chess.square_file(ep_square)]
+
+    return h ^ ZOBRIST_BLACK_TURN
+
+def update_hash_null(board, h):
+    """
+    Key after a null move (the side to move passes), for null-move pruning.
+    Must be called BEFORE board.push(chess.Move.null()).
+    """
+    return h ^ ep_key(board) ^ ZOBRIST_BLACK_TURN